@@ -0,0 +1,108 @@
+from decimal import Decimal
+from django.conf import settings
+from products.models import Product
+from memberships.models import MembershipTier
+
+
+class ShoppingBag:
+    """
+    Resolved view of the session bag.
+
+    All products are fetched in a single query and the membership (if any)
+    in one more, so the cost is constant regardless of how many lines the
+    shopper has. Ids that no longer exist in the database are skipped and
+    reported in `missing_product_ids` instead of raising.
+    """
+
+    def __init__(self, bag=None, membership_id=None):
+        self.bag = dict(bag or {})
+        self.membership_id = membership_id
+        self.items = []
+        self.missing_product_ids = []
+        self.membership = None
+        self.total = Decimal('0')
+        self.product_count = 0
+        self._resolve()
+
+    @classmethod
+    def from_session(cls, session):
+        """Build a bag from the `bag` and `membership_in_bag` session keys"""
+        return cls(
+            session.get('bag', {}),
+            session.get('membership_in_bag', None),
+        )
+
+    def _resolve(self):
+        products = Product.objects.in_bulk(
+            [int(item_id) for item_id in self.bag if str(item_id).isdigit()]
+        )
+
+        # Handle products
+        for item_id, quantity in self.bag.items():
+            product = products.get(int(item_id)) if str(item_id).isdigit() else None
+            if product is None:
+                self.missing_product_ids.append(item_id)
+                continue
+            self.total += quantity * product.price
+            self.product_count += quantity
+            self.items.append({
+                'item_id': item_id,
+                'quantity': quantity,
+                'product': product,
+                'item_type': 'product',
+            })
+
+        # Handle membership
+        if self.membership_id:
+            self.membership = MembershipTier.objects.filter(pk=self.membership_id).first()
+            if self.membership is not None:
+                self.total += self.membership.price
+                self.product_count += 1
+                self.items.append({
+                    'item_id': self.membership_id,
+                    'quantity': 1,
+                    'membership': self.membership,
+                    'item_type': 'membership',
+                })
+
+    @property
+    def products(self):
+        """Resolved product lines only"""
+        return [item for item in self.items if item['item_type'] == 'product']
+
+    @property
+    def has_physical_products(self):
+        return bool(self.products)
+
+    @property
+    def free_delivery_threshold(self):
+        return Decimal(settings.FREE_DELIVERY_THRESHOLD)
+
+    @property
+    def delivery(self):
+        """Delivery is only charged for physical products, not memberships"""
+        if self.has_physical_products and self.total < self.free_delivery_threshold:
+            return Decimal(settings.STANDARD_DELIVERY_COST)
+        return 0
+
+    @property
+    def free_delivery_delta(self):
+        if self.has_physical_products and self.total < self.free_delivery_threshold:
+            return self.free_delivery_threshold - self.total
+        return 0
+
+    @property
+    def grand_total(self):
+        return self.total + self.delivery
+
+
+def get_bag(request):
+    """
+    Return the request's ShoppingBag, resolving it at most once per request.
+
+    Views that change the session bag redirect straight after, so the
+    memoized value never outlives a mutation.
+    """
+    if not hasattr(request, '_cached_bag'):
+        request._cached_bag = ShoppingBag.from_session(request.session)
+    return request._cached_bag
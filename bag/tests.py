@@ -1,2 +1,108 @@
+from decimal import Decimal
+from django.test import TestCase, Client, RequestFactory
+from django.urls import reverse
+from products.models import Product
+from memberships.models import MembershipTier
+from bag.services import ShoppingBag, get_bag
 
-# Create your tests here.
+
+class ShoppingBagTests(TestCase):
+    """Test the resolved shopping bag service"""
+
+    def setUp(self):
+        self.products = [
+            Product.objects.create(
+                sku=f'SKU{i}',
+                name=f'Product {i}',
+                description='Test',
+                price=Decimal('10.00'),
+                stock_quantity=50,
+            )
+            for i in range(15)
+        ]
+        self.membership = MembershipTier.objects.create(
+            name='Premium',
+            description='Premium membership',
+            price=Decimal('40.00'),
+            classes_per_week=5,
+        )
+
+    def test_products_resolved_in_single_query(self):
+        """Test bag size does not change the number of product queries"""
+        bag = {str(product.id): 1 for product in self.products}
+        with self.assertNumQueries(2):
+            shopping_bag = ShoppingBag(bag, str(self.membership.id))
+        self.assertEqual(len(shopping_bag.items), 16)
+        self.assertEqual(shopping_bag.product_count, 16)
+        self.assertEqual(shopping_bag.total, Decimal('190.00'))
+
+    def test_deleted_product_is_skipped(self):
+        """Test a stale product id in the session does not raise"""
+        stale_id = str(self.products[0].id)
+        bag = {stale_id: 2, str(self.products[1].id): 1}
+        self.products[0].delete()
+        shopping_bag = ShoppingBag(bag)
+        self.assertEqual(shopping_bag.missing_product_ids, [stale_id])
+        self.assertEqual(shopping_bag.product_count, 1)
+        self.assertEqual(shopping_bag.total, Decimal('10.00'))
+
+    def test_deleted_membership_is_skipped(self):
+        """Test a stale membership id in the session does not raise"""
+        membership_id = str(self.membership.id)
+        self.membership.delete()
+        shopping_bag = ShoppingBag({}, membership_id)
+        self.assertIsNone(shopping_bag.membership)
+        self.assertEqual(shopping_bag.items, [])
+
+    def test_delivery_only_for_physical_products(self):
+        """Test membership-only bags are not charged delivery"""
+        membership_bag = ShoppingBag({}, str(self.membership.id))
+        self.assertEqual(membership_bag.delivery, 0)
+        self.assertEqual(membership_bag.grand_total, Decimal('40.00'))
+
+        product_bag = ShoppingBag({str(self.products[0].id): 1})
+        self.assertGreater(product_bag.delivery, 0)
+        self.assertEqual(product_bag.grand_total, product_bag.total + product_bag.delivery)
+
+    def test_bag_page_with_stale_product(self):
+        """Test the site keeps rendering when a bagged product was deleted"""
+        client = Client()
+        stale = self.products[0]
+        session = client.session
+        session['bag'] = {str(stale.id): 1}
+        session.save()
+        stale.delete()
+        response = client.get(reverse('bag:view_bag'))
+        self.assertEqual(response.status_code, 200)
+
+
+class BagContextTests(TestCase):
+    """Test the lazy, request-scoped bag context"""
+
+    def setUp(self):
+        self.client = Client()
+        self.product = Product.objects.create(
+            sku='LAZY1',
+            name='Lazy Product',
+            description='Test',
+            price=Decimal('20.00'),
+            stock_quantity=5,
+        )
+
+    def test_get_bag_is_memoized_per_request(self):
+        """Test the bag is resolved once no matter how often it is read"""
+        request = RequestFactory().get('/')
+        request.session = {'bag': {str(self.product.id): 2}}
+        with self.assertNumQueries(1):
+            first = get_bag(request)
+            second = get_bag(request)
+        self.assertIs(first, second)
+        self.assertEqual(first.total, Decimal('40.00'))
+
+    def test_bag_badge_renders_totals(self):
+        """Test the navbar badge still shows the lazily resolved bag"""
+        session = self.client.session
+        session['bag'] = {str(self.product.id): 2}
+        session.save()
+        response = self.client.get(reverse('faq'))
+        self.assertContains(response, '€40.00')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, WaitlistEntry
 
 
 @admin.register(Booking)
@@ -8,4 +8,12 @@ class BookingAdmin(admin.ModelAdmin):
     list_filter = ('status', 'booking_date')
     search_fields = ('user__username', 'user__email', 'class_schedule__fitness_class__name')
     date_hierarchy = 'booking_date'
-    readonly_fields = ('booking_date',)
+    readonly_fields = ('class_date', 'booking_date')
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'class_schedule', 'status', 'created', 'resolved_at')
+    list_filter = ('status',)
+    search_fields = ('user__username', 'user__email', 'class_schedule__fitness_class__name')
+    readonly_fields = ('created', 'resolved_at')
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status'], name='booking_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_class_dates(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    ClassSchedule = apps.get_model('classes', 'ClassSchedule')
+    Booking.objects.update(
+        class_date=Subquery(
+            ClassSchedule.objects.filter(pk=OuterRef('class_schedule_id')).values('date')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0008_classschedule_updated_at'),
+        ('bookings', '0002_booking_booking_user_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='class_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(copy_class_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='class_date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'class_date'], name='booking_user_week_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('classes', '0008_classschedule_updated_at'),
+        ('bookings', '0003_booking_class_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('promoted', 'Promoted'), ('skipped', 'Skipped'), ('left', 'Left')], default='waiting', max_length=20)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('class_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='classes.classschedule')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Waitlist Entries',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['class_schedule', 'status', 'id'], name='waitlist_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('user', 'class_schedule'), name='unique_waiting_entry'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='class_date',
+            field=models.DateField(editable=False),
+        ),
+    ]
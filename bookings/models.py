@@ -14,6 +14,9 @@ class Booking(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     class_schedule = models.ForeignKey(ClassSchedule, on_delete=models.CASCADE, related_name='bookings')
+    # Copy of class_schedule.date so weekly limits can be counted from one index;
+    # always set from the schedule in save()
+    class_date = models.DateField(editable=False)
     booking_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='confirmed')
     notes = models.TextField(blank=True)
@@ -22,6 +25,58 @@ class Booking(models.Model):
         verbose_name_plural = 'Bookings'
         unique_together = ['user', 'class_schedule']
         ordering = ['-booking_date']
+        indexes = [
+            # My bookings: a member's bookings filtered by status
+            models.Index(fields=['user', 'status'], name='booking_user_status_idx'),
+            # Weekly limit: a member's bookings for classes in a date range.
+            # Not partial on status: SQLite ignores partial indexes when the
+            # status IN (...) values are bound parameters.
+            models.Index(fields=['user', 'class_date'], name='booking_user_week_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Override save to copy the class date from the schedule"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'class_schedule' in update_fields:
+            self.class_date = self.class_schedule.date
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'class_date'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} - {self.class_schedule}"
+
+
+class WaitlistEntry(models.Model):
+    """A member queued for a full class, promoted first-in first-out"""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('skipped', 'Skipped'),
+        ('left', 'Left'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    class_schedule = models.ForeignKey(ClassSchedule, on_delete=models.CASCADE, related_name='waitlist_entries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Waitlist Entries'
+        ordering = ['id']
+        constraints = [
+            # One place in the queue per member per class
+            models.UniqueConstraint(
+                fields=['user', 'class_schedule'],
+                condition=models.Q(status='waiting'),
+                name='unique_waiting_entry',
+            ),
+        ]
+        indexes = [
+            # Queue head and positions: waiting entries of a schedule in id order
+            models.Index(fields=['class_schedule', 'status', 'id'], name='waitlist_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.class_schedule}"
@@ -1 +1,14 @@
-"""Reserved for future booking-related signals."""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from classes.models import ClassSchedule
+from .models import Booking
+
+
+@receiver(post_save, sender=ClassSchedule)
+def sync_class_date(sender, instance, created, raw=False, **kwargs):
+    """Keep Booking.class_date in step when staff move a schedule to another day"""
+    if created or raw:
+        return
+    Booking.objects.filter(class_schedule=instance).exclude(
+        class_date=instance.date,
+    ).update(class_date=instance.date)
@@ -0,0 +1,610 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+import time as timer
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from checkout.models import QueuedEmail
+from classes.models import FitnessClass, ClassSchedule
+from memberships.models import MembershipTier, UserMembership
+from bookings.models import Booking, WaitlistEntry
+from bookings.utils import (
+    book_class, cancel_class_booking, calendar_feed_token, iso_week_range,
+    join_waitlist, leave_waitlist, waitlist_position,
+    ClassFullError, WeeklyLimitError, AlreadyBookedError, NotFullError, AlreadyWaitlistedError,
+)
+
+
+def make_schedule(max_capacity=10, available_spots=None):
+    fitness_class = FitnessClass.objects.create(
+        name='Spin',
+        description='Indoor cycling',
+        duration=45,
+        instructor='Test Instructor',
+        max_capacity=max_capacity,
+    )
+    # Today, so the class counts towards this week's classes_used_this_week
+    return ClassSchedule.objects.create(
+        fitness_class=fitness_class,
+        date=date.today(),
+        start_time=time(23, 0),
+        end_time=time(23, 45),
+        available_spots=available_spots,
+    )
+
+
+def retry_locked(action, timeout=30):
+    """
+    Run action from a worker thread, retrying while SQLite rejects writers
+    it cannot lock instead of waiting. Gives up with 'locked' after timeout
+    seconds so a lock that never clears fails the test rather than hanging.
+    """
+    deadline = timer.monotonic() + timeout
+    try:
+        while True:
+            try:
+                return action()
+            except OperationalError:
+                if timer.monotonic() > deadline:
+                    return 'locked'
+                timer.sleep(0.001)
+    finally:
+        connection.close()
+
+
+def make_membership(user, tier):
+    return UserMembership.objects.create(
+        user=user,
+        membership_tier=tier,
+        start_date=date.today(),
+        end_date=date.today() + timedelta(days=30),
+        status='active',
+    )
+
+
+class BookClassTests(TestCase):
+    """Test seat and weekly allowance reservation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        self.tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=2,
+        )
+        self.membership = make_membership(self.user, self.tier)
+        self.schedule = make_schedule(max_capacity=5)
+
+    def test_booking_takes_spot_and_allowance(self):
+        """Test a booking decrements spots and increments weekly usage"""
+        book_class(self.user, self.schedule, self.membership)
+        self.schedule.refresh_from_db()
+        self.membership.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 4)
+        self.assertEqual(self.membership.classes_used_this_week, 1)
+
+    def test_full_class_is_rejected(self):
+        """Test no booking is created once spots reach zero"""
+        ClassSchedule.objects.filter(pk=self.schedule.pk).update(available_spots=0)
+        with self.assertRaises(ClassFullError):
+            book_class(self.user, self.schedule, self.membership)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_weekly_limit_rolls_back_spot(self):
+        """Test hitting the weekly limit leaves the spot untouched"""
+        UserMembership.objects.filter(pk=self.membership.pk).update(classes_used_this_week=2)
+        with self.assertRaises(WeeklyLimitError):
+            book_class(self.user, self.schedule, self.membership)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 5)
+
+    def test_duplicate_booking_rolls_back(self):
+        """Test booking the same class twice is refused"""
+        book_class(self.user, self.schedule, self.membership)
+        with self.assertRaises(AlreadyBookedError):
+            book_class(self.user, self.schedule, self.membership)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 4)
+
+    def test_rebook_after_cancel(self):
+        """Test a cancelled booking can be booked again"""
+        booking = book_class(self.user, self.schedule, self.membership)
+        self.assertTrue(cancel_class_booking(booking))
+        self.assertFalse(cancel_class_booking(booking))
+        rebooked = book_class(self.user, self.schedule, self.membership)
+        self.assertEqual(rebooked.pk, booking.pk)
+        self.assertEqual(rebooked.status, 'confirmed')
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 4)
+
+    def test_create_booking_view(self):
+        """Test the booking view reserves a spot"""
+        client = Client()
+        client.login(username='member', password='testpass123')
+        response = client.get(reverse('bookings:create_booking', args=[self.schedule.id]))
+        self.assertRedirects(response, reverse('bookings:my_bookings'))
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 4)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Fire parallel bookings at one schedule and assert it is never oversold.
+
+    Runs against whichever database is configured, so set DATABASE_URL to
+    exercise PostgreSQL; locally it runs on SQLite.
+    """
+
+    members = 200
+    capacity = 20
+
+    def setUp(self):
+        tier = MembershipTier.objects.create(
+            name='Unlimited',
+            description='Unlimited membership',
+            price=Decimal('80.00'),
+            classes_per_week=100,
+        )
+        User.objects.bulk_create([
+            User(username=f'member{i}') for i in range(self.members)
+        ])
+        self.users = list(User.objects.order_by('id'))
+        UserMembership.objects.bulk_create([
+            UserMembership(
+                user=user,
+                membership_tier=tier,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                status='active',
+            )
+            for user in self.users
+        ])
+        self.memberships = {
+            membership.user_id: membership
+            for membership in UserMembership.objects.select_related('membership_tier')
+        }
+        self.schedule = make_schedule(max_capacity=self.capacity)
+
+    def _book(self, user):
+        def attempt():
+            try:
+                book_class(user, self.schedule, self.memberships[user.id])
+                return 'booked'
+            except ClassFullError:
+                return 'full'
+        return retry_locked(attempt)
+
+    def test_parallel_bookings_never_overbook(self):
+        """Test hundreds of simultaneous bookings respect capacity"""
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            results = list(pool.map(self._book, self.users))
+        self.assertNotIn('locked', results, 'a booking never got its lock')
+
+        self.schedule.refresh_from_db()
+        confirmed = Booking.objects.filter(class_schedule=self.schedule, status='confirmed').count()
+        self.assertEqual(results.count('booked'), confirmed)
+        # Far more members than places, so the class must fill but not overflow
+        self.assertEqual(confirmed, self.capacity)
+        self.assertEqual(results.count('full'), self.members - self.capacity)
+        self.assertGreaterEqual(self.schedule.available_spots, 0)
+        self.assertEqual(self.schedule.available_spots, self.capacity - confirmed)
+
+
+class BookingFeedTests(TestCase):
+    """Test the private iCalendar feed of a member's bookings"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=3,
+        )
+        self.membership = make_membership(self.user, tier)
+        self.schedule = make_schedule()
+        self.booking = book_class(self.user, self.schedule, self.membership)
+        self.url = reverse('bookings:booking_feed', args=[calendar_feed_token(self.user)])
+
+    def test_feed_lists_live_bookings(self):
+        """Test the feed contains the member's booking without logging in"""
+        response = self.client.get(self.url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'UID:booking-{self.booking.id}@', body)
+        self.assertIn('SUMMARY:Spin', body)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_cancel_changes_feed(self):
+        """Test a cancellation invalidates the ETag and drops the event"""
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        cancel_class_booking(self.booking)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', b''.join(response.streaming_content).decode())
+
+    def test_tampered_or_revoked_token(self):
+        """Test bad tokens 404 and a password change revokes the old URL"""
+        self.assertEqual(self.client.get(reverse('bookings:booking_feed', args=['1:forged'])).status_code, 404)
+        self.user.set_password('newpass456')
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class WeeklyAllowanceTests(TestCase):
+    """Test the weekly class counter, its reset and the booking-derived mode"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=2,
+        )
+        self.membership = make_membership(self.user, tier)
+        self.fitness_class = FitnessClass.objects.create(
+            name='Row',
+            description='Rowing',
+            duration=30,
+            instructor='Test Instructor',
+        )
+        # Three sessions in one ISO week, one the week after
+        monday = iso_week_range(date.today() + timedelta(days=7))[0]
+        self.schedules = [
+            ClassSchedule.objects.create(
+                fitness_class=self.fitness_class,
+                date=monday + timedelta(days=offset),
+                start_time=time(6, 0),
+                end_time=time(6, 30),
+            )
+            for offset in (0, 2, 4, 7)
+        ]
+
+    def used(self):
+        self.membership.refresh_from_db()
+        return self.membership.classes_used_this_week
+
+    def this_week_schedule(self):
+        return ClassSchedule.objects.create(
+            fitness_class=self.fitness_class,
+            date=date.today(),
+            start_time=time(23, 0),
+            end_time=time(23, 30),
+        )
+
+    def test_cancel_returns_allowance(self):
+        """Test cancelling a booking for a class this week decrements the counter"""
+        booking = book_class(self.user, self.this_week_schedule(), self.membership)
+        self.assertEqual(self.used(), 1)
+        cancel_class_booking(booking)
+        self.assertEqual(self.used(), 0)
+
+    def test_reset_command_is_one_update(self):
+        """Test the weekly reset recounts every counter in a single query"""
+        book_class(self.user, self.this_week_schedule(), self.membership)
+        UserMembership.objects.filter(pk=self.membership.pk).update(classes_used_this_week=5)
+        with self.assertNumQueries(1):
+            call_command('reset_weekly_classes', stdout=StringIO())
+        self.assertEqual(self.used(), 1)
+
+    def test_counter_and_recount_agree(self):
+        """Test booking, cancelling and recounting all go by the class's week"""
+        book_class(self.user, self.this_week_schedule(), self.membership)
+        # Booked this week for next week: counted against next week, not this one
+        advance = book_class(self.user, self.schedules[0], self.membership)
+        book_class(self.user, self.schedules[1], self.membership)
+        self.assertEqual(self.used(), 1)
+        with self.assertRaises(WeeklyLimitError):
+            book_class(self.user, self.schedules[2], self.membership)
+
+        cancel_class_booking(advance)
+        self.assertEqual(self.used(), 1)
+        call_command('reset_weekly_classes', stdout=StringIO())
+        self.assertEqual(self.used(), 1)
+        book_class(self.user, self.schedules[2], self.membership)
+
+    @override_settings(WEEKLY_CLASS_LIMIT_SOURCE='bookings')
+    def test_limit_derived_from_bookings(self):
+        """Test the limit counts bookings in the class's own ISO week"""
+        book_class(self.user, self.schedules[0], self.membership)
+        booking = book_class(self.user, self.schedules[1], self.membership)
+        with self.assertRaises(WeeklyLimitError):
+            book_class(self.user, self.schedules[2], self.membership)
+        book_class(self.user, self.schedules[3], self.membership)
+
+        cancel_class_booking(booking)
+        book_class(self.user, self.schedules[2], self.membership)
+        self.assertEqual(self.used(), 0)
+
+    def test_class_date_follows_schedule(self):
+        """Test moving a schedule moves its bookings' class_date"""
+        booking = book_class(self.user, self.schedules[0], self.membership)
+        self.assertEqual(booking.class_date, self.schedules[0].date)
+        schedule = self.schedules[0]
+        schedule.date += timedelta(days=1)
+        schedule.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.class_date, schedule.date)
+
+    def test_class_date_always_from_schedule(self):
+        """Test class_date is derived from the schedule, not taken from input"""
+        booking = Booking.objects.create(
+            user=self.user, class_schedule=self.schedules[0], class_date=date(2000, 1, 1),
+        )
+        self.assertEqual(booking.class_date, self.schedules[0].date)
+
+        booking.class_schedule = self.schedules[3]
+        booking.save(update_fields=['class_schedule'])
+        booking.refresh_from_db()
+        self.assertEqual(booking.class_date, self.schedules[3].date)
+
+    def test_admin_add_derives_class_date(self):
+        """Test staff add bookings without typing the class date"""
+        User.objects.create_superuser(username='admin', password='testpass123', email='admin@test.com')
+        self.client.login(username='admin', password='testpass123')
+        url = reverse('admin:bookings_booking_add')
+        self.assertNotContains(self.client.get(url), 'name="class_date"')
+        response = self.client.post(url, {
+            'user': self.user.pk,
+            'class_schedule': self.schedules[1].pk,
+            'status': 'confirmed',
+            'notes': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.get().class_date, self.schedules[1].date)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite specific')
+    def test_weekly_count_uses_index(self):
+        """Test the derived weekly count searches booking_user_week_idx"""
+        # A long-standing member: a booking every day for months
+        ClassSchedule.objects.bulk_create([
+            ClassSchedule(
+                fitness_class=self.fitness_class,
+                date=date.today() - timedelta(days=offset),
+                start_time=time(12, 0),
+                end_time=time(12, 30),
+                available_spots=10,
+            )
+            for offset in range(1, 180)
+        ])
+        Booking.objects.bulk_create([
+            Booking(user=self.user, class_schedule=schedule, class_date=schedule.date, status='attended')
+            for schedule in ClassSchedule.objects.filter(start_time=time(12, 0))
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        plan = Booking.objects.filter(
+            user_id=self.user.id,
+            status__in=['confirmed', 'attended'],
+            class_date__range=iso_week_range(date.today()),
+        ).order_by().explain()
+        self.assertIn('booking_user_week_idx', plan)
+
+
+class WaitlistTests(TestCase):
+    """Test joining a waitlist and promotion when a seat is freed"""
+
+    def setUp(self):
+        self.tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=1,
+        )
+        self.holder, self.first, self.second = [
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+            for name in ('holder', 'first', 'second')
+        ]
+        self.memberships = {user: make_membership(user, self.tier) for user in (self.holder, self.first, self.second)}
+        self.schedule = make_schedule(max_capacity=1)
+        self.booking = book_class(self.holder, self.schedule, self.memberships[self.holder])
+
+    def test_queue_positions(self):
+        """Test members queue in order and cannot join twice"""
+        first = join_waitlist(self.first, self.schedule)
+        second = join_waitlist(self.second, self.schedule)
+        self.assertEqual((waitlist_position(first), waitlist_position(second)), (1, 2))
+        with self.assertRaises(AlreadyWaitlistedError):
+            join_waitlist(self.first, self.schedule)
+        with self.assertRaises(AlreadyBookedError):
+            join_waitlist(self.holder, self.schedule)
+
+        self.assertTrue(leave_waitlist(first))
+        self.assertEqual(waitlist_position(second), 1)
+
+    def test_open_class_cannot_be_waitlisted(self):
+        """Test a class with free spots is booked, not queued"""
+        cancel_class_booking(self.booking)
+        with self.assertRaises(NotFullError):
+            join_waitlist(self.first, self.schedule)
+
+    def test_cancel_promotes_head_of_queue(self):
+        """Test the freed seat goes to the first member, with an email"""
+        first = join_waitlist(self.first, self.schedule)
+        join_waitlist(self.second, self.schedule)
+
+        cancel_class_booking(self.booking)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'promoted')
+        self.assertTrue(Booking.objects.filter(user=self.first, class_schedule=self.schedule, status='confirmed').exists())
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_spots, 0)
+        self.assertTrue(QueuedEmail.objects.filter(to_email='first@example.com').exists())
+
+    def test_weekly_limit_skips_to_next(self):
+        """Test a member at their weekly limit is passed over"""
+        UserMembership.objects.filter(user=self.first).update(classes_used_this_week=1)
+        first = join_waitlist(self.first, self.schedule)
+        join_waitlist(self.second, self.schedule)
+
+        cancel_class_booking(self.booking)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'skipped')
+        self.assertTrue(Booking.objects.filter(user=self.second, class_schedule=self.schedule, status='confirmed').exists())
+
+    def test_views(self):
+        """Test joining from the schedule and seeing the position in My Bookings"""
+        client = Client()
+        client.login(username='first', password='testpass123')
+        response = client.post(reverse('bookings:join_waitlist', args=[self.schedule.id]))
+        self.assertRedirects(response, reverse('bookings:my_bookings'))
+        response = client.get(reverse('bookings:my_bookings'))
+        self.assertContains(response, '#1 in line')
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite specific')
+    def test_queue_lookups_use_index(self):
+        """Test the queue head and position are read from waitlist_queue_idx"""
+        entry = join_waitlist(self.first, self.schedule)
+        head = WaitlistEntry.objects.filter(class_schedule_id=self.schedule.id, status='waiting').order_by('id')
+        self.assertIn('waitlist_queue_idx', head.explain())
+        position = WaitlistEntry.objects.filter(
+            class_schedule_id=self.schedule.id, status='waiting', id__lte=entry.id
+        )
+        self.assertIn('waitlist_queue_idx', position.explain())
+
+
+class WaitlistLoadTests(TransactionTestCase):
+    """
+    Cancel every seat of a full class at once with a long waitlist behind it.
+
+    Like ConcurrentBookingTests this runs against the configured database;
+    set DATABASE_URL to exercise PostgreSQL row locking.
+    """
+
+    capacity = 20
+    waiting = 60
+
+    def setUp(self):
+        open_tier = MembershipTier.objects.create(
+            name='Unlimited',
+            description='Unlimited membership',
+            price=Decimal('80.00'),
+            classes_per_week=100,
+        )
+        limited_tier = MembershipTier.objects.create(
+            name='Single',
+            description='One class a week',
+            price=Decimal('10.00'),
+            classes_per_week=1,
+        )
+        User.objects.bulk_create([
+            User(username=f'member{i}') for i in range(self.capacity + self.waiting)
+        ])
+        users = list(User.objects.order_by('id'))
+        holders, self.waiters = users[:self.capacity], users[self.capacity:]
+        # Every third waiter has already used their single weekly class
+        self.limited = {user.id for user in self.waiters[::3]}
+        UserMembership.objects.bulk_create([
+            UserMembership(
+                user=user,
+                membership_tier=limited_tier if user.id in self.limited else open_tier,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+                status='active',
+                classes_used_this_week=1 if user.id in self.limited else 0,
+            )
+            for user in users
+        ])
+        memberships = {
+            membership.user_id: membership
+            for membership in UserMembership.objects.select_related('membership_tier')
+        }
+        self.schedule = make_schedule(max_capacity=self.capacity)
+        self.bookings = [book_class(user, self.schedule, memberships[user.id]) for user in holders]
+        for user in self.waiters:
+            join_waitlist(user, self.schedule)
+
+    def _cancel(self, booking):
+        return retry_locked(lambda: 'cancelled' if cancel_class_booking(booking) else 'noop')
+
+    def test_mass_cancellation_promotes_in_order(self):
+        """Test each freed seat goes to the next eligible member, never oversold"""
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(self._cancel, self.bookings))
+        self.assertNotIn('locked', results, 'a cancellation never got its lock')
+        self.assertEqual(results.count('cancelled'), self.capacity)
+
+        self.schedule.refresh_from_db()
+        confirmed = Booking.objects.filter(class_schedule=self.schedule, status='confirmed').count()
+        self.assertEqual(confirmed, self.capacity)
+        self.assertEqual(self.schedule.available_spots, 0)
+
+        entries = list(WaitlistEntry.objects.filter(class_schedule=self.schedule).order_by('id'))
+        promoted = [entry for entry in entries if entry.status == 'promoted']
+        skipped = [entry for entry in entries if entry.status == 'skipped']
+        # Every freed seat went to the next member in the queue who could take it
+        eligible = [user.id for user in self.waiters if user.id not in self.limited]
+        self.assertEqual([entry.user_id for entry in promoted], eligible[:self.capacity])
+        self.assertTrue(all(entry.user_id in self.limited for entry in skipped))
+
+        # Resolved entries are exactly the head of the queue
+        resolved = len(promoted) + len(skipped)
+        self.assertTrue(all(entry.status != 'waiting' for entry in entries[:resolved]))
+        self.assertTrue(all(entry.status == 'waiting' for entry in entries[resolved:]))
+
+
+class MyBookingsQueryTests(TestCase):
+    """Test My Bookings stays a fixed number of queries as history grows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        self.fitness_class = FitnessClass.objects.create(
+            name='Barre',
+            description='Ballet inspired',
+            duration=45,
+            instructor='Test Instructor',
+        )
+        self.client.login(username='member', password='testpass123')
+
+    def add_bookings(self, days, status='attended'):
+        for offset in days:
+            schedule = ClassSchedule.objects.create(
+                fitness_class=self.fitness_class,
+                date=date.today() + timedelta(days=offset),
+                start_time=time(9, 0),
+                end_time=time(9, 45),
+            )
+            Booking.objects.create(user=self.user, class_schedule=schedule, status=status)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bookings:my_bookings'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_is_independent_of_history(self):
+        """Test a member with a long history costs no more queries"""
+        self.add_bookings([-1, 1])
+        baseline, _ = self.count_queries()
+        # Session, user, current bookings, history count and page, waitlist
+        self.assertEqual(baseline, 6)
+
+        self.add_bookings(range(-200, -1))
+        self.add_bookings(range(2, 30), status='confirmed')
+        self.add_bookings(range(30, 40), status='cancelled')
+        queries, response = self.count_queries()
+
+        self.assertEqual(queries, baseline)
+        self.assertEqual(len(response.context['upcoming_bookings']), 29)
+        self.assertEqual(len(response.context['cancelled_bookings']), 10)
+        self.assertEqual(len(response.context['past_bookings']), 12)
+
+    def test_history_pages(self):
+        """Test older past bookings are reached through history_page"""
+        self.add_bookings(range(-30, 0))
+        response = self.client.get(reverse('bookings:my_bookings'), {'history_page': 3})
+        past = response.context['past_bookings']
+        self.assertEqual(past.number, 3)
+        self.assertEqual(len(past), 6)
+        self.assertEqual(past[0].class_date, date.today() - timedelta(days=25))
@@ -8,4 +8,7 @@ urlpatterns = [
     path('confirmation/<int:booking_id>/', views.booking_confirmation, name='booking_confirmation'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('cancel/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('calendar/<str:token>.ics', views.booking_feed, name='booking_feed'),
+    path('waitlist/join/<int:schedule_id>/', views.join_class_waitlist, name='join_waitlist'),
+    path('waitlist/leave/<int:entry_id>/', views.leave_class_waitlist, name='leave_waitlist'),
 ]
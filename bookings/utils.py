@@ -0,0 +1,321 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signing import BadSignature, Signer
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.template.loader import render_to_string
+from django.utils import timezone
+from checkout.models import QueuedEmail
+from classes.models import ClassSchedule
+from memberships.models import UserMembership
+from .models import Booking, WaitlistEntry
+
+
+class BookingError(Exception):
+    """Base class for bookings that cannot be made"""
+
+
+class ClassFullError(BookingError):
+    """No spots left on the schedule (or it is no longer active)"""
+
+
+class WeeklyLimitError(BookingError):
+    """Member has used all classes allowed by their tier this week"""
+
+
+class AlreadyBookedError(BookingError):
+    """Member already holds a live booking for the schedule"""
+
+
+class NotFullError(BookingError):
+    """The class still has spots, so it should be booked directly"""
+
+
+class AlreadyWaitlistedError(BookingError):
+    """Member is already waiting for the schedule"""
+
+
+def reserve_spot(schedule_id):
+    """
+    Take one spot on a schedule with a single conditional UPDATE.
+
+    Returns False when the class is full or inactive. The WHERE clause is
+    evaluated against the current row, so concurrent requests can never
+    push available_spots below zero.
+    """
+    return ClassSchedule.objects.filter(
+        pk=schedule_id,
+        is_active=True,
+        available_spots__gt=0,
+    ).update(available_spots=F('available_spots') - 1, updated_at=timezone.now()) == 1
+
+
+def release_spot(schedule_id):
+    """Give one spot back to a schedule"""
+    ClassSchedule.objects.filter(pk=schedule_id).update(
+        available_spots=F('available_spots') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def use_weekly_class(membership_id, classes_per_week):
+    """
+    Count one class against the member's weekly allowance.
+
+    Returns False when the allowance is already used up.
+    """
+    return UserMembership.objects.filter(
+        pk=membership_id,
+        classes_used_this_week__lt=classes_per_week,
+    ).update(classes_used_this_week=F('classes_used_this_week') + 1) == 1
+
+
+def release_weekly_class(user_id):
+    """Give one class back to the member's weekly allowance"""
+    UserMembership.objects.filter(
+        user_id=user_id,
+        classes_used_this_week__gt=0,
+    ).update(classes_used_this_week=F('classes_used_this_week') - 1)
+
+
+def iso_week_range(day):
+    """Return the (Monday, Sunday) of the ISO week containing `day`"""
+    monday = day - timedelta(days=day.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def weekly_bookings_count(user_id, day):
+    """
+    Count the member's live bookings for classes in the ISO week of `day`.
+
+    Served by booking_user_week_idx as a single index range scan.
+    """
+    return Booking.objects.filter(
+        user_id=user_id,
+        status__in=['confirmed', 'attended'],
+        class_date__range=iso_week_range(day),
+    ).count()
+
+
+def counts_this_week(class_date):
+    """
+    True if a class on `class_date` counts towards classes_used_this_week.
+
+    The counter holds the member's live bookings for classes in the current
+    ISO week; it is taken and refunded by class date, and recounted the
+    same way by `manage.py reset_weekly_classes`.
+    """
+    week_start, week_end = iso_week_range(timezone.localdate())
+    return settings.WEEKLY_CLASS_LIMIT_SOURCE == 'counter' and week_start <= class_date <= week_end
+
+
+def _take_weekly_allowance(user, schedule, user_membership):
+    classes_per_week = user_membership.membership_tier.classes_per_week
+    if counts_this_week(schedule.date):
+        return use_weekly_class(user_membership.pk, classes_per_week)
+    # Other weeks (and the 'bookings' source) count the member's bookings
+    # for the class's week. Lock the membership so two concurrent bookings
+    # cannot both pass the count
+    UserMembership.objects.select_for_update().filter(pk=user_membership.pk).first()
+    return weekly_bookings_count(user.pk, schedule.date) < classes_per_week
+
+
+def book_class(user, schedule, user_membership):
+    """
+    Book a class for a member, reserving the spot and weekly allowance
+    atomically. Raises a BookingError subclass if the booking is refused.
+
+    For classes in the current ISO week the allowance is the
+    classes_used_this_week counter by default; classes in other weeks, or
+    every class when WEEKLY_CLASS_LIMIT_SOURCE = 'bookings', are checked
+    against the member's bookings in the class's ISO week.
+    """
+    with transaction.atomic():
+        if not reserve_spot(schedule.pk):
+            raise ClassFullError()
+
+        if not _take_weekly_allowance(user, schedule, user_membership):
+            raise WeeklyLimitError()
+
+        # A cancelled booking keeps its row (user/class_schedule is unique),
+        # so rebooking the same class reactivates it.
+        booking, created = Booking.objects.get_or_create(
+            user=user,
+            class_schedule=schedule,
+            defaults={'status': 'confirmed', 'class_date': schedule.date},
+        )
+        if not created:
+            if booking.status in ['confirmed', 'attended']:
+                raise AlreadyBookedError()
+            booking.status = 'confirmed'
+            booking.booking_date = timezone.now()
+            booking.save(update_fields=['status', 'booking_date'])
+
+    return booking
+
+
+def cancel_class_booking(booking):
+    """
+    Cancel a booking and return its spot to the schedule.
+
+    Returns False if the booking was already cancelled by a concurrent
+    request, in which case nothing is released. With the counter, the
+    weekly allowance is returned when the class is in the current ISO
+    week, the same bookings the counter was taken for.
+    """
+    with transaction.atomic():
+        cancelled = Booking.objects.filter(
+            pk=booking.pk,
+        ).exclude(status='cancelled').update(status='cancelled') == 1
+        if cancelled:
+            release_spot(booking.class_schedule_id)
+            if counts_this_week(booking.class_date):
+                release_weekly_class(booking.user_id)
+            # Hand the seat straight on, before anyone else can take it
+            promote_from_waitlist(booking.class_schedule_id)
+            booking.status = 'cancelled'
+    return cancelled
+
+
+def join_waitlist(user, schedule):
+    """
+    Queue a member for a full class.
+
+    Raises NotFullError if a spot is free, AlreadyBookedError if the member
+    holds a booking, and AlreadyWaitlistedError if they are already queued.
+    """
+    if Booking.objects.filter(
+        user=user,
+        class_schedule=schedule,
+        status__in=['confirmed', 'attended'],
+    ).exists():
+        raise AlreadyBookedError()
+
+    if ClassSchedule.objects.filter(pk=schedule.pk, available_spots__gt=0).exists():
+        raise NotFullError()
+
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(user=user, class_schedule=schedule)
+    except IntegrityError:
+        raise AlreadyWaitlistedError()
+
+
+def leave_waitlist(entry):
+    """Take a member out of the queue; returns False if they were no longer waiting"""
+    return WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(
+        status='left',
+        resolved_at=timezone.now(),
+    ) == 1
+
+
+def waitlist_position(entry):
+    """1-based place in the queue, counted on waitlist_queue_idx"""
+    return WaitlistEntry.objects.filter(
+        class_schedule_id=entry.class_schedule_id,
+        status='waiting',
+        id__lte=entry.id,
+    ).count()
+
+
+def with_waitlist_positions(entries):
+    """Annotate waiting entries with their `position` in one query"""
+    ahead = WaitlistEntry.objects.filter(
+        class_schedule_id=OuterRef('class_schedule_id'),
+        status='waiting',
+        id__lte=OuterRef('id'),
+    ).order_by().values('class_schedule_id').annotate(count=Count('id')).values('count')
+    return entries.annotate(position=Subquery(ahead))
+
+
+def _resolve_entry(entry, status):
+    entry.status = status
+    entry.resolved_at = timezone.now()
+    entry.save(update_fields=['status', 'resolved_at'])
+
+
+def promote_from_waitlist(schedule_id):
+    """
+    Book the first waiting member who can take a freed seat.
+
+    Call inside the transaction that released the seat. Members without an
+    active membership, or at their weekly limit, are skipped and the next
+    in line is tried. Returns the new booking, or None if nobody could
+    take the seat (or it was taken in the meantime).
+    """
+    schedule = ClassSchedule.objects.select_related('fitness_class').get(pk=schedule_id)
+    today = timezone.now().date()
+    if not schedule.is_active or schedule.date < today:
+        return None
+
+    while True:
+        # skip_locked lets concurrent cancellations promote different members
+        entry = WaitlistEntry.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            class_schedule_id=schedule_id,
+            status='waiting',
+        ).select_related('user').order_by('id').first()
+        if entry is None:
+            return None
+
+        membership = UserMembership.objects.select_related('membership_tier').filter(
+            user=entry.user,
+            status='active',
+            end_date__gte=today,
+            membership_tier__isnull=False,
+        ).first()
+        if membership is None:
+            _resolve_entry(entry, 'skipped')
+            continue
+
+        try:
+            with transaction.atomic():
+                booking = book_class(entry.user, schedule, membership)
+        except ClassFullError:
+            return None
+        except (WeeklyLimitError, AlreadyBookedError):
+            _resolve_entry(entry, 'skipped')
+            continue
+
+        _resolve_entry(entry, 'promoted')
+        _queue_promotion_email(entry, booking)
+        return booking
+
+
+def _queue_promotion_email(entry, booking):
+    """Tell the member they got the seat, via the email outbox"""
+    if not entry.user.email:
+        return
+    context = {'user': entry.user, 'booking': booking, 'schedule': booking.class_schedule}
+    QueuedEmail.objects.create(
+        key=f'waitlist-promotion-{entry.pk}',
+        subject=render_to_string('bookings/waitlist_emails/promotion_email_subject.txt', context).strip(),
+        body=render_to_string('bookings/waitlist_emails/promotion_email_body.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL or '',
+        to_email=entry.user.email,
+    )
+
+
+def _calendar_feed_signer(user):
+    # Salting with the password hash revokes old feed URLs on password change
+    return Signer(salt=f'bookings.calendar_feed:{user.password}')
+
+
+def calendar_feed_token(user):
+    """Opaque token for a member's private bookings calendar URL"""
+    return _calendar_feed_signer(user).sign(str(user.pk))
+
+
+def user_for_calendar_token(token):
+    """Return the active user a calendar token belongs to, or None"""
+    user_id = token.split(':', 1)[0]
+    if not user_id.isdigit():
+        return None
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return None
+    try:
+        _calendar_feed_signer(user).unsign(token)
+    except BadSignature:
+        return None
+    return user
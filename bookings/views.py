@@ -1,11 +1,29 @@
+from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Sum
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from classes.catalog import get_catalog_version
+from classes.ical import schedule_event, stream_calendar
 from classes.models import ClassSchedule
 from memberships.models import UserMembership
-from .models import Booking
+from .models import Booking, WaitlistEntry
+from .utils import (
+    book_class, cancel_class_booking, calendar_feed_token, user_for_calendar_token,
+    join_waitlist, leave_waitlist, with_waitlist_positions,
+    ClassFullError, WeeklyLimitError, AlreadyBookedError, NotFullError, AlreadyWaitlistedError,
+)
+
+# How far back a member's calendar feed reaches
+CALENDAR_FEED_PAST_DAYS = 30
+
+MY_BOOKINGS_HISTORY_PER_PAGE = 12
 
 
 @login_required
@@ -27,12 +45,8 @@ def create_booking(request, schedule_id):
         messages.error(request, 'Your membership is incomplete. Please contact support.')
         return redirect('memberships:membership_plans')
 
-    if user_membership.classes_used_this_week >= user_membership.membership_tier.classes_per_week:
-        messages.error(request, f'You have reached your weekly class limit ({user_membership.membership_tier.classes_per_week} classes). Upgrade your membership for more classes.')
-        return redirect('memberships:membership_plans')
-
     if schedule.available_spots <= 0:
-        messages.error(request, 'Sorry, this class is full. Please choose another time.')
+        messages.error(request, 'Sorry, this class is full. Join the waitlist to be booked automatically if a spot opens.')
         return redirect('class_schedule_list')
 
     if not schedule.is_active:
@@ -49,18 +63,17 @@ def create_booking(request, schedule_id):
         messages.warning(request, 'You have already booked this class.')
         return redirect('bookings:my_bookings')
 
-    with transaction.atomic():
-        Booking.objects.create(
-            user=request.user,
-            class_schedule=schedule,
-            status='confirmed'
-        )
-
-        schedule.available_spots -= 1
-        schedule.save()
-
-        user_membership.classes_used_this_week += 1
-        user_membership.save()
+    try:
+        book_class(request.user, schedule, user_membership)
+    except ClassFullError:
+        messages.error(request, 'Sorry, this class is full. Join the waitlist to be booked automatically if a spot opens.')
+        return redirect('class_schedule_list')
+    except WeeklyLimitError:
+        messages.error(request, f'You have reached your weekly class limit ({user_membership.membership_tier.classes_per_week} classes). Upgrade your membership for more classes.')
+        return redirect('memberships:membership_plans')
+    except AlreadyBookedError:
+        messages.warning(request, 'You have already booked this class.')
+        return redirect('bookings:my_bookings')
 
     messages.success(request, f'Successfully booked {schedule.fitness_class.name} on {schedule.date}!')
     return redirect('bookings:my_bookings')
@@ -82,30 +95,42 @@ def booking_confirmation(request, booking_id):
 def my_bookings(request):
     """View to display user's bookings"""
     now = timezone.now()
+    today = now.date()
 
-    # Get upcoming bookings (future dates, confirmed or attended status)
-    upcoming_bookings = Booking.objects.filter(
+    # One query for everything from today on, split into upcoming and cancelled
+    current_bookings = Booking.objects.filter(
         user=request.user,
-        class_schedule__date__gte=now.date(),
-        status__in=['confirmed', 'attended']
-    ).select_related('class_schedule', 'class_schedule__fitness_class').order_by('class_schedule__date', 'class_schedule__start_time')
-
-    # Get past bookings
+        class_date__gte=today,
+    ).select_related('class_schedule', 'class_schedule__fitness_class').order_by(
+        'class_date', 'class_schedule__start_time'
+    )
+    upcoming_bookings = []
+    cancelled_bookings = []
+    for booking in current_bookings:
+        if booking.status in ['confirmed', 'attended']:
+            upcoming_bookings.append(booking)
+        elif booking.status == 'cancelled':
+            cancelled_bookings.append(booking)
+
+    # Past bookings are paginated so long histories are never loaded in full
     past_bookings = Booking.objects.filter(
         user=request.user,
-        class_schedule__date__lt=now.date()
-    ).select_related('class_schedule', 'class_schedule__fitness_class').order_by('-class_schedule__date', '-class_schedule__start_time')
-
-    # Get cancelled bookings
-    cancelled_bookings = Booking.objects.filter(
-        user=request.user,
-        status='cancelled'
-    ).select_related('class_schedule', 'class_schedule__fitness_class').order_by('-class_schedule__date', '-class_schedule__start_time')
+        class_date__lt=today,
+    ).select_related('class_schedule', 'class_schedule__fitness_class').order_by(
+        '-class_date', '-class_schedule__start_time', '-id'
+    )
+    past_page = Paginator(past_bookings, MY_BOOKINGS_HISTORY_PER_PAGE).get_page(request.GET.get('history_page'))
 
     context = {
         'upcoming_bookings': upcoming_bookings,
-        'past_bookings': past_bookings,
+        'past_bookings': past_page,
         'cancelled_bookings': cancelled_bookings,
+        'waitlist_entries': with_waitlist_positions(
+            WaitlistEntry.objects.filter(user=request.user, status='waiting')
+        ).select_related('class_schedule', 'class_schedule__fitness_class').order_by('class_schedule__date'),
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('bookings:booking_feed', args=[calendar_feed_token(request.user)])
+        ),
         'now': now,
     }
 
@@ -128,16 +153,9 @@ def cancel_booking(request, booking_id):
         return redirect('bookings:my_bookings')
 
     if request.method == 'POST':
-        # Use transaction to ensure data consistency
-        with transaction.atomic():
-            # Update booking status
-            booking.status = 'cancelled'
-            booking.save()
-
-            # Restore available spot
-            schedule = booking.class_schedule
-            schedule.available_spots += 1
-            schedule.save()
+        if not cancel_class_booking(booking):
+            messages.warning(request, 'This booking is already cancelled.')
+            return redirect('bookings:my_bookings')
 
         messages.success(request, f'Your booking for {booking.class_schedule.fitness_class.name} on {booking.class_schedule.date} has been cancelled.')
         return redirect('bookings:my_bookings')
@@ -147,3 +165,112 @@ def cancel_booking(request, booking_id):
     }
 
     return render(request, 'bookings/cancel_booking.html', context)
+
+
+@login_required
+@require_POST
+def join_class_waitlist(request, schedule_id):
+    """Queue the member for a full class"""
+    schedule = get_object_or_404(ClassSchedule, pk=schedule_id, is_active=True)
+
+    if schedule.date < timezone.now().date():
+        messages.error(request, 'This class has already taken place.')
+        return redirect('class_schedule_list')
+
+    try:
+        join_waitlist(request.user, schedule)
+    except NotFullError:
+        messages.info(request, 'A spot is available, so you can book this class now.')
+        return redirect('class_schedule_list')
+    except AlreadyBookedError:
+        messages.warning(request, 'You have already booked this class.')
+        return redirect('bookings:my_bookings')
+    except AlreadyWaitlistedError:
+        messages.info(request, 'You are already on the waitlist for this class.')
+        return redirect('bookings:my_bookings')
+
+    messages.success(request, f'You are on the waitlist for {schedule.fitness_class.name} on {schedule.date}. We will book you in and email you if a spot opens.')
+    return redirect('bookings:my_bookings')
+
+
+@login_required
+@require_POST
+def leave_class_waitlist(request, entry_id):
+    """Remove the member from a class waitlist"""
+    entry = get_object_or_404(WaitlistEntry, pk=entry_id, user=request.user)
+    if leave_waitlist(entry):
+        messages.success(request, 'You have left the waitlist.')
+    else:
+        messages.warning(request, 'You are no longer on this waitlist.')
+    return redirect('bookings:my_bookings')
+
+
+def _feed_bookings(request, token):
+    """The token owner's live bookings from the last month onwards, or None"""
+    if not hasattr(request, '_feed_bookings'):
+        bookings = None
+        user = user_for_calendar_token(token)
+        if user is not None:
+            bookings = Booking.objects.filter(
+                user=user,
+                status__in=['confirmed', 'attended'],
+                class_schedule__date__gte=timezone.now().date() - timedelta(days=CALENDAR_FEED_PAST_DAYS),
+            )
+        request._feed_bookings = bookings
+    return request._feed_bookings
+
+
+def _feed_state(request, token):
+    if not hasattr(request, '_feed_state'):
+        bookings = _feed_bookings(request, token)
+        request._feed_state = None if bookings is None else bookings.aggregate(
+            count=Count('id'),
+            id_sum=Sum('id'),
+            last_modified=Max('class_schedule__updated_at'),
+        )
+    return request._feed_state
+
+
+def _feed_etag(request, token):
+    state = _feed_state(request, token)
+    if state is None:
+        return None
+    last_modified = state['last_modified'].timestamp() if state['last_modified'] else 0
+    return f'{get_catalog_version()}:{state["count"]}:{state["id_sum"]}:{last_modified}'
+
+
+def _feed_last_modified(request, token):
+    state = _feed_state(request, token)
+    return state['last_modified'] if state else None
+
+
+@require_GET
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def booking_feed(request, token):
+    """Stream a member's bookings as a private iCalendar feed"""
+    bookings = _feed_bookings(request, token)
+    if bookings is None:
+        raise Http404('Unknown calendar feed')
+
+    bookings = bookings.select_related(
+        'class_schedule', 'class_schedule__fitness_class'
+    ).order_by('class_schedule__date', 'class_schedule__start_time')
+    host = request.get_host()
+    base_url = request.build_absolute_uri('/')[:-1]
+
+    events = (
+        schedule_event(
+            booking.class_schedule,
+            uid=f'booking-{booking.id}@{host}',
+            url=base_url + reverse('bookings:booking_confirmation', args=[booking.id]),
+        )
+        for booking in bookings.iterator(chunk_size=500)
+    )
+    response = StreamingHttpResponse(
+        stream_calendar('My FitForge classes', events),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="fitforge-bookings.ics"'
+    # The URL is the credential, so keep it out of shared caches
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderLineItem
+from .models import Order, OrderLineItem, QueuedEmail
 
 
 class OrderLineItemAdminInline(admin.TabularInline):
@@ -12,13 +12,13 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = (OrderLineItemAdminInline,)
 
     readonly_fields = ('order_number', 'date', 'order_total',
-                       'delivery_cost', 'grand_total')
+                       'delivery_cost', 'grand_total', 'stripe_pid')
 
     fields = ('order_number', 'user', 'date', 'full_name',
               'email', 'phone_number', 'street_address1',
               'street_address2', 'town_or_city', 'county',
               'postcode', 'country', 'order_total',
-              'delivery_cost', 'grand_total')
+              'delivery_cost', 'grand_total', 'stripe_pid')
 
     list_display = ('order_number', 'date', 'full_name',
                     'order_total', 'delivery_cost', 'grand_total')
@@ -27,3 +27,15 @@ class OrderAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Order, OrderAdmin)
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to_email', 'status', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject', 'key')
+    readonly_fields = ('key', 'order', 'created', 'sent_at', 'last_error')
+    ordering = ('-created',)
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
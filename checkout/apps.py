@@ -1,4 +1,6 @@
+import stripe
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CheckoutConfig(AppConfig):
@@ -7,3 +9,6 @@ class CheckoutConfig(AppConfig):
 
     def ready(self):
         from . import signals  # noqa: F401
+
+        if settings.STRIPE_API_BASE:
+            stripe.api_base = settings.STRIPE_API_BASE
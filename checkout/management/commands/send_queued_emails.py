@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from checkout.models import QueuedEmail
+from checkout.utils import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails (order confirmations) in batches over one mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Maximum number of emails to send per batch',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, polling for new emails',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty (with --loop)',
+        )
+        parser.add_argument(
+            '--backend',
+            default=None,
+            help='Email backend to use instead of EMAIL_BACKEND',
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = send_queued_emails(
+                batch_size=options['batch_size'],
+                backend=options['backend'],
+            )
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        pending = QueuedEmail.objects.filter(status='pending').count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Sent {total_sent} emails, {total_failed} failed, {pending} still pending'
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0002_auto_20260303_2231'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stripe_pid',
+            field=models.CharField(blank=True, default=None, help_text='Stripe PaymentIntent ID, used to match webhooks to orders', max_length=254, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0003_order_stripe_pid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Idempotency key, so the same email is never queued twice', max_length=100, unique=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=254)),
+                ('to_email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='queued_emails', to='checkout.order')),
+            ],
+            options={
+                'verbose_name_plural': 'Queued Emails',
+                'ordering': ['next_attempt_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='queuedemail',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='checkout_qu_status_285b72_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models import Sum
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 from products.models import Product
 from memberships.models import MembershipTier
@@ -36,6 +37,10 @@ class Order(models.Model):
     grand_total = models.DecimalField(
         max_digits=10, decimal_places=2, null=False, default=0
     )
+    stripe_pid = models.CharField(
+        max_length=254, null=True, blank=True, unique=True, default=None,
+        help_text='Stripe PaymentIntent ID, used to match webhooks to orders'
+    )
 
     def _generate_order_number(self):
         """Generate a random, unique order number using UUID"""
@@ -84,12 +89,16 @@ class OrderLineItem(models.Model):
         max_digits=6, decimal_places=2, null=False, blank=False, editable=False
     )
 
-    def save(self, *args, **kwargs):
-        """Override save to calculate lineitem total"""
+    def calculate_total(self):
+        """Set lineitem total from the product or membership price"""
         if self.product:
             self.lineitem_total = self.product.price * self.quantity
         elif self.membership:
             self.lineitem_total = self.membership.price * self.quantity
+
+    def save(self, *args, **kwargs):
+        """Override save to calculate lineitem total"""
+        self.calculate_total()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -97,3 +106,41 @@ class OrderLineItem(models.Model):
             return f'SKU {self.product.sku} on order {self.order.order_number}'
         else:
             return f'{self.membership.name} on order {self.order.order_number}'
+
+
+class QueuedEmail(models.Model):
+    """Outgoing email waiting to be delivered by the send_queued_emails worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    key = models.CharField(
+        max_length=100, unique=True,
+        help_text='Idempotency key, so the same email is never queued twice'
+    )
+    order = models.ForeignKey(
+        Order, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='queued_emails'
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to_email = models.EmailField(max_length=254)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Queued Emails'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {self.to_email} ({self.status})'
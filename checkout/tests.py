@@ -1,10 +1,24 @@
-from django.test import TestCase, Client
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
+from io import StringIO
 from unittest.mock import patch, Mock
 from decimal import Decimal
-from checkout.models import Order, OrderLineItem
+from checkout.models import Order, OrderLineItem, QueuedEmail
 from products.models import Product
+from memberships.models import MembershipTier
+from checkout.utils import (
+    add_line_items_to_order,
+    queue_order_confirmation_email,
+    send_queued_emails,
+)
+from checkout.webhook_handler import StripeWH_Handler
+import json
+import stripe
 
 
 class OrderModelTest(TestCase):
@@ -118,3 +132,311 @@ class CheckoutViewTest(TestCase):
         url = reverse('checkout:checkout_success', args=[order.order_number])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+
+
+class OrderBuilderTest(TestCase):
+    """Test bulk line item creation for orders"""
+
+    def setUp(self):
+        self.order = Order.objects.create(
+            full_name='Test User',
+            email='test@test.com',
+            phone_number='1234567890',
+            street_address1='123 Test St',
+            town_or_city='Test City',
+            country='Test Country'
+        )
+        self.products = [
+            Product.objects.create(sku=f'BULK{i}', name=f'Product {i}', price=Decimal('4.00'))
+            for i in range(15)
+        ]
+        self.membership = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=3,
+        )
+
+    def test_query_count_independent_of_line_items(self):
+        """Test a 15 item order is built with a constant number of queries"""
+        bag = {str(product.id): 2 for product in self.products}
+        with self.assertNumQueries(8):
+            add_line_items_to_order(self.order, bag, str(self.membership.id))
+        self.assertEqual(self.order.lineitems.count(), 16)
+        self.assertEqual(self.order.order_total, Decimal('150.00'))
+        self.assertEqual(self.order.delivery_cost, Decimal('0.00'))
+        self.assertEqual(self.order.grand_total, Decimal('150.00'))
+
+    def test_delivery_added_below_threshold(self):
+        """Test delivery is charged once for small product orders"""
+        add_line_items_to_order(self.order, {str(self.products[0].id): 1})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_total, Decimal('4.00'))
+        self.assertGreater(self.order.delivery_cost, 0)
+
+    def test_missing_product_creates_nothing(self):
+        """Test a deleted product aborts without partial line items"""
+        bag = {str(self.products[0].id): 1, '999999': 1}
+        with self.assertRaises(Product.DoesNotExist):
+            add_line_items_to_order(self.order, bag)
+        self.assertFalse(self.order.lineitems.exists())
+
+    def test_admin_edit_still_updates_total(self):
+        """Test saving a single line item keeps recalculating the order"""
+        add_line_items_to_order(self.order, {str(self.products[0].id): 1})
+        line_item = self.order.lineitems.get()
+        line_item.quantity = 20
+        line_item.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_total, Decimal('80.00'))
+
+
+def make_payment_intent_event(pid, bag, membership_id=''):
+    """Build a payment_intent.succeeded event as Stripe would send it"""
+    return stripe.Event.construct_from({
+        'id': 'evt_test',
+        'type': 'payment_intent.succeeded',
+        'data': {'object': {
+            'id': pid,
+            'object': 'payment_intent',
+            'metadata': {
+                'bag': json.dumps(bag),
+                'membership_id': membership_id,
+                'save_info': 'false',
+                'username': 'AnonymousUser',
+                'user_id': '',
+            },
+            'charges': {'data': [{
+                'amount': 5000,
+                'billing_details': {
+                    'name': 'Test User',
+                    'email': 'test@test.com',
+                    'phone': '1234567890',
+                    'address': {
+                        'line1': '123 Test St',
+                        'line2': '',
+                        'city': 'Test City',
+                        'state': '',
+                        'postal_code': '',
+                        'country': 'IE',
+                    },
+                },
+            }]},
+        }},
+    }, 'sk_test')
+
+
+class PaymentIntentIdempotencyTest(TestCase):
+    """Test orders are matched to Stripe payment intents by id"""
+
+    def setUp(self):
+        self.client = Client()
+        self.product = Product.objects.create(sku='PI1', name='Test Product', price=Decimal('25.00'))
+        self.bag = {str(self.product.id): 2}
+
+    @patch('checkout.webhook_handler.queue_order_confirmation_email')
+    def test_webhook_creates_order_keyed_by_intent(self, mock_email):
+        """Test the webhook creates the order once, without waiting"""
+        handler = StripeWH_Handler(request=None)
+        event = make_payment_intent_event('pi_new', self.bag)
+
+        response = handler.handle_payment_intent_succeeded(event)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Created order in webhook', response.content.decode())
+        order = Order.objects.get(stripe_pid='pi_new')
+        self.assertEqual(order.lineitems.count(), 1)
+
+        response = handler.handle_payment_intent_succeeded(event)
+        self.assertIn('Verified order already in database', response.content.decode())
+        self.assertEqual(Order.objects.filter(stripe_pid='pi_new').count(), 1)
+        mock_email.assert_called_once()
+
+    @patch('checkout.webhook_handler.queue_order_confirmation_email')
+    def test_webhook_finds_checkout_order(self, mock_email):
+        """Test the webhook recognises an order created by checkout"""
+        Order.objects.create(
+            full_name='Someone Else',
+            email='other@test.com',
+            phone_number='1',
+            street_address1='1 St',
+            town_or_city='City',
+            country='Country',
+            stripe_pid='pi_existing',
+        )
+        handler = StripeWH_Handler(request=None)
+        response = handler.handle_payment_intent_succeeded(
+            make_payment_intent_event('pi_existing', self.bag)
+        )
+        self.assertIn('Verified order already in database', response.content.decode())
+        self.assertEqual(Order.objects.count(), 1)
+        mock_email.assert_not_called()
+
+    def test_checkout_post_reuses_webhook_order(self):
+        """Test checkout redirects to the order the webhook already created"""
+        session = self.client.session
+        session['bag'] = self.bag
+        session['checkout_pid'] = 'pi_checkout'
+        session.save()
+        form_data = {
+            'full_name': 'Test User',
+            'email': 'test@test.com',
+            'phone_number': '1234567890',
+            'street_address1': '123 Test St',
+            'town_or_city': 'Test City',
+            'country': 'Ireland',
+            'client_secret': 'pi_checkout_secret_abc',
+        }
+        response = self.client.post(reverse('checkout:checkout'), form_data)
+        order = Order.objects.get(stripe_pid='pi_checkout')
+        self.assertRedirects(
+            response,
+            reverse('checkout:checkout_success', args=[order.order_number]),
+            fetch_redirect_response=False,
+        )
+
+        self.client.post(reverse('checkout:checkout'), form_data)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @patch('checkout.views.activate_membership_for_order')
+    def test_forged_client_secret_is_refused(self, mock_activate):
+        """Test a client_secret from another session cannot open that session's order"""
+        order = Order.objects.create(
+            full_name='Someone Else',
+            email='other@test.com',
+            phone_number='1',
+            street_address1='1 Private Road',
+            town_or_city='City',
+            country='Country',
+            stripe_pid='pi_victim',
+        )
+        session = self.client.session
+        session['bag'] = self.bag
+        session['checkout_pid'] = 'pi_mine'
+        session.save()
+
+        response = self.client.post(reverse('checkout:checkout'), {
+            'full_name': 'Attacker',
+            'email': 'attacker@test.com',
+            'phone_number': '1',
+            'street_address1': '1 St',
+            'town_or_city': 'City',
+            'country': 'Ireland',
+            'client_secret': 'pi_victim_secret_guess',
+        })
+        self.assertRedirects(response, reverse('checkout:checkout'), fetch_redirect_response=False)
+        self.assertEqual(list(Order.objects.all()), [order])
+        mock_activate.assert_not_called()
+
+        response = self.client.post(reverse('checkout:cache_checkout_data'), {
+            'client_secret': 'pi_victim_secret_guess',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    @patch('stripe.PaymentIntent.create')
+    def test_payment_intent_is_bound_to_session(self, mock_create):
+        """Test the intent created for a session is the one checkout accepts"""
+        mock_create.return_value = Mock(id='pi_session', client_secret='pi_session_secret_abc')
+        session = self.client.session
+        session['bag'] = self.bag
+        session.save()
+        self.client.post(reverse('checkout:create_payment_intent'))
+        self.assertEqual(self.client.session['checkout_pid'], 'pi_session')
+
+
+class EmailQueueTest(TestCase):
+    """Test confirmation emails are queued and delivered out of band"""
+
+    def setUp(self):
+        self.product = Product.objects.create(sku='MAIL1', name='Test Product', price=Decimal('25.00'))
+        self.order = Order.objects.create(
+            full_name='Test User',
+            email='test@test.com',
+            phone_number='1234567890',
+            street_address1='123 Test St',
+            town_or_city='Test City',
+            country='Test Country'
+        )
+        add_line_items_to_order(self.order, {str(self.product.id): 1})
+
+    def test_checkout_success_queues_without_sending(self):
+        """Test checkout success does not talk to the mail server"""
+        url = reverse('checkout:checkout_success', args=[self.order.order_number])
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.filter(order=self.order, status='pending').count(), 1)
+
+    def test_order_is_queued_once(self):
+        """Test checkout and webhook cannot queue the same email twice"""
+        _, created = queue_order_confirmation_email(self.order)
+        self.assertTrue(created)
+        _, created = queue_order_confirmation_email(self.order)
+        self.assertFalse(created)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+    def test_batch_sent_over_one_connection(self):
+        """Test the worker delivers a batch through a single connection"""
+        queue_order_confirmation_email(self.order)
+        for i in range(3):
+            QueuedEmail.objects.create(
+                key=f'extra-{i}', subject='Hello', body='Body',
+                from_email='fitforge@example.com', to_email=f'user{i}@test.com',
+            )
+        with patch('checkout.utils.get_connection', wraps=mail.get_connection) as mock_connection:
+            sent, failed = send_queued_emails()
+        mock_connection.assert_called_once()
+        self.assertEqual((sent, failed), (4, 0))
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(QueuedEmail.objects.filter(status='pending').exists())
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_then_given_up(self):
+        """Test failed sends back off and eventually stop retrying"""
+        email, _ = queue_order_confirmation_email(self.order)
+        with patch('django.core.mail.EmailMessage.send', side_effect=OSError('relay down')):
+            self.assertEqual(send_queued_emails(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, 'pending')
+            self.assertGreater(email.next_attempt_at, email.created)
+
+            QueuedEmail.objects.filter(pk=email.pk).update(next_attempt_at=email.created)
+            send_queued_emails()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.attempts, 2)
+        self.assertIn('relay down', email.last_error)
+
+    def test_crash_mid_batch_keeps_delivered_mail_sent(self):
+        """Test a worker dying mid-batch neither resends nor releases its claim early"""
+        queue_order_confirmation_email(self.order)
+        QueuedEmail.objects.create(
+            key='extra', subject='Hello', body='Body',
+            from_email='fitforge@example.com', to_email='user@test.com',
+        )
+        deliver = EmailMessage.send
+
+        def send_then_crash(message, *args, **kwargs):
+            if mail.outbox:
+                raise SystemExit
+            return deliver(message, *args, **kwargs)
+
+        with patch.object(EmailMessage, 'send', autospec=True, side_effect=send_then_crash):
+            with self.assertRaises(SystemExit):
+                send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(QueuedEmail.objects.filter(status='sent').count(), 1)
+        # The other email stays claimed, so an immediate rerun leaves it alone
+        self.assertEqual(send_queued_emails(), (0, 0))
+        QueuedEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_management_command_drains_queue(self):
+        """Test the worker command sends everything that is due"""
+        queue_order_confirmation_email(self.order)
+        out = StringIO()
+        call_command('send_queued_emails', stdout=out)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@test.com'])
+        self.assertIn('Sent 1 emails', out.getvalue())
@@ -1,11 +1,20 @@
-from datetime import date
+import logging
+from datetime import date, timedelta
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.template.loader import render_to_string
+from django.utils import timezone
 
-from memberships.models import UserMembership
+from memberships.models import MembershipTier, UserMembership
+from products.models import Product
+
+from .models import OrderLineItem, QueuedEmail
+
+logger = logging.getLogger(__name__)
 
 
 def _calculate_membership_end_date(start_date, duration):
@@ -17,6 +26,39 @@ def _calculate_membership_end_date(start_date, duration):
     return start_date + relativedelta(months=1)
 
 
+def add_line_items_to_order(order, bag, membership_id=None):
+    """
+    Create all line items for an order in bulk and total it once.
+
+    Products are fetched in a single query and line items are inserted with
+    bulk_create, which skips the per-item post_save total recalculation
+    (that signal still covers edits made through the admin). Raises
+    Product.DoesNotExist or MembershipTier.DoesNotExist if anything in the
+    bag no longer exists, leaving no line items behind.
+    """
+    products = Product.objects.in_bulk([int(item_id) for item_id in bag])
+    line_items = []
+
+    for item_id, quantity in bag.items():
+        product = products.get(int(item_id))
+        if product is None:
+            raise Product.DoesNotExist(f'Product {item_id} does not exist.')
+        line_items.append(OrderLineItem(order=order, product=product, quantity=quantity))
+
+    if membership_id:
+        membership = MembershipTier.objects.get(id=membership_id)
+        line_items.append(OrderLineItem(order=order, membership=membership, quantity=1))
+
+    for line_item in line_items:
+        line_item.calculate_total()
+
+    with transaction.atomic():
+        OrderLineItem.objects.bulk_create(line_items)
+        order.update_total()
+
+    return line_items
+
+
 def activate_membership_for_order(order):
     """Activate/update membership for authenticated user when order contains a membership."""
     if not order.user:
@@ -48,21 +90,40 @@ def activate_membership_for_order(order):
             'end_date': _calculate_membership_end_date(today, membership_tier.duration),
             'status': 'active',
             'auto_renew': True,
+            'renewal_due': False,
             'classes_used_this_week': 0,
         },
     )
     return True
 
 
-def send_order_confirmation_email(order):
-    """Send confirmation email for checkout orders (products and/or membership)."""
-    has_products = order.lineitems.filter(product__isnull=False).exists()
-    has_membership = order.lineitems.filter(membership__isnull=False).exists()
-    membership_only = has_membership and not has_products
+def get_line_items(order):
+    """
+    Return the order's line items with their product and membership.
+
+    They are prefetched onto the order, so templates iterating
+    order.lineitems.all reuse them instead of looking up each item's
+    product; repeat calls for the same order object cost nothing.
+    """
+    prefetch_related_objects(
+        [order],
+        Prefetch('lineitems', queryset=OrderLineItem.objects.select_related('product', 'membership')),
+    )
+    return order.lineitems.all()
 
-    membership_item = order.lineitems.select_related('membership').filter(
-        membership__isnull=False
-    ).first()
+
+def is_membership_only(order):
+    """True when the order contains a membership and no products."""
+    line_items = get_line_items(order)
+    has_products = any(item.product_id for item in line_items)
+    has_membership = any(item.membership_id for item in line_items)
+    return has_membership and not has_products
+
+
+def _render_order_confirmation_email(order):
+    """Render the subject and body of an order confirmation email."""
+    membership_only = is_membership_only(order)
+    membership_item = next((item for item in get_line_items(order) if item.membership_id), None)
 
     subject = render_to_string(
         'checkout/confirmation_emails/confirmation_email_subject.txt',
@@ -83,9 +144,110 @@ def send_order_confirmation_email(order):
         },
     )
 
-    send_mail(
-        subject,
-        body,
-        settings.DEFAULT_FROM_EMAIL,
-        [order.email],
-    )
+    return subject, body
+
+
+def queue_order_confirmation_email(order):
+    """
+    Queue the confirmation email for an order (products and/or membership).
+
+    Delivery happens out of band in the send_queued_emails worker, so a slow
+    mail relay never holds up checkout. Each order is queued at most once,
+    even if both checkout and the webhook ask for it.
+    """
+    key = f'order-confirmation-{order.order_number}'
+    existing = QueuedEmail.objects.filter(key=key).first()
+    if existing:
+        return existing, False
+
+    subject, body = _render_order_confirmation_email(order)
+    try:
+        with transaction.atomic():
+            return QueuedEmail.objects.create(
+                key=key,
+                order=order,
+                subject=subject,
+                body=body,
+                from_email=settings.DEFAULT_FROM_EMAIL or '',
+                to_email=order.email,
+            ), True
+    except IntegrityError:
+        return QueuedEmail.objects.get(key=key), False
+
+
+def send_queued_emails(batch_size=None, backend=None):
+    """
+    Deliver one batch of due emails over a single mail connection.
+
+    The batch is claimed in a short transaction by moving its
+    next_attempt_at EMAIL_OUTBOX_CLAIM_SECONDS ahead, so other workers skip
+    it, then sent with no transaction or row locks held. Each result is
+    saved as soon as it is known, so a worker that dies mid-batch never
+    resends what it already delivered; the rest is retried once the claim
+    runs out. Failed messages are retried with exponential backoff and
+    marked as failed after EMAIL_OUTBOX_MAX_ATTEMPTS. Returns a
+    (sent, failed) tuple.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    sent = failed = 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True).filter(
+                status='pending',
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS),
+        )
+    if not batch:
+        return sent, failed
+
+    connection = get_connection(backend=backend)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f'Could not open mail connection: {e}')
+        for email in batch:
+            _record_failure(email, e)
+        return sent, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or settings.DEFAULT_FROM_EMAIL,
+                [email.to_email],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning(f'Failed to send queued email {email.pk}: {e}')
+                _record_failure(email, e)
+                failed += 1
+            else:
+                email.status = 'sent'
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+                sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
+
+
+def _record_failure(email, error):
+    """Schedule a retry with exponential backoff, or give up."""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = timezone.now() + timedelta(minutes=2 ** email.attempts)
+    email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
@@ -4,13 +4,19 @@ from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from bag.contexts import bag_contents
+from django.db import IntegrityError
+from bag.services import get_bag
 from products.models import Product
 from memberships.models import MembershipTier
 from .forms import OrderForm
-from .models import Order, OrderLineItem
+from .models import Order
 from .webhook_handler import StripeWH_Handler
-from .utils import activate_membership_for_order, send_order_confirmation_email
+from .utils import (
+    activate_membership_for_order,
+    add_line_items_to_order,
+    is_membership_only,
+    queue_order_confirmation_email,
+)
 import stripe
 import json
 import logging
@@ -18,6 +24,18 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _payment_intent_id(request):
+    """
+    Return (pid, verified) for the client_secret posted with the request.
+
+    Only the payment intent created for this session (see
+    create_payment_intent) is trusted, so a client_secret copied from
+    someone else's checkout cannot reach their order.
+    """
+    pid = (request.POST.get('client_secret') or '').split('_secret')[0] or None
+    return pid, pid is not None and pid == request.session.get('checkout_pid')
+
+
 def checkout(request):
     """Handle checkout process"""
     stripe_public_key = settings.STRIPE_PUBLIC_KEY
@@ -39,64 +57,56 @@ def checkout(request):
             'country': request.POST.get('country', ''),
         }
 
+        pid, verified = _payment_intent_id(request)
+        if pid and not verified:
+            messages.error(request, "We couldn't verify your payment. Please try again.")
+            logger.warning(f"Checkout posted payment intent {pid} not created for this session")
+            return redirect(reverse('checkout:checkout'))
+
+        # The webhook may have already created this order
+        if pid:
+            existing_order = Order.objects.filter(stripe_pid=pid).first()
+            if existing_order:
+                return redirect(reverse('checkout:checkout_success', args=[existing_order.order_number]))
+
         order_form = OrderForm(form_data, membership_only=membership_only)
         if order_form.is_valid():
             order = order_form.save(commit=False)
             if request.user.is_authenticated:
                 order.user = request.user
-            order.save()
-
-            # Create order line items for products
-            for item_id, quantity in bag.items():
-                try:
-                    product = Product.objects.get(id=item_id)
-                    order_line_item = OrderLineItem(
-                        order=order,
-                        product=product,
-                        quantity=quantity,
-                    )
-                    order_line_item.save()
-                except Product.DoesNotExist:
-                    messages.error(request, (
-                        "One of the products in your bag wasn't found in our database. "
-                        "Please call us for assistance!")
-                    )
-                    order.delete()
-                    return redirect(reverse('bag:view_bag'))
-                except Exception as e:
-                    logger.exception(f"Error creating order line item for product {item_id}: {str(e)}")
-                    error_message = "There was an error processing your order. Please try again."
-                    if settings.DEBUG:
-                        error_message = f"{error_message} ({e})"
-                    messages.error(request, error_message)
-                    order.delete()
-                    return redirect(reverse('bag:view_bag'))
-
-            # Create order line item for membership if present
-            if membership_id:
-                try:
-                    membership = MembershipTier.objects.get(id=membership_id)
-                    order_line_item = OrderLineItem(
-                        order=order,
-                        membership=membership,
-                        quantity=1,
-                    )
-                    order_line_item.save()
-                except MembershipTier.DoesNotExist:
-                    messages.error(request, (
-                        "The membership in your bag wasn't found. "
-                        "Please call us for assistance!")
-                    )
-                    order.delete()
-                    return redirect(reverse('bag:view_bag'))
-                except Exception as e:
-                    logger.exception(f"Error creating order line item for membership {membership_id}: {str(e)}")
-                    error_message = "There was an error processing your order. Please try again."
-                    if settings.DEBUG:
-                        error_message = f"{error_message} ({e})"
-                    messages.error(request, error_message)
-                    order.delete()
-                    return redirect(reverse('bag:view_bag'))
+            order.stripe_pid = pid
+            try:
+                order.save()
+            except IntegrityError:
+                # Lost the race with the webhook for this payment intent
+                existing_order = Order.objects.get(stripe_pid=pid)
+                return redirect(reverse('checkout:checkout_success', args=[existing_order.order_number]))
+
+            # Create all order line items (products and membership) in bulk
+            try:
+                add_line_items_to_order(order, bag, membership_id)
+            except Product.DoesNotExist:
+                messages.error(request, (
+                    "One of the products in your bag wasn't found in our database. "
+                    "Please call us for assistance!")
+                )
+                order.delete()
+                return redirect(reverse('bag:view_bag'))
+            except MembershipTier.DoesNotExist:
+                messages.error(request, (
+                    "The membership in your bag wasn't found. "
+                    "Please call us for assistance!")
+                )
+                order.delete()
+                return redirect(reverse('bag:view_bag'))
+            except Exception as e:
+                logger.exception(f"Error creating order line items for order {order.order_number}: {str(e)}")
+                error_message = "There was an error processing your order. Please try again."
+                if settings.DEBUG:
+                    error_message = f"{error_message} ({e})"
+                messages.error(request, error_message)
+                order.delete()
+                return redirect(reverse('bag:view_bag'))
 
             return redirect(reverse('checkout:checkout_success', args=[order.order_number]))
         else:
@@ -148,8 +158,10 @@ def checkout(request):
 @require_POST
 def cache_checkout_data(request):
     """Cache checkout data in Payment Intent metadata"""
+    pid, verified = _payment_intent_id(request)
+    if not verified:
+        return JsonResponse({'error': 'Unknown payment intent'}, status=400)
     try:
-        pid = request.POST.get('client_secret').split('_secret')[0]
         stripe.api_key = settings.STRIPE_SECRET_KEY
         save_info = request.POST.get('save_info')
 
@@ -179,8 +191,7 @@ def create_payment_intent(request):
         stripe.api_key = settings.STRIPE_SECRET_KEY
 
         # Get bag contents and calculate total
-        current_bag = bag_contents(request)
-        total = current_bag['grand_total']
+        total = get_bag(request).grand_total
 
         # Stripe requires amount in cents
         stripe_total = round(total * 100)
@@ -190,6 +201,8 @@ def create_payment_intent(request):
             amount=stripe_total,
             currency=settings.STRIPE_CURRENCY,
         )
+        # Checkout only accepts this intent back from this session
+        request.session['checkout_pid'] = intent.id
 
         return JsonResponse({
             'clientSecret': intent.client_secret
@@ -225,23 +238,21 @@ def checkout_success(request, order_number):
     except Exception as e:
         logger.error(f"Failed to activate membership for order {order.order_number}: {e}")
 
-    # Send email directly after successful checkout (independent of webhooks)
-    email_sent = True
+    # Queue the confirmation email; the send_queued_emails worker delivers it
+    email_queued = True
     try:
-        send_order_confirmation_email(order)
+        queue_order_confirmation_email(order)
     except Exception as e:
-        email_sent = False
-        logger.error(f"Failed to send confirmation email for order {order.order_number}: {e}")
+        email_queued = False
+        logger.error(f"Failed to queue confirmation email for order {order.order_number}: {e}")
 
-    has_products = order.lineitems.filter(product__isnull=False).exists()
-    has_membership = order.lineitems.filter(membership__isnull=False).exists()
-    membership_only = has_membership and not has_products
+    membership_only = is_membership_only(order)
 
     if membership_only:
-        if email_sent:
+        if email_queued:
             messages.success(
                 request,
-                f'Membership successfully activated! A confirmation email was sent to {order.email}.'
+                f'Membership successfully activated! A confirmation email will be sent to {order.email}.'
             )
         else:
             messages.warning(
@@ -249,11 +260,11 @@ def checkout_success(request, order_number):
                 'Membership successfully activated, but confirmation email could not be sent right now.'
             )
     else:
-        if email_sent:
+        if email_queued:
             messages.success(
                 request,
                 f'Order successfully processed! Your order number is {order_number}. '
-                f'A confirmation email was sent to {order.email}.'
+                f'A confirmation email will be sent to {order.email}.'
             )
         else:
             messages.warning(
@@ -1,10 +1,12 @@
 from django.http import HttpResponse
-from .models import Order, OrderLineItem
-from products.models import Product
-from memberships.models import MembershipTier
-from .utils import activate_membership_for_order, send_order_confirmation_email
+from django.db import IntegrityError, transaction
+from .models import Order
+from .utils import (
+    activate_membership_for_order,
+    add_line_items_to_order,
+    queue_order_confirmation_email,
+)
 import json
-import time
 import logging
 
 
@@ -30,47 +32,28 @@ class StripeWH_Handler:
         Handle the payment_intent.succeeded webhook from Stripe
         """
         intent = event.data.object
-        intent.id
+        pid = intent.id
         bag = intent.metadata.bag
         membership_id = intent.metadata.get('membership_id', None)
         user_id = intent.metadata.get('user_id', None)
-        intent.metadata.save_info
 
         billing_details = intent.charges.data[0].billing_details
-        grand_total = round(intent.charges.data[0].amount / 100, 2)
 
-        # Check if order already exists
-        order_exists = False
-        attempt = 1
-        while attempt <= 5:
-            try:
-                order = Order.objects.get(
-                    full_name__iexact=billing_details.name,
-                    email__iexact=billing_details.email,
-                    phone_number__iexact=billing_details.phone,
-                    street_address1__iexact=billing_details.address.line1,
-                    street_address2__iexact=billing_details.address.line2,
-                    town_or_city__iexact=billing_details.address.city,
-                    county__iexact=billing_details.address.state,
-                    postcode__iexact=billing_details.address.postal_code,
-                    country__iexact=billing_details.address.country,
-                    grand_total=grand_total,
-                )
-                order_exists = True
-                break
-            except Order.DoesNotExist:
-                attempt += 1
-                time.sleep(1)
+        # The payment intent id is the idempotency key: a single indexed
+        # lookup tells us whether checkout already created this order
+        order = Order.objects.filter(stripe_pid=pid).first()
 
-        if order_exists:
+        if order:
             # Order and confirmation are already handled in checkout success.
             activate_membership_for_order(order)
             return HttpResponse(
                 content=f'Webhook received: {event["type"]} | SUCCESS: Verified order already in database',
                 status=200)
-        else:
-            order = None
-            try:
+
+        try:
+            # Create the order and its line items together so checkout never
+            # sees a webhook-created order without its items
+            with transaction.atomic():
                 order = Order.objects.create(
                     user_id=int(user_id) if user_id else None,
                     full_name=billing_details.name,
@@ -82,39 +65,29 @@ class StripeWH_Handler:
                     county=billing_details.address.state,
                     postcode=billing_details.address.postal_code,
                     country=billing_details.address.country,
+                    stripe_pid=pid,
                 )
-
-                # Create line items from bag
-                for item_id, item_data in json.loads(bag).items():
-                    product = Product.objects.get(id=item_id)
-                    order_line_item = OrderLineItem(
-                        order=order,
-                        product=product,
-                        quantity=item_data,
-                    )
-                    order_line_item.save()
-
-                # Create line item for membership if present
-                if membership_id:
-                    membership = MembershipTier.objects.get(id=membership_id)
-                    order_line_item = OrderLineItem(
-                        order=order,
-                        membership=membership,
-                        quantity=1,
-                    )
-                    order_line_item.save()
-
-                # Ensure membership is active for webhook-created orders too
+                add_line_items_to_order(order, json.loads(bag), membership_id)
+        except IntegrityError:
+            # Checkout created the order while we were handling the event
+            order = Order.objects.filter(stripe_pid=pid).first()
+            if order:
                 activate_membership_for_order(order)
-
-            except Exception as e:
-                if order:
-                    order.delete()
                 return HttpResponse(
-                    content=f'Webhook received: {event["type"]} | ERROR: {e}',
-                    status=500)
+                    content=f'Webhook received: {event["type"]} | SUCCESS: Verified order already in database',
+                    status=200)
+            return HttpResponse(
+                content=f'Webhook received: {event["type"]} | ERROR: Could not create order',
+                status=500)
+        except Exception as e:
+            return HttpResponse(
+                content=f'Webhook received: {event["type"]} | ERROR: {e}',
+                status=500)
+
+        # Ensure membership is active for webhook-created orders too
+        activate_membership_for_order(order)
 
-        send_order_confirmation_email(order)
+        queue_order_confirmation_email(order)
         return HttpResponse(
             content=f'Webhook received: {event["type"]} | SUCCESS: Created order in webhook',
             status=200)
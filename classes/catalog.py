@@ -0,0 +1,70 @@
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from .models import FitnessClass, ClassCategory
+
+VERSION_KEY = 'classes:catalog:version'
+
+# Per-process hit/miss counts, see catalog_stats()
+_stats = Counter()
+
+
+def get_catalog_version():
+    """Return the current catalog version, starting at 1"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog list at once.
+
+    Cached entries are keyed by version, so moving to a new version makes
+    them unreachable and they simply expire.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+
+
+def _cached(name, loader):
+    key = f'classes:catalog:{get_catalog_version()}:{name}'
+    value = cache.get(key)
+    if value is None:
+        _stats['misses'] += 1
+        value = loader()
+        cache.set(key, value, timeout=settings.CLASS_CATALOG_CACHE_TIMEOUT)
+    else:
+        _stats['hits'] += 1
+    return value
+
+
+def get_catalog_classes():
+    """All fitness classes ordered by name, for filter dropdowns"""
+    return _cached('classes', lambda: list(FitnessClass.objects.order_by('name')))
+
+
+def get_catalog_categories():
+    """All class categories ordered by name, for filter dropdowns"""
+    return _cached('categories', lambda: list(ClassCategory.objects.order_by('name')))
+
+
+def get_catalog_category(name):
+    """Look up a category by name from the cached list, or None"""
+    for category in get_catalog_categories():
+        if category.name == name:
+            return category
+    return None
+
+
+def catalog_stats():
+    """Return this process's {'hits': n, 'misses': n} for the catalog cache"""
+    return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_catalog_stats():
+    _stats.clear()
@@ -68,6 +68,8 @@ class ScheduleCreationForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
+        fitness_class = cleaned_data.get('fitness_class')
+        date = cleaned_data.get('date')
         start_time = cleaned_data.get('start_time')
         end_time = cleaned_data.get('end_time')
 
@@ -75,6 +77,15 @@ class ScheduleCreationForm(forms.ModelForm):
             if end_time <= start_time:
                 raise forms.ValidationError('End time must be after start time.')
 
+        if fitness_class and date and start_time:
+            duplicates = ClassSchedule.objects.filter(
+                fitness_class=fitness_class,
+                date=date,
+                start_time=start_time
+            ).exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise forms.ValidationError('This class is already scheduled at that date and time.')
+
         return cleaned_data
 
 
@@ -0,0 +1,92 @@
+"""
+Minimal iCalendar (RFC 5545) writer for class schedules.
+
+Events are produced one at a time so feeds can be streamed straight from a
+queryset iterator without building the whole calendar in memory.
+"""
+from datetime import datetime, timezone as dt_timezone
+from django.utils import timezone
+
+CRLF = '\r\n'
+DATETIME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line to 75 octets, continuing with a leading space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + CRLF
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return CRLF.join(parts[:1] + [' ' + part for part in parts[1:]]) + CRLF
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime(DATETIME_FORMAT)
+
+
+def schedule_datetime(schedule_date, schedule_time):
+    """Schedules store local wall-clock times; make them aware in TIME_ZONE"""
+    return timezone.make_aware(datetime.combine(schedule_date, schedule_time))
+
+
+def calendar_header(name):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//FitForge//Class Schedule//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ]
+    return ''.join(fold_line(line) for line in lines)
+
+
+def calendar_footer():
+    return fold_line('END:VCALENDAR')
+
+
+def schedule_event(schedule, uid, url=None, description=None):
+    """Render one ClassSchedule (with fitness_class loaded) as a VEVENT"""
+    fitness_class = schedule.fitness_class
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_utc(schedule.updated_at)}',
+        f'DTSTART:{format_utc(schedule_datetime(schedule.date, schedule.start_time))}',
+        f'DTEND:{format_utc(schedule_datetime(schedule.date, schedule.end_time))}',
+        f'SUMMARY:{escape_text(fitness_class.name)}',
+        f'DESCRIPTION:{escape_text(description or f"Instructor: {fitness_class.instructor}")}',
+    ]
+    if url:
+        lines.append(f'URL:{url}')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def stream_calendar(name, events):
+    """Yield a complete calendar: header, each rendered event, footer"""
+    yield calendar_header(name)
+    yield from events
+    yield calendar_footer()
@@ -1,7 +1,15 @@
-from django.core.management.base import BaseCommand
+import json
+import time as timer
+from datetime import datetime, time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from datetime import datetime, timedelta, time
 from classes.models import FitnessClass, ClassSchedule
+from classes.utils import build_schedules, missing_schedules
+
+DEFAULT_TIMETABLE = Path(__file__).resolve().parents[2] / 'data' / 'weekly_timetable.json'
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
 
 
 class Command(BaseCommand):
@@ -13,72 +21,104 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing schedules before generating new ones',
         )
+        parser.add_argument(
+            '--timetable',
+            default=str(DEFAULT_TIMETABLE),
+            help='JSON file mapping class names to [weekday, "HH:MM"] slots',
+        )
+        parser.add_argument(
+            '--end-date',
+            default='2027-04-30',
+            help='Last date to generate schedules for (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of schedules inserted per INSERT statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many schedules would be created without writing anything',
+        )
+
+    def load_timetable(self, path):
+        """Read the timetable file into {class name: [(weekday, start_time), ...]}"""
+        try:
+            with open(path) as timetable_file:
+                raw = json.load(timetable_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read timetable {path}: {e}')
+
+        timetable = {}
+        for class_name, slots in raw.items():
+            try:
+                timetable[class_name] = [
+                    (WEEKDAYS.index(day.lower()), time.fromisoformat(start))
+                    for day, start in slots
+                ]
+            except ValueError as e:
+                raise CommandError(f'Invalid slot for {class_name}: {e}')
+        return timetable
 
     def handle(self, *args, **options):
-        if options['clear']:
+        started = timer.perf_counter()
+
+        try:
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('--end-date must be in YYYY-MM-DD format')
+
+        timetable = self.load_timetable(options['timetable'])
+
+        if options['clear'] and not options['dry_run']:
             ClassSchedule.objects.all().delete()
             self.stdout.write(self.style.WARNING('Cleared all existing schedules'))
 
-        fitness_classes = FitnessClass.objects.all()
+        fitness_classes = list(FitnessClass.objects.filter(name__in=timetable))
 
-        if not fitness_classes.exists():
+        if not fitness_classes:
             self.stdout.write(self.style.ERROR('No fitness classes found. Please load fixtures first.'))
             return
 
-        class_schedules = {
-            1: [(0, time(7, 0)), (3, time(7, 0)), (5, time(8, 0))],
-            2: [(1, time(18, 0)), (4, time(18, 0))],
-            3: [(2, time(6, 30)), (5, time(6, 30))],
-            4: [(0, time(18, 30)), (3, time(18, 30))],
-            5: [(1, time(12, 0)), (4, time(12, 0))],
-            6: [(0, time(17, 0)), (2, time(17, 0)), (4, time(17, 0))],
-            7: [(1, time(6, 0)), (3, time(6, 0)), (5, time(7, 0))],
-            8: [(0, time(19, 0)), (2, time(19, 0))],
-            9: [(1, time(7, 0)), (4, time(7, 0))],
-            10: [(2, time(18, 0)), (5, time(10, 0))],
-            11: [(0, time(12, 30)), (3, time(12, 30))],
-            12: [(1, time(17, 0)), (4, time(17, 0))],
-        }
+        unknown = set(timetable) - {fitness_class.name for fitness_class in fitness_classes}
+        for class_name in sorted(unknown):
+            self.stdout.write(self.style.WARNING(f'Skipping unknown class in timetable: {class_name}'))
 
         start_date = timezone.now().date()
-        end_date = datetime(2027, 4, 30).date()
-
-        total_created = 0
-        current_date = start_date
-
         self.stdout.write(self.style.SUCCESS(f'Generating schedules from {start_date} to {end_date}'))
 
-        while current_date <= end_date:
-            day_of_week = current_date.weekday()
-
-            for fitness_class in fitness_classes:
-                if fitness_class.id in class_schedules:
-                    schedule_times = class_schedules[fitness_class.id]
+        candidates = []
+        for fitness_class in fitness_classes:
+            candidates.extend(
+                build_schedules(fitness_class, start_date, end_date, timetable[fitness_class.name])
+            )
+        planned = timer.perf_counter()
 
-                    for scheduled_day, start_time in schedule_times:
-                        if day_of_week == scheduled_day:
-                            duration_minutes = fitness_class.duration
-                            end_time = (datetime.combine(current_date, start_time)
-                                        + timedelta(minutes=duration_minutes)).time()
+        to_create = missing_schedules(candidates)
+        checked = timer.perf_counter()
 
-                            schedule, created = ClassSchedule.objects.get_or_create(
-                                fitness_class=fitness_class,
-                                date=current_date,
-                                start_time=start_time,
-                                defaults={
-                                    'end_time': end_time,
-                                    'available_spots': fitness_class.max_capacity,
-                                    'is_active': True,
-                                }
-                            )
+        self.stdout.write(
+            f'{len(candidates)} slots planned in {planned - started:.2f}s, '
+            f'{len(candidates) - len(to_create)} already exist '
+            f'(checked in {checked - planned:.2f}s)'
+        )
 
-                            if created:
-                                total_created += 1
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Dry run: would create {len(to_create)} class schedules until {end_date}')
+            )
+            return
 
-            current_date += timedelta(days=1)
+        # Slots another process inserts meanwhile are skipped, so the rows
+        # actually inserted are unknown; report what is now guaranteed instead
+        ClassSchedule.objects.bulk_create(to_create, batch_size=options['batch_size'], ignore_conflicts=True)
+        finished = timer.perf_counter()
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {total_created} class schedules until {end_date}'
+                f'All {len(candidates)} planned class schedules until {end_date} are in place '
+                f'({len(to_create)} were missing) in {finished - started:.2f}s'
             )
         )
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0005_alter_fitnessclass_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['date', 'start_time'], name='schedule_active_date_idx'),
+        ),
+    ]
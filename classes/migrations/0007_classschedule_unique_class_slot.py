@@ -0,0 +1,75 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+def merge_duplicate_slots(apps, schema_editor):
+    """
+    Fold every copy of a slot into one so the unique constraint can be added.
+
+    The copy with the most live (not cancelled) bookings survives, then the
+    lowest id. Bookings on the other copies move to it; a member who booked
+    more than one copy keeps a single booking, preferring a live one. The
+    survivor's available_spots is recomputed from its live bookings before
+    the other copies are deleted. (Waitlists are added after this migration,
+    so bookings are the only rows pointing at a schedule here.)
+    """
+    ClassSchedule = apps.get_model('classes', 'ClassSchedule')
+    Booking = apps.get_model('bookings', 'Booking')
+    live = ~models.Q(bookings__status='cancelled')
+
+    duplicates = (
+        ClassSchedule.objects.values('fitness_class', 'date', 'start_time')
+        .annotate(copies=models.Count('id'))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    for slot in duplicates:
+        copies = list(
+            ClassSchedule.objects.filter(
+                fitness_class=slot['fitness_class'],
+                date=slot['date'],
+                start_time=slot['start_time'],
+            ).select_related('fitness_class').annotate(
+                live=models.Count('bookings', filter=live),
+                booked=models.Count('bookings'),
+            ).order_by('-live', '-booked', 'id')
+        )
+        keep, others = copies[0], [copy.id for copy in copies[1:]]
+
+        # One booking per member: live before cancelled, the survivor's own first
+        bookings = sorted(
+            Booking.objects.filter(class_schedule__in=copies),
+            key=lambda booking: (booking.status == 'cancelled', booking.class_schedule_id != keep.id, booking.id),
+        )
+        kept, dropped = {}, []
+        for booking in bookings:
+            if booking.user_id in kept:
+                dropped.append(booking.id)
+            else:
+                kept[booking.user_id] = booking
+        Booking.objects.filter(id__in=dropped).delete()
+        Booking.objects.filter(
+            id__in=[booking.id for booking in kept.values() if booking.class_schedule_id != keep.id],
+        ).update(class_schedule=keep)
+
+        live_bookings = sum(booking.status != 'cancelled' for booking in kept.values())
+        keep.available_spots = max(keep.fitness_class.max_capacity - live_bookings, 0)
+        keep.save(update_fields=['available_spots'])
+        ClassSchedule.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0006_classschedule_schedule_active_date_idx'),
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='classschedule',
+            constraint=models.UniqueConstraint(fields=('fitness_class', 'date', 'start_time'), name='unique_class_slot'),
+        ),
+    ]
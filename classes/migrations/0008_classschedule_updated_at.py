@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0007_classschedule_unique_class_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -51,10 +51,27 @@ class ClassSchedule(models.Model):
     end_time = models.TimeField()
     available_spots = models.IntegerField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Bumped on every change, including the F() seat updates in bookings.utils
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Class Schedules'
         ordering = ['date', 'start_time']
+        indexes = [
+            # Public schedule listing: active sessions from a date, in date/time order
+            models.Index(
+                fields=['date', 'start_time'],
+                name='schedule_active_date_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+        constraints = [
+            # One session per class per slot, enforced by the database
+            models.UniqueConstraint(
+                fields=['fitness_class', 'date', 'start_time'],
+                name='unique_class_slot',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         """Override save to set available_spots to max_capacity if not specified"""
@@ -0,0 +1,83 @@
+import base64
+import binascii
+from datetime import date, time
+from django.db.models import Q
+
+
+def encode_cursor(schedule):
+    """Encode a schedule's (date, start_time, id) sort key as an opaque cursor"""
+    key = f'{schedule.date.isoformat()}|{schedule.start_time.isoformat()}|{schedule.pk}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into (date, start_time, id), or None if invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_date, raw_time, raw_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return date.fromisoformat(raw_date), time.fromisoformat(raw_time), int(raw_id)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of schedules plus the cursor for the page after it"""
+
+    def __init__(self, object_list, next_cursor, is_first):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over schedules ordered by (date, start_time, id).
+
+    Each page is a range scan that starts right after the previous page's
+    last row, so page 100 costs the same as page 1 and no COUNT(*) is run.
+    """
+
+    ordering = ('date', 'start_time', 'id')
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        key = decode_cursor(cursor)
+        queryset = self.queryset
+        if key:
+            after_date, after_time, after_id = key
+            # The leading date__gte lets the (date, start_time) index bound the scan
+            queryset = queryset.filter(date__gte=after_date).filter(
+                Q(date__gt=after_date)
+                | Q(date=after_date, start_time__gt=after_time)
+                | Q(date=after_date, start_time=after_time, id__gt=after_id)
+            )
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(queryset[:self.per_page + 1])
+        object_list = rows[:self.per_page]
+        next_cursor = encode_cursor(object_list[-1]) if len(rows) > self.per_page else None
+        return KeysetPage(object_list, next_cursor, is_first=key is None)
+
+
+def approximate_count(queryset, cap=1000):
+    """
+    Count up to `cap` rows, returning (count, is_capped).
+
+    Bounds the cost of showing a total for very large result sets.
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .catalog import bump_catalog_version
+from .models import FitnessClass, ClassCategory
+
+
+@receiver(post_save, sender=FitnessClass)
+@receiver(post_delete, sender=FitnessClass)
+@receiver(post_save, sender=ClassCategory)
+@receiver(post_delete, sender=ClassCategory)
+def invalidate_catalog(sender, **kwargs):
+    """Refresh the cached filter dropdowns when staff edit classes or categories"""
+    bump_catalog_version()
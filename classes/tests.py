@@ -0,0 +1,480 @@
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, IntegrityError, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from classes.catalog import catalog_stats, reset_catalog_stats
+from classes.models import FitnessClass, ClassCategory, ClassSchedule
+from classes.pagination import KeysetPaginator, approximate_count, decode_cursor
+from bookings.models import Booking
+from bookings.utils import reserve_spot
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite specific')
+class ScheduleIndexTests(TestCase):
+    """Test the schedule and booking hot paths are served by their indexes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        fitness_class = FitnessClass.objects.create(
+            name='Yoga',
+            description='Relaxing yoga',
+            duration=60,
+            instructor='Test Instructor',
+        )
+        ClassSchedule.objects.bulk_create([
+            ClassSchedule(
+                fitness_class=fitness_class,
+                date=date.today() + timedelta(days=offset),
+                start_time=time(9, 0),
+                end_time=time(10, 0),
+                available_spots=20,
+                is_active=offset % 7 != 0,
+            )
+            for offset in range(-30, 60)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_schedule_listing_uses_active_date_index(self):
+        """Test class_schedule_list's query searches schedule_active_date_idx"""
+        schedules = ClassSchedule.objects.filter(
+            date__gte=date.today(),
+            is_active=True
+        ).select_related('fitness_class', 'fitness_class__category').order_by('date', 'start_time')
+        plan = schedules.explain()
+        self.assertIn('USING INDEX schedule_active_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_my_bookings_uses_user_week_index(self):
+        """Test my_bookings' single current-bookings query searches booking_user_week_idx"""
+        bookings = Booking.objects.filter(
+            user=self.user,
+            class_date__gte=date.today(),
+        ).select_related('class_schedule', 'class_schedule__fitness_class').order_by('class_date')
+        plan = bookings.explain()
+        self.assertIn('USING INDEX booking_user_week_idx', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+
+class ScheduleCursorPaginationTests(TestCase):
+    """Test keyset pagination of the public schedule listing"""
+
+    def setUp(self):
+        fitness_classes = [
+            FitnessClass.objects.create(
+                name=name,
+                description='Core strength',
+                duration=45,
+                instructor='Test Instructor',
+            )
+            for name in ('Pilates', 'Barre')
+        ]
+        # Several sessions share a date and start time, so the id tiebreak matters
+        ClassSchedule.objects.bulk_create([
+            ClassSchedule(
+                fitness_class=fitness_classes[offset % 4 // 2],
+                date=date.today() + timedelta(days=offset // 4),
+                start_time=time(7 + offset % 2, 0),
+                end_time=time(9, 0),
+                available_spots=10,
+            )
+            for offset in range(30)
+        ])
+
+    def test_pages_cover_every_schedule_once(self):
+        """Test walking the cursors visits each schedule exactly once, in order"""
+        paginator = KeysetPaginator(ClassSchedule.objects.all(), 12)
+        seen = []
+        cursor = None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        expected = list(ClassSchedule.objects.order_by('date', 'start_time', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_deep_page_query_count_is_constant(self):
+        """Test a cursor page is one query, with no COUNT"""
+        paginator = KeysetPaginator(ClassSchedule.objects.all(), 12)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            list(paginator.page(cursor))
+
+    def test_invalid_cursor_starts_from_beginning(self):
+        """Test a tampered cursor falls back to the first page"""
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = KeysetPaginator(ClassSchedule.objects.all(), 12).page('not-a-cursor')
+        self.assertTrue(page.is_first)
+
+    def test_schedule_list_cursor_mode(self):
+        """Test the listing renders in cursor mode with an approximate total"""
+        response = self.client.get(reverse('class_schedule_list'), {'cursor': '', 'approx_total': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['cursor_mode'])
+        self.assertEqual(response.context['approx_total'], 30)
+        self.assertContains(response, 'Load more')
+
+        self.assertEqual(approximate_count(ClassSchedule.objects.all(), cap=10), (10, True))
+
+
+class GenerateSchedulesCommandTests(TestCase):
+    """Test the bulk schedule generation command"""
+
+    fixtures = ['classes']
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('generate_schedules', '--end-date', self.end_date.isoformat(), *args, stdout=out)
+        return out.getvalue()
+
+    def setUp(self):
+        self.end_date = date.today() + timedelta(days=27)
+
+    def test_generates_every_slot_once(self):
+        """Test four weeks of the default timetable, then an idempotent rerun"""
+        self.run_command()
+        # 27 weekly slots in the timetable, four weeks ahead
+        self.assertEqual(ClassSchedule.objects.count(), 27 * 4)
+        yoga = ClassSchedule.objects.filter(fitness_class__name='Morning Vinyasa Flow').first()
+        self.assertIn(yoga.date.weekday(), [0, 3, 5])
+        self.assertEqual(yoga.available_spots, yoga.fitness_class.max_capacity)
+
+        output = self.run_command()
+        self.assertIn('All 108 planned class schedules', output)
+        self.assertIn('(0 were missing)', output)
+        self.assertEqual(ClassSchedule.objects.count(), 27 * 4)
+
+    def test_concurrent_inserts_are_not_reported_as_created(self):
+        """Test slots inserted by another process after the check are not claimed"""
+        self.run_command()
+        # As if every slot was still missing when checked, then inserted by someone else
+        with patch('classes.management.commands.generate_schedules.missing_schedules', side_effect=list):
+            output = self.run_command()
+        self.assertIn('All 108 planned class schedules', output)
+        self.assertNotIn('created', output)
+        self.assertEqual(ClassSchedule.objects.count(), 27 * 4)
+
+    def test_query_count_does_not_grow_with_range(self):
+        """Test generation is a fixed number of queries, not one per slot"""
+        self.end_date = date.today() + timedelta(days=365)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_command('--batch-size', '500')
+        created = ClassSchedule.objects.count()
+        self.assertGreater(created, 1000)
+        # Class lookup, one existence check, then batched inserts
+        self.assertLessEqual(len(queries), 2 + created // 50 + 1)
+
+    def test_dry_run_writes_nothing(self):
+        """Test --dry-run only reports counts"""
+        output = self.run_command('--dry-run')
+        self.assertIn('Dry run: would create 108 class schedules', output)
+        self.assertFalse(ClassSchedule.objects.exists())
+
+
+class BulkCreateSchedulesViewTests(TestCase):
+    """Test the staff recurring schedule view"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.login(username='staff', password='testpass123')
+        self.fitness_class = FitnessClass.objects.create(
+            name='HIIT',
+            description='Intervals',
+            duration=30,
+            instructor='Test Instructor',
+            max_capacity=12,
+        )
+        self.start_date = date(2027, 1, 4)
+        self.data = {
+            'fitness_class': self.fitness_class.id,
+            'start_date': self.start_date.isoformat(),
+            'end_date': (self.start_date + timedelta(days=90)).isoformat(),
+            'days_of_week': ['0', '2', '4'],
+            'start_time': '18:00',
+            'end_time': '18:30',
+        }
+
+    def test_creates_each_weekday_once(self):
+        """Test a resubmitted range only creates the missing sessions"""
+        ClassSchedule.objects.create(
+            fitness_class=self.fitness_class,
+            date=self.start_date,
+            start_time=time(18, 0),
+            end_time=time(18, 30),
+        )
+        response = self.client.post(reverse('bulk_create_schedules'), self.data)
+        self.assertRedirects(response, reverse('admin_schedule_list'), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ['HIIT is scheduled for all 39 requested session(s)'],
+        )
+        # 13 weeks of Monday, Wednesday and Friday, one of which already existed
+        self.assertEqual(ClassSchedule.objects.count(), 13 * 3)
+
+        self.client.post(reverse('bulk_create_schedules'), self.data)
+        self.assertEqual(ClassSchedule.objects.count(), 13 * 3)
+        self.assertFalse(ClassSchedule.objects.exclude(available_spots=12).exclude(date=self.start_date).exists())
+
+    def test_query_count_is_independent_of_range(self):
+        """Test one existence check and one insert rather than a query per day"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('bulk_create_schedules'), self.data)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT') and '"classes_classschedule"' in q['sql']]
+        checks = [q for q in queries if q['sql'].startswith('SELECT "classes_classschedule"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(checks), 1)
+
+    def test_database_rejects_duplicate_slot(self):
+        """Test the unique constraint refuses a second session in the same slot"""
+        ClassSchedule.objects.create(
+            fitness_class=self.fitness_class,
+            date=self.start_date,
+            start_time=time(18, 0),
+            end_time=time(18, 30),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ClassSchedule.objects.create(
+                fitness_class=self.fitness_class,
+                date=self.start_date,
+                start_time=time(18, 0),
+                end_time=time(19, 0),
+            )
+
+
+class CatalogCacheTests(TestCase):
+    """Test the cached class and category lists behind the filter dropdowns"""
+
+    def setUp(self):
+        cache.clear()
+        reset_catalog_stats()
+        self.category = ClassCategory.objects.create(name='yoga', friendly_name='Yoga')
+        FitnessClass.objects.create(
+            name='Hatha',
+            description='Gentle yoga',
+            duration=60,
+            instructor='Test Instructor',
+            category=self.category,
+        )
+
+    def test_repeat_requests_skip_catalog_queries(self):
+        """Test the second listing request serves the dropdowns from cache"""
+        url = reverse('class_schedule_list')
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(url)
+        self.assertEqual(len(first) - len(second), 2)
+        self.assertEqual([c.name for c in response.context['all_classes']], ['Hatha'])
+        self.assertEqual(catalog_stats(), {'hits': 2, 'misses': 2})
+
+    def test_all_classes_category_lookup_is_cached(self):
+        """Test the selected category comes from the cached list"""
+        self.client.get(reverse('all_classes'))
+        response = self.client.get(reverse('all_classes'), {'category': 'yoga'})
+        self.assertEqual(response.context['current_category'], self.category)
+        self.assertEqual(catalog_stats()['misses'], 1)
+
+    def test_edits_invalidate_catalog(self):
+        """Test saving or deleting a class or category refreshes the lists"""
+        url = reverse('class_schedule_list')
+        self.client.get(url)
+
+        self.category.friendly_name = 'Yoga & Mobility'
+        self.category.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context['all_categories'][0].friendly_name, 'Yoga & Mobility')
+
+        FitnessClass.objects.get(name='Hatha').delete()
+        response = self.client.get(url)
+        self.assertEqual(response.context['all_classes'], [])
+
+
+class ScheduleAvailabilityApiTests(TestCase):
+    """Test the polled JSON seat counts and their conditional responses"""
+
+    def setUp(self):
+        fitness_class = FitnessClass.objects.create(
+            name='Spin',
+            description='Indoor cycling',
+            duration=45,
+            instructor='Test Instructor',
+            max_capacity=8,
+        )
+        self.schedule = ClassSchedule.objects.create(
+            fitness_class=fitness_class,
+            date=date.today() + timedelta(days=1),
+            start_time=time(7, 0),
+            end_time=time(7, 45),
+        )
+        ClassSchedule.objects.create(
+            fitness_class=fitness_class,
+            date=date.today() + timedelta(days=2),
+            start_time=time(7, 0),
+            end_time=time(7, 45),
+            is_active=False,
+        )
+        self.url = reverse('schedule_availability')
+
+    def test_returns_spots_by_schedule_id(self):
+        """Test the payload maps active schedule ids to available spots"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {str(self.schedule.id): 8})
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_unchanged_window_is_not_modified(self):
+        """Test a matching ETag gets a 304 from a single query"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_changes_etag(self):
+        """Test a seat update made with F() invalidates the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        reserve_spot(self.schedule.id)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {str(self.schedule.id): 7})
+
+    def test_invalid_window_is_rejected(self):
+        """Test bad or oversized date windows return 400"""
+        self.assertEqual(self.client.get(self.url, {'start': 'soon'}).status_code, 400)
+        start = date.today()
+        end = start + timedelta(days=60)
+        response = self.client.get(self.url, {'start': start.isoformat(), 'end': end.isoformat()})
+        self.assertEqual(response.status_code, 400)
+
+    def test_schedule_page_passes_window_limit(self):
+        """Test the schedule page tells the poller how many days one request may span"""
+        response = self.client.get(reverse('class_schedule_list'))
+        self.assertContains(response, 'data-max-days="31"')
+
+
+class TimetableFeedTests(TestCase):
+    """Test the streamed iCalendar timetable"""
+
+    def setUp(self):
+        self.category = ClassCategory.objects.create(name='cardio')
+        spin = FitnessClass.objects.create(
+            name='Spin, Sprint; Repeat',
+            description='Indoor cycling',
+            duration=45,
+            instructor='Test Instructor',
+            category=self.category,
+        )
+        yoga = FitnessClass.objects.create(
+            name='Yoga',
+            description='Stretch',
+            duration=60,
+            instructor='Test Instructor',
+        )
+        for fitness_class in (spin, yoga):
+            ClassSchedule.objects.create(
+                fitness_class=fitness_class,
+                date=date.today() + timedelta(days=1),
+                start_time=time(7, 0),
+                end_time=time(8, 0),
+            )
+        self.url = reverse('timetable_feed')
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_is_valid_calendar(self):
+        """Test the feed streams one escaped VEVENT per schedule"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = self.read(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Spin\\, Sprint\\; Repeat\r\n', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_category_filter(self):
+        """Test ?category= narrows the feed"""
+        body = self.read(self.client.get(self.url, {'category': self.category.id}))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertNotIn('SUMMARY:Yoga', body)
+
+    def test_conditional_get(self):
+        """Test an unchanged feed answers 304 and a class edit invalidates it"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        FitnessClass.objects.filter(name='Yoga').first().save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class MergeDuplicateSlotsMigrationTests(TransactionTestCase):
+    """Test the unique slot migration folds booked duplicates into one session"""
+
+    migrate_from = [('classes', '0006_classschedule_schedule_active_date_idx'), ('bookings', '0001_initial')]
+    migrate_to = [('classes', '0007_classschedule_unique_class_slot')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.migrate_from)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_booked_duplicates_are_merged(self):
+        """Test bookings on every copy move to one survivor, and the constraint is added"""
+        old_apps = self.executor.loader.project_state(self.migrate_from).apps
+        OldClass = old_apps.get_model('classes', 'FitnessClass')
+        OldSchedule = old_apps.get_model('classes', 'ClassSchedule')
+        OldBooking = old_apps.get_model('bookings', 'Booking')
+        OldUser = old_apps.get_model('auth', 'User')
+
+        users = [OldUser.objects.create(username=f'member{i}') for i in range(4)]
+        fitness_class = OldClass.objects.create(
+            name='Spin', description='Indoor cycling', duration=45, instructor='Test Instructor', max_capacity=10,
+        )
+        slot = {'fitness_class': fitness_class, 'date': date(2027, 1, 4), 'start_time': time(7, 0), 'end_time': time(7, 45)}
+        unbooked = OldSchedule.objects.create(available_spots=10, **slot)
+        first = OldSchedule.objects.create(available_spots=8, **slot)
+        second = OldSchedule.objects.create(available_spots=8, **slot)
+        OldBooking.objects.create(user=users[0], class_schedule=first)
+        OldBooking.objects.create(user=users[1], class_schedule=first, status='cancelled')
+        OldBooking.objects.create(user=users[1], class_schedule=second)
+        OldBooking.objects.create(user=users[2], class_schedule=second)
+        OldBooking.objects.create(user=users[3], class_schedule=second, status='cancelled')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+
+        new_apps = executor.loader.project_state(self.migrate_to).apps
+        schedule = new_apps.get_model('classes', 'ClassSchedule').objects.get()
+        self.assertEqual(schedule.pk, second.pk)
+        self.assertNotEqual(schedule.pk, unbooked.pk)
+        self.assertEqual(schedule.available_spots, 7)
+        bookings = new_apps.get_model('bookings', 'Booking').objects.order_by('user__username')
+        self.assertEqual(
+            [(booking.user.username, booking.status, booking.class_schedule_id) for booking in bookings],
+            [
+                ('member0', 'confirmed', schedule.pk),
+                ('member1', 'confirmed', schedule.pk),
+                ('member2', 'confirmed', schedule.pk),
+                ('member3', 'cancelled', schedule.pk),
+            ],
+        )
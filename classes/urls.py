@@ -8,6 +8,8 @@ urlpatterns = [
     path('delete/<int:class_id>/', views.delete_class, name='delete_class'),
     path('<int:class_id>/', views.class_detail, name='class_detail'),
     path('schedules/', views.class_schedule_list, name='class_schedule_list'),
+    path('schedules/availability/', views.schedule_availability, name='schedule_availability'),
+    path('schedules/calendar.ics', views.timetable_feed, name='timetable_feed'),
     path('admin/schedules/', views.admin_schedule_list, name='admin_schedule_list'),
     path('admin/schedules/create/', views.create_schedule, name='create_schedule'),
     path('admin/schedules/bulk-create/', views.bulk_create_schedules, name='bulk_create_schedules'),
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from .models import ClassSchedule
+
+
+def build_schedules(fitness_class, start_date, end_date, weekly_slots, end_time=None):
+    """
+    Build unsaved ClassSchedule objects for every (weekday, start_time) slot
+    between start_date and end_date inclusive.
+
+    Dates are stepped a week at a time from each slot's first occurrence,
+    rather than checking every day of the range. end_time defaults to the
+    start time plus the class duration.
+    """
+    schedules = []
+    for weekday, start_time in weekly_slots:
+        first_date = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+        slot_end_time = end_time or (
+            datetime.combine(first_date, start_time) + timedelta(minutes=fitness_class.duration)
+        ).time()
+
+        current_date = first_date
+        while current_date <= end_date:
+            schedules.append(ClassSchedule(
+                fitness_class=fitness_class,
+                date=current_date,
+                start_time=start_time,
+                end_time=slot_end_time,
+                available_spots=fitness_class.max_capacity,
+                is_active=True,
+            ))
+            current_date += timedelta(days=7)
+    return schedules
+
+
+def missing_schedules(schedules):
+    """
+    Drop schedules whose (fitness_class, date, start_time) already exists,
+    using a single query over the candidates' date range.
+    """
+    if not schedules:
+        return []
+
+    dates = [schedule.date for schedule in schedules]
+    existing = set(
+        ClassSchedule.objects.filter(
+            fitness_class_id__in={schedule.fitness_class_id for schedule in schedules},
+            date__range=(min(dates), max(dates)),
+        ).order_by().values_list('fitness_class_id', 'date', 'start_time')
+    )
+
+    missing = []
+    for schedule in schedules:
+        key = (schedule.fitness_class_id, schedule.date, schedule.start_time)
+        if key not in existing:
+            existing.add(key)
+            missing.append(schedule)
+    return missing
@@ -1,18 +1,30 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Q
 from django.utils import timezone
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Count, Max, Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
 from datetime import datetime, timedelta
-from .models import FitnessClass, ClassCategory, ClassSchedule
+from search.index import search_filter
+from .models import FitnessClass, ClassSchedule
 from .forms import ScheduleCreationForm, BulkScheduleCreationForm, FitnessClassForm
+from .catalog import get_catalog_classes, get_catalog_categories, get_catalog_category, get_catalog_version
+from .ical import schedule_event, stream_calendar
+from .pagination import KeysetPaginator, approximate_count
+from .utils import build_schedules, missing_schedules
+
+AVAILABILITY_DEFAULT_DAYS = 7
+AVAILABILITY_MAX_DAYS = 31
 
 
 def all_classes(request):
     """View to show all fitness classes, with filtering by category"""
     classes = FitnessClass.objects.all().order_by('name')
-    categories = ClassCategory.objects.all()
+    categories = get_catalog_categories()
     current_category = None
     search_query = None
     sort = None
@@ -22,13 +34,13 @@ def all_classes(request):
         if 'category' in request.GET:
             category_name = request.GET['category']
             classes = classes.filter(category__name=category_name)
-            current_category = ClassCategory.objects.get(name=category_name)
+            current_category = get_catalog_category(category_name)
 
         if 'q' in request.GET:
             search_query = request.GET['q']
             if search_query:
-                queries = Q(name__icontains=search_query) | Q(description__icontains=search_query) | Q(instructor__icontains=search_query)
-                classes = classes.filter(queries)
+                # Best matches first unless a sort is chosen below
+                classes = search_filter(classes, search_query).order_by('search_rank', 'name')
 
         if 'sort' in request.GET:
             sortkey = request.GET['sort']
@@ -138,11 +150,7 @@ def class_schedule_list(request):
     # Filter by class name search
     search_query = request.GET.get('q', '').strip()
     if search_query:
-        schedules = schedules.filter(
-            Q(fitness_class__name__icontains=search_query) | Q(
-                fitness_class__instructor__icontains=search_query) | Q(
-                fitness_class__description__icontains=search_query)
-        )
+        schedules = search_filter(schedules, search_query, field='fitness_class_id', model=FitnessClass)
 
     # Filter by specific class
     class_id = request.GET.get('class_id')
@@ -162,20 +170,40 @@ def class_schedule_list(request):
     # Order by date and time
     schedules = schedules.order_by('date', 'start_time')
 
-    # Get all classes and categories for filter dropdowns
-    all_classes = FitnessClass.objects.all().order_by('name')
-    all_categories = ClassCategory.objects.all().order_by('name')
-
-    # Pagination - 12 items per page
-    paginator = Paginator(schedules, 12)
-    page = request.GET.get('page', 1)
+    # Get all classes and categories for filter dropdowns (cached until staff edit them)
+    all_classes = get_catalog_classes()
+    all_categories = get_catalog_categories()
+
+    # Cursor mode (?cursor=) keeps deep pages and infinite scroll constant-time:
+    # no COUNT(*) unless an approximate total is asked for, and no OFFSET scans
+    cursor_mode = 'cursor' in request.GET
+    first_page_query = None
+    next_page_query = None
+    approx_total = None
+    total_capped = False
+
+    if cursor_mode:
+        schedules_page = KeysetPaginator(schedules, 12).page(request.GET.get('cursor'))
+        params = request.GET.copy()
+        params.pop('page', None)
+        params['cursor'] = ''
+        first_page_query = params.urlencode()
+        if schedules_page.has_next():
+            params['cursor'] = schedules_page.next_cursor
+            next_page_query = params.urlencode()
+        if request.GET.get('approx_total') == '1':
+            approx_total, total_capped = approximate_count(schedules)
+    else:
+        # Pagination - 12 items per page
+        paginator = Paginator(schedules.order_by('date', 'start_time', 'id'), 12)
+        page = request.GET.get('page', 1)
 
-    try:
-        schedules_page = paginator.page(page)
-    except PageNotAnInteger:
-        schedules_page = paginator.page(1)
-    except EmptyPage:
-        schedules_page = paginator.page(paginator.num_pages)
+        try:
+            schedules_page = paginator.page(page)
+        except PageNotAnInteger:
+            schedules_page = paginator.page(1)
+        except EmptyPage:
+            schedules_page = paginator.page(paginator.num_pages)
 
     # Calculate quick date ranges
     next_week_start = start_of_week + timedelta(days=7)
@@ -183,6 +211,11 @@ def class_schedule_list(request):
 
     context = {
         'schedules': schedules_page,
+        'cursor_mode': cursor_mode,
+        'first_page_query': first_page_query,
+        'next_page_query': next_page_query,
+        'approx_total': approx_total,
+        'total_capped': total_capped,
         'now': now,
         'start_date': start_date,
         'end_date': end_date,
@@ -198,11 +231,150 @@ def class_schedule_list(request):
         'selected_difficulty': difficulty,
         'selected_category': category_id,
         'difficulty_choices': FitnessClass.DIFFICULTY_CHOICES,
+        'availability_max_days': AVAILABILITY_MAX_DAYS,
     }
 
     return render(request, 'classes/schedule_list.html', context)
 
 
+def _availability_window(request):
+    """Parse ?start=&end= (YYYY-MM-DD) into a date range, or None if invalid"""
+    if not hasattr(request, '_availability_window'):
+        window = None
+        today = timezone.now().date()
+        try:
+            start = datetime.strptime(request.GET.get('start', today.isoformat()), '%Y-%m-%d').date()
+            default_end = start + timedelta(days=AVAILABILITY_DEFAULT_DAYS)
+            end = datetime.strptime(request.GET.get('end', default_end.isoformat()), '%Y-%m-%d').date()
+            if start <= end <= start + timedelta(days=AVAILABILITY_MAX_DAYS):
+                window = (start, end)
+        except ValueError:
+            pass
+        request._availability_window = window
+    return request._availability_window
+
+
+def _availability_state(request):
+    """
+    Return (row count, latest updated_at) for the requested window.
+
+    One aggregate query answers conditional requests; the count catches
+    deleted schedules, which would not move the latest timestamp.
+    """
+    if not hasattr(request, '_availability_state'):
+        state = None
+        window = _availability_window(request)
+        if window:
+            state = ClassSchedule.objects.filter(date__range=window).aggregate(
+                count=Count('id'),
+                last_modified=Max('updated_at'),
+            )
+        request._availability_state = state
+    return request._availability_state
+
+
+def _availability_etag(request):
+    state = _availability_state(request)
+    if state is None:
+        return None
+    start, end = _availability_window(request)
+    last_modified = state['last_modified'].timestamp() if state['last_modified'] else 0
+    return f'{start}:{end}:{state["count"]}:{last_modified}'
+
+
+def _availability_last_modified(request):
+    state = _availability_state(request)
+    return state['last_modified'] if state else None
+
+
+@require_GET
+@condition(etag_func=_availability_etag, last_modified_func=_availability_last_modified)
+def schedule_availability(request):
+    """
+    JSON {schedule_id: available_spots} for active schedules in a date window.
+
+    Polled by bookings.js; unchanged windows are answered with a 304 from the
+    single aggregate query in _availability_state.
+    """
+    window = _availability_window(request)
+    if window is None:
+        return JsonResponse(
+            {'error': f'start and end must be YYYY-MM-DD, at most {AVAILABILITY_MAX_DAYS} days apart'},
+            status=400,
+        )
+
+    spots = ClassSchedule.objects.filter(
+        date__range=window,
+        is_active=True,
+    ).order_by().values_list('id', 'available_spots')
+
+    response = JsonResponse({str(schedule_id): available for schedule_id, available in spots})
+    # Let browsers keep the body but revalidate it on every poll
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _timetable_schedules(request):
+    """Upcoming active schedules, optionally narrowed by ?class_id= and ?category="""
+    schedules = ClassSchedule.objects.filter(date__gte=timezone.now().date(), is_active=True)
+    class_id = request.GET.get('class_id')
+    if class_id and class_id.isdigit():
+        schedules = schedules.filter(fitness_class_id=class_id)
+    category_id = request.GET.get('category')
+    if category_id and category_id.isdigit():
+        schedules = schedules.filter(fitness_class__category_id=category_id)
+    return schedules
+
+
+def _timetable_state(request):
+    if not hasattr(request, '_timetable_state'):
+        request._timetable_state = _timetable_schedules(request).aggregate(
+            count=Count('id'),
+            id_sum=Sum('id'),
+            last_modified=Max('updated_at'),
+        )
+    return request._timetable_state
+
+
+def _timetable_etag(request):
+    state = _timetable_state(request)
+    last_modified = state['last_modified'].timestamp() if state['last_modified'] else 0
+    # Class names and instructors appear in the feed, so catalog edits count too
+    return (
+        f'{get_catalog_version()}:{request.GET.urlencode()}:'
+        f'{state["count"]}:{state["id_sum"]}:{last_modified}'
+    )
+
+
+def _timetable_last_modified(request):
+    return _timetable_state(request)['last_modified']
+
+
+@require_GET
+@condition(etag_func=_timetable_etag, last_modified_func=_timetable_last_modified)
+def timetable_feed(request):
+    """Stream the upcoming timetable as an iCalendar feed"""
+    schedules = _timetable_schedules(request).select_related('fitness_class').order_by('date', 'start_time', 'id')
+    host = request.get_host()
+    base_url = request.build_absolute_uri('/')[:-1]
+
+    events = (
+        schedule_event(
+            schedule,
+            uid=f'schedule-{schedule.id}@{host}',
+            url=base_url + reverse('class_detail', args=[schedule.fitness_class_id]),
+        )
+        for schedule in schedules.iterator(chunk_size=500)
+    )
+    response = StreamingHttpResponse(
+        stream_calendar('FitForge timetable', events),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="fitforge-timetable.ics"'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
 @user_passes_test(lambda u: u.is_staff)
 def create_schedule(request):
     """Admin view to create a single class schedule"""
@@ -235,31 +407,23 @@ def bulk_create_schedules(request):
             start_time = form.cleaned_data['start_time']
             end_time = form.cleaned_data['end_time']
 
-            # Generate schedules for selected weekdays
-            current_date = start_date
-            created_count = 0
-
-            while current_date <= end_date:
-                if current_date.weekday() in days_of_week:
-                    # Check if schedule already exists
-                    if not ClassSchedule.objects.filter(
-                        fitness_class=fitness_class,
-                        date=current_date,
-                        start_time=start_time
-                    ).exists():
-                        ClassSchedule.objects.create(
-                            fitness_class=fitness_class,
-                            date=current_date,
-                            start_time=start_time,
-                            end_time=end_time,
-                            available_spots=fitness_class.max_capacity,
-                            is_active=True
-                        )
-                        created_count += 1
-
-                current_date += timedelta(days=1)
-
-            messages.success(request, f'Successfully created {created_count} schedule(s) for {fitness_class.name}')
+            # Build every matching weekday up front, then insert the new ones in bulk
+            schedules = build_schedules(
+                fitness_class,
+                start_date,
+                end_date,
+                [(day, start_time) for day in days_of_week],
+                end_time=end_time,
+            )
+            to_create = missing_schedules(schedules)
+            # The unique constraint drops any slot created concurrently since the check,
+            # so how many rows this insert added is unknown; every requested slot now exists
+            ClassSchedule.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+
+            messages.success(
+                request,
+                f'{fitness_class.name} is scheduled for all {len(schedules)} requested session(s)',
+            )
             return redirect('admin_schedule_list')
     else:
         form = BulkScheduleCreationForm()
@@ -1,35 +1,121 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
 from django.contrib import messages
-from django.urls import Resolver404
-from django.urls import resolve
+from django.db import connections
 from django.shortcuts import redirect
 
+logger = logging.getLogger(__name__)
+
 
 class AuthenticatedUserSignupRedirectMiddleware:
     """
     Middleware to redirect authenticated users away from signup/login pages
     and show them a friendly message.
+
+    The check runs in process_view, after the handler has resolved the URL,
+    so it reuses request.resolver_match instead of resolving the path again.
     """
 
+    redirect_url_names = {'account_signup', 'account_login'}
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Check if user is authenticated
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Check the page first so other pages never load the session user here
+        if request.resolver_match.url_name not in self.redirect_url_names:
+            return None
+
         if request.user.is_authenticated:
-            # Check which page they're trying to access
-            try:
-                path = resolve(request.path_info)
-                # If trying to access signup or login, redirect with message
-                if path.url_name in ['account_signup', 'account_login']:
-                    messages.info(
-                        request,
-                        f'You are already signed in as {request.user.username}. '
-                        'Visit your profile to manage your account.'
-                    )
-                    return redirect('profiles:profile')
-            except Resolver404:
-                # If URL doesn't resolve, just continue
-                pass
-
-        response = self.get_response(request)
+            messages.info(
+                request,
+                f'You are already signed in as {request.user.username}. '
+                'Visit your profile to manage your account.'
+            )
+            return redirect('profiles:profile')
+        return None
+
+
+class QueryStats:
+    """
+    Database execute wrapper that counts queries and time spent in them.
+
+    Statements are tallied by their SQL text with placeholders, so the same
+    lookup repeated with different parameters shows up as one hot statement.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times, most frequent first"""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in per-request SQL instrumentation, enabled with SQL_INSTRUMENTATION=1.
+
+    Adds a Server-Timing header with the query count and database time, and
+    logs a warning naming the URL when a request goes over SQL_QUERY_BUDGET
+    queries or SQL_LATENCY_BUDGET_MS milliseconds, or runs the same
+    statement SQL_REPEATED_QUERY_THRESHOLD times or more (usually an N+1).
+
+    Queries run while a streaming response is consumed happen after this
+    middleware returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        timing = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+
+        self.report(request, response, stats, elapsed)
         return response
+
+    def report(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else '-'
+        summary = (
+            f'{request.method} {request.path} ({view}) -> {response.status_code}: '
+            f'{stats.count} queries, {stats.duration * 1000:.1f} ms in the database, '
+            f'{elapsed * 1000:.1f} ms total'
+        )
+
+        if stats.count > settings.SQL_QUERY_BUDGET or elapsed * 1000 > settings.SQL_LATENCY_BUDGET_MS:
+            logger.warning('Over budget: %s', summary)
+
+        for sql, count in stats.repeated(settings.SQL_REPEATED_QUERY_THRESHOLD):
+            logger.warning('Repeated query in %s, run %d times: %s', view, count, sql)
@@ -79,6 +79,8 @@ INSTALLED_APPS = [
     'profiles',
     'bag',
     'checkout',
+    'search',
+    'loadtest',
 ]
 
 MIDDLEWARE = [
@@ -93,6 +95,18 @@ MIDDLEWARE = [
     'fitforge.middleware.AuthenticatedUserSignupRedirectMiddleware',
 ]
 
+# Opt-in SQL instrumentation (fitforge.middleware.QueryInstrumentationMiddleware):
+# Server-Timing headers plus warnings for requests over the query/latency
+# budgets or repeating the same statement (N+1)
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '0') == '1'
+SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET', 25))
+SQL_LATENCY_BUDGET_MS = int(os.environ.get('SQL_LATENCY_BUDGET_MS', 500))
+SQL_REPEATED_QUERY_THRESHOLD = int(os.environ.get('SQL_REPEATED_QUERY_THRESHOLD', 5))
+
+if SQL_INSTRUMENTATION:
+    # First, so session and authentication queries are counted too
+    MIDDLEWARE.insert(0, 'fitforge.middleware.QueryInstrumentationMiddleware')
+
 # WhiteNoise is not needed in tests and can emit staticfiles directory warnings.
 if 'test' in sys.argv:
     MIDDLEWARE = [
@@ -148,6 +162,28 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Defaults to a LocMemCache per process, so a delete or version bump in one
+# gunicorn worker (or a management command) never reaches the others. For
+# more than one process set CACHE_BACKEND to a shared backend, e.g.
+# django.core.cache.backends.db.DatabaseCache with CACHE_LOCATION=fitforge_cache
+# (then run `python manage.py createcachetable`) or memcached. Without one,
+# the cache timeouts below default to seconds, which bounds how stale
+# another worker's copy can be.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+SHARED_CACHE = CACHE_BACKEND not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -230,6 +266,13 @@ else:
     )
     DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
+# Outgoing email queue (drained by `manage.py send_queued_emails`)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+# Seconds a worker holds the batch it claimed; unrecorded emails from a worker
+# that died mid-batch are picked up again after this
+EMAIL_OUTBOX_CLAIM_SECONDS = int(os.environ.get('EMAIL_OUTBOX_CLAIM_SECONDS', 600))
+
 ACCOUNT_AUTHENTICATION_METHOD = 'username_email'
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_EMAIL_VERIFICATION = 'optional'
@@ -251,6 +294,30 @@ STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
 STRIPE_WH_SECRET = os.environ.get('STRIPE_WH_SECRET', '')
 STRIPE_CURRENCY = 'eur'
+# Only set to point the stripe library elsewhere, e.g. the load test's fake Stripe
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', '')
+
+# Weekly class limit, always by the ISO week of the class date. 'counter' keeps
+# UserMembership.classes_used_this_week for classes in the current week
+# (recounted by `manage.py reset_weekly_classes`) and counts bookings for other
+# weeks; 'bookings' always counts the member's bookings, so there is no counter
+WEEKLY_CLASS_LIMIT_SOURCE = os.environ.get('WEEKLY_CLASS_LIMIT_SOURCE', 'counter')
+
+# Class catalog cache (filter dropdowns); keys are versioned, so with a shared
+# cache this only bounds how long superseded versions linger. Without one a
+# bump only reaches the worker that made it, so other workers may serve the
+# old lists for this long
+CLASS_CATALOG_CACHE_TIMEOUT = int(os.environ.get(
+    'CLASS_CATALOG_CACHE_TIMEOUT', 60 * 60 * 24 if SHARED_CACHE else 60
+))
+
+# Per-user membership cache used by the user_membership context processor;
+# entries are dropped whenever the membership or its tier is saved, and by
+# expire_memberships. Those drops only reach other processes through a
+# shared cache (see CACHES), so without one entries live for seconds
+MEMBERSHIP_CACHE_TIMEOUT = int(os.environ.get(
+    'MEMBERSHIP_CACHE_TIMEOUT', 60 * 60 if SHARED_CACHE else 30
+))
 
 # Crispy Forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
@@ -0,0 +1,162 @@
+import os
+import timeit
+from unittest import mock, skipUnless
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import get_resolver, resolve, reverse, Resolver404, URLResolver
+from fitforge.middleware import AuthenticatedUserSignupRedirectMiddleware, QueryInstrumentationMiddleware
+
+
+class SignupRedirectMiddlewareTests(TestCase):
+    """Test authenticated users are sent away from the signup and login pages"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='testpass123')
+
+    def test_authenticated_user_is_redirected_from_login(self):
+        """Test signed-in users visiting login or signup land on their profile"""
+        self.client.login(username='member', password='testpass123')
+        for name in ('account_login', 'account_signup'):
+            response = self.client.get(reverse(name))
+            self.assertRedirects(response, reverse('profiles:profile'))
+
+    def test_anonymous_user_sees_login(self):
+        """Test anonymous users can still reach the login page"""
+        response = self.client.get(reverse('account_login'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_urls_are_not_resolved_again(self):
+        """Test the middleware reuses the handler's URL match"""
+        self.client.login(username='member', password='testpass123')
+        root = get_resolver()
+        with mock.patch.object(URLResolver, 'resolve', autospec=True, side_effect=URLResolver.resolve) as spy:
+            self.client.get(reverse('class_schedule_list'))
+        self.assertEqual(sum(1 for call in spy.call_args_list if call.args[0] is root), 1)
+
+    def test_other_pages_do_not_touch_the_user(self):
+        """Test pages other than login and signup never load the session user"""
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        request.user = mock.Mock(is_authenticated=True)
+        middleware = AuthenticatedUserSignupRedirectMiddleware(lambda request: HttpResponse())
+        self.assertIsNone(middleware.process_view(request, None, (), {}))
+        self.assertEqual(request.user.mock_calls, [])
+
+
+@override_settings(SQL_QUERY_BUDGET=10, SQL_LATENCY_BUDGET_MS=10000, SQL_REPEATED_QUERY_THRESHOLD=5)
+class QueryInstrumentationMiddlewareTests(TestCase):
+    """Test the opt-in SQL instrumentation middleware"""
+
+    def request(self, queries, server_timing=None):
+        """Run a fake view making `queries` identical lookups through the middleware"""
+        def view(request):
+            for user_id in range(queries):
+                User.objects.filter(pk=user_id).exists()
+            response = HttpResponse()
+            if server_timing:
+                response['Server-Timing'] = server_timing
+            return response
+
+        request = RequestFactory().get('/bag/')
+        request.resolver_match = resolve('/bag/')
+        return QueryInstrumentationMiddleware(view)(request)
+
+    def test_server_timing_header(self):
+        """Test the response reports query count and database time"""
+        response = self.request(3)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+$')
+
+    def test_existing_server_timing_is_kept(self):
+        """Test metrics set by the view are not overwritten"""
+        response = self.request(0, server_timing='cache;dur=1')
+        self.assertTrue(response['Server-Timing'].startswith('cache;dur=1, db;dur='))
+
+    def test_quiet_within_budget(self):
+        """Test nothing is logged for a cheap request"""
+        with self.assertNoLogs('fitforge.middleware'):
+            self.request(2)
+
+    def test_over_budget_is_logged_with_url_name(self):
+        """Test requests over the query budget are logged with their URL name"""
+        with self.assertLogs('fitforge.middleware', 'WARNING') as logs:
+            self.request(11)
+        self.assertIn('Over budget: GET /bag/ (bag:view_bag) -> 200: 11 queries', logs.output[0])
+
+    def test_repeated_queries_are_flagged(self):
+        """Test the same statement run many times is reported as a likely N+1"""
+        with self.assertLogs('fitforge.middleware', 'WARNING') as logs:
+            self.request(6)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Repeated query in bag:view_bag, run 6 times: SELECT', logs.output[0])
+
+    @override_settings(MIDDLEWARE=['fitforge.middleware.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE)
+    def test_full_stack(self):
+        """Test the header is added to real responses"""
+        response = self.client.get(reverse('home'))
+        self.assertIn('Server-Timing', response)
+
+
+def legacy_middleware(get_response):
+    """The resolve()-per-request version this middleware replaced, for the benchmark"""
+    def middleware(request):
+        if request.user.is_authenticated:
+            try:
+                if resolve(request.path_info).url_name in ['account_signup', 'account_login']:
+                    return None
+            except Resolver404:
+                pass
+        return get_response(request)
+    return middleware
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run benchmarks')
+class SignupRedirectMiddlewareBenchmark(TestCase):
+    """
+    Per-request overhead of the middleware on an ordinary page, before and
+    after moving the check to process_view.
+
+        RUN_BENCHMARKS=1 python manage.py test fitforge.tests.SignupRedirectMiddlewareBenchmark
+    """
+
+    iterations = 20000
+
+    def test_overhead(self):
+        """Test process_view is cheaper than resolving every request twice"""
+        path = reverse('class_schedule_list')
+        request = RequestFactory().get(path)
+        request.user = User(username='member')
+        # The handler resolves the URL either way; only the middleware's own work is timed
+        request.resolver_match = resolve(path)
+
+        def get_response(request):
+            return None
+
+        legacy = legacy_middleware(get_response)
+        middleware = AuthenticatedUserSignupRedirectMiddleware(get_response)
+
+        def current(request):
+            middleware.process_view(request, None, (), {})
+            return middleware(request)
+
+        results = {}
+        for label, func in (('resolve() in __call__', legacy), ('process_view', current)):
+            seconds = min(timeit.repeat(lambda: func(request), number=self.iterations, repeat=5))
+            results[label] = seconds / self.iterations * 1e6
+
+        for label, micros in results.items():
+            print(f'\n{label:>22}: {micros:.2f} µs/request', end='')
+        print()
+        self.assertLess(results['process_view'], results['resolve() in __call__'])
+
+    def test_anonymous_overhead(self):
+        """Test anonymous requests stay cheap too"""
+        request = RequestFactory().get(reverse('account_login'))
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(request.path_info)
+        middleware = AuthenticatedUserSignupRedirectMiddleware(lambda request: None)
+        seconds = min(timeit.repeat(
+            lambda: middleware.process_view(request, None, (), {}), number=self.iterations, repeat=5,
+        ))
+        print(f'\n{"anonymous on login":>22}: {seconds / self.iterations * 1e6:.2f} µs/request')
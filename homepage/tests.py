@@ -1,2 +1,21 @@
+from django.test import TestCase, Client
+from django.urls import reverse
 
-# Create your tests here.
+
+class StaticPageTests(TestCase):
+    """Test policy pages stay free of database work for anonymous visitors"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_faq_runs_no_queries(self):
+        """Test the FAQ page does not touch the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('faq'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_terms_runs_no_queries(self):
+        """Test the terms page does not touch the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('terms'))
+        self.assertEqual(response.status_code, 200)
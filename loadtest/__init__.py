@@ -0,0 +1,5 @@
+"""
+Load testing for FitForge against a local fake Stripe
+
+See loadtest/__main__.py for usage: python -m loadtest <scenario> [options]
+"""
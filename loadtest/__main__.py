@@ -0,0 +1,149 @@
+"""
+Run a load test scenario against FitForge under gunicorn
+
+    python -m loadtest browse --users 20 --duration 30
+    python -m loadtest booking-storm --users 200 --capacity 20
+    python -m loadtest checkout --users 10 --duration 60 --json checkout.json
+
+By default this seeds the database named by the usual settings (DATABASE_URL
+or db.sqlite3), starts the fake Stripe and a gunicorn pointed at it, runs
+the scenario and prints per-step latency percentiles and throughput. Pass
+--base-url to target a server you started yourself; it must be running
+with STRIPE_API_BASE, STRIPE_SECRET_KEY and STRIPE_WH_SECRET matching the
+values printed at start-up for checkout to work.
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+from .fake_stripe import FakeStripe
+from .scenarios import SCENARIOS, VirtualUser
+from .seed import cleanup, seed, setup_django, storm_result
+from .stats import Recorder
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('scenario', choices=sorted(SCENARIOS))
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (the booking storm runs once)')
+    parser.add_argument('--capacity', type=int, default=20, help='Spots in the booking storm session')
+    parser.add_argument('--base-url', help='Target an already running server instead of starting gunicorn')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the gunicorn this command starts')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--stripe-port', type=int, default=0, help='Port for the fake Stripe (default: any free port)')
+    parser.add_argument('--webhook-secret', default=os.environ.get('STRIPE_WH_SECRET') or f'whsec_{secrets.token_hex(16)}')
+    parser.add_argument('--webhook-delay', type=float, default=0.0, help='Seconds before the fake Stripe sends each webhook')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this file')
+    parser.add_argument('--cleanup', action='store_true', help='Delete the seeded load test data afterwards')
+    return parser.parse_args(argv)
+
+
+def start_gunicorn(args, stripe_url):
+    """Start gunicorn on --port with the app pointed at the fake Stripe"""
+    env = dict(
+        os.environ,
+        STRIPE_API_BASE=stripe_url,
+        STRIPE_SECRET_KEY=os.environ.get('STRIPE_SECRET_KEY') or 'sk_test_loadtest',
+        STRIPE_PUBLIC_KEY=os.environ.get('STRIPE_PUBLIC_KEY') or 'pk_test_loadtest',
+        STRIPE_WH_SECRET=args.webhook_secret,
+        ALLOWED_HOSTS=','.join(filter(None, [os.environ.get('ALLOWED_HOSTS'), '127.0.0.1'])),
+    )
+    return subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'fitforge.wsgi:application',
+        '--bind', f'127.0.0.1:{args.port}',
+        '--workers', str(args.workers),
+        '--log-level', 'warning',
+    ], env=env)
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(base_url + '/', timeout=5):
+                return
+        except OSError as e:
+            # HTTPError has a code: the server is up, just unhappy with /
+            if getattr(e, 'code', None):
+                return
+            time.sleep(0.2)
+    raise SystemExit(f'{base_url} did not come up within {timeout}s')
+
+
+def run(scenario, users, duration, base_url, recorder, context, sessions=None):
+    """Run `users` virtual users through `scenario`, all starting together"""
+    start = threading.Barrier(users, action=recorder.start)
+    deadline = time.monotonic() + duration
+
+    def virtual_user(index):
+        user = VirtualUser(base_url, recorder, session_key=sessions[index] if sessions else None)
+        start.wait()
+        while time.monotonic() < deadline:
+            if scenario(user, context) is False:
+                break
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(virtual_user, range(users)))
+    recorder.stop()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_django()
+
+    recorder = Recorder()
+    base_url = (args.base_url or f'http://127.0.0.1:{args.port}').rstrip('/')
+    data = seed(members=args.users if args.scenario == 'booking-storm' else 0, capacity=args.capacity)
+
+    def on_webhook(seconds, status):
+        recorder.record('stripe: webhook delivery', seconds, ok=status == 200)
+
+    fake_stripe = FakeStripe(
+        port=args.stripe_port,
+        webhook_url=f'{base_url}/checkout/wh/',
+        webhook_secret=args.webhook_secret,
+        webhook_delay=args.webhook_delay,
+        on_webhook=on_webhook,
+    ).start()
+    print(f'Fake Stripe at {fake_stripe.url} (STRIPE_API_BASE), webhook secret {args.webhook_secret}')
+
+    server = None
+    try:
+        if not args.base_url:
+            server = start_gunicorn(args, fake_stripe.url)
+        wait_until_up(base_url)
+
+        context = dict(data, stripe_url=fake_stripe.url)
+        print(f'Running {args.scenario} with {args.users} users against {base_url}')
+        run(SCENARIOS[args.scenario], args.users, args.duration, base_url, recorder, context, data['sessions'])
+        # Let in-flight webhooks land before reporting
+        time.sleep(max(1.0, args.webhook_delay * 2) if args.scenario == 'checkout' else 0)
+
+        print()
+        print(recorder.report())
+        if args.scenario == 'booking-storm':
+            booked, spots_left = storm_result(data['schedule_id'])
+            print(f'Storm session: {booked} confirmed bookings, {spots_left} spots left (capacity {args.capacity})')
+            if booked > args.capacity or booked + spots_left != args.capacity:
+                print('Capacity invariant violated!')
+                return 1
+        if args.json_path:
+            recorder.write_json(args.json_path)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        fake_stripe.stop()
+        if args.cleanup:
+            cleanup()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+A local stand-in for the parts of the Stripe API FitForge uses
+
+Point the app at it with STRIPE_API_BASE=http://127.0.0.1:<port> and the
+stripe library sends PaymentIntent.create and PaymentIntent.modify here.
+Confirming an intent (what Stripe.js does in the browser) marks it
+succeeded and delivers a signed payment_intent.succeeded event to the
+app's webhook, exactly as Stripe would, so checkout.views.webhook verifies
+it with the same STRIPE_WH_SECRET.
+"""
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from urllib.request import Request, urlopen
+
+BILLING_KEYS = ('name', 'email', 'phone')
+ADDRESS_KEYS = ('line1', 'line2', 'city', 'state', 'postal_code', 'country')
+INTENT_PATH = re.compile(r'^/v1/payment_intents/(?P<id>pi_\w+)(?P<confirm>/confirm)?$')
+
+
+def parse_form(body):
+    """
+    Decode a Stripe-style form body, expanding keys like metadata[bag] and
+    payment_method_data[billing_details][address][city] into nested dicts.
+    """
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r'[^\[\]]+', key)
+        target = data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return data
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Build a Stripe-Signature header for `payload` (bytes)"""
+    timestamp = int(timestamp or time.time())
+    signed = f'{timestamp}.'.encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def succeeded_event(intent):
+    """A payment_intent.succeeded event for `intent`"""
+    return {
+        'id': f'evt_{secrets.token_hex(12)}',
+        'object': 'event',
+        'type': 'payment_intent.succeeded',
+        'created': int(time.time()),
+        'data': {'object': intent},
+    }
+
+
+class FakeStripe:
+    """
+    In-memory PaymentIntents served over HTTP on a background thread.
+
+    webhook_url and webhook_secret say where and how to deliver events;
+    without a webhook_url confirmations just mark the intent succeeded.
+    Every delivery is passed to on_webhook(seconds, status_code) so the
+    load test can report webhook latency alongside page timings.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, webhook_url=None, webhook_secret='',
+                 webhook_delay=0.0, on_webhook=None):
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.webhook_delay = webhook_delay
+        self.on_webhook = on_webhook
+        self.intents = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def create_intent(self, params):
+        intent_id = f'pi_{secrets.token_hex(12)}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(params.get('amount', 0)),
+            'currency': params.get('currency', 'eur'),
+            'client_secret': f'{intent_id}_secret_{secrets.token_hex(12)}',
+            'metadata': params.get('metadata', {}),
+            'status': 'requires_payment_method',
+            'created': int(time.time()),
+            'charges': {'object': 'list', 'data': []},
+        }
+        with self.lock:
+            self.intents[intent_id] = intent
+        return intent
+
+    def modify_intent(self, intent_id, params):
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return None
+            intent['metadata'].update(params.get('metadata', {}))
+            return intent
+
+    def confirm_intent(self, intent_id, params):
+        given = params.get('payment_method_data', {}).get('billing_details', {})
+        # Like Stripe, every field is present and null when not supplied
+        billing_details = {key: given.get(key) for key in BILLING_KEYS}
+        billing_details['address'] = {key: given.get('address', {}).get(key) for key in ADDRESS_KEYS}
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return None
+            intent['status'] = 'succeeded'
+            intent['charges']['data'] = [{
+                'id': f'ch_{secrets.token_hex(12)}',
+                'object': 'charge',
+                'amount': intent['amount'],
+                'billing_details': billing_details,
+            }]
+            event = succeeded_event(json.loads(json.dumps(intent)))
+
+        if self.webhook_url:
+            threading.Thread(target=self.deliver, args=(event,), daemon=True).start()
+        return intent
+
+    def deliver(self, event):
+        """POST a signed event to the app's webhook"""
+        if self.webhook_delay:
+            time.sleep(self.webhook_delay)
+        payload = json.dumps(event).encode()
+        request = Request(self.webhook_url, data=payload, method='POST', headers={
+            'Content-Type': 'application/json',
+            'Stripe-Signature': sign_payload(payload, self.webhook_secret),
+        })
+        started = time.perf_counter()
+        try:
+            with urlopen(request, timeout=30) as response:
+                status = response.status
+        except OSError as e:
+            status = getattr(e, 'code', None) or 0
+        if self.on_webhook:
+            self.on_webhook(time.perf_counter() - started, status)
+
+    def handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def not_found(self):
+                self.send_json(404, {'error': {
+                    'type': 'invalid_request_error',
+                    'message': f'No such resource: {self.path}',
+                }})
+
+            def do_GET(self):
+                match = INTENT_PATH.match(self.path)
+                intent = match and not match['confirm'] and fake.intents.get(match['id'])
+                if intent:
+                    self.send_json(200, intent)
+                else:
+                    self.not_found()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                params = parse_form(self.rfile.read(length).decode())
+
+                if self.path == '/v1/payment_intents':
+                    self.send_json(200, fake.create_intent(params))
+                    return
+
+                match = INTENT_PATH.match(self.path)
+                intent = None
+                if match and match['confirm']:
+                    intent = fake.confirm_intent(match['id'], params)
+                elif match:
+                    intent = fake.modify_intent(match['id'], params)
+
+                if intent is None:
+                    self.not_found()
+                else:
+                    self.send_json(200, intent)
+
+        return Handler
@@ -0,0 +1,439 @@
+import random
+import time as timer
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.signals import post_delete
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from bookings.models import Booking
+from checkout.models import Order, OrderLineItem
+from checkout.signals import update_on_delete
+from classes.catalog import bump_catalog_version
+from classes.models import ClassCategory, ClassSchedule, FitnessClass
+from classes.utils import build_schedules
+from memberships.models import MembershipTier, UserMembership
+from products.models import Product, ProductCategory
+from profiles.models import UserProfile
+from search.index import SEARCH_FIELDS, get_backend, rebuild
+
+PREFIX = 'synthetic'
+EMAIL_DOMAIN = 'synthetic.example.com'
+SKU_PREFIX = 'SYNTHETIC-'
+CLASS_PREFIX = 'Synthetic class'
+TIER_PREFIX = 'Synthetic'
+
+FIRST_NAMES = ['Aoife', 'Sean', 'Niamh', 'Conor', 'Ciara', 'Darragh', 'Emma', 'Jack', 'Sophie', 'Liam']
+LAST_NAMES = ['Murphy', 'Kelly', 'Byrne', 'Walsh', 'Ryan', "O'Brien", 'Doyle', 'Lynch', 'Nolan', 'Kavanagh']
+TOWNS = ['Dublin', 'Cork', 'Galway', 'Limerick', 'Waterford', 'Kilkenny', 'Sligo', 'Athlone']
+INSTRUCTORS = ['Alex', 'Sam', 'Jordan', 'Casey', 'Morgan', 'Riley', 'Taylor', 'Quinn']
+
+# (status, weight) for members, and for bookings of past and upcoming sessions
+MEMBERSHIP_STATUSES = [('active', 55), ('expired', 30), ('cancelled', 10), ('pending', 5)]
+PAST_BOOKING_STATUSES = [('attended', 80), ('no_show', 8), ('cancelled', 12)]
+UPCOMING_BOOKING_STATUSES = [('confirmed', 90), ('cancelled', 10)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate production-shaped synthetic data (members, memberships, products, '
+        'years of class schedules, bookings and orders) for performance and index work. '
+        'The same --seed and --as-of always produce the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Members to create, each with a profile')
+        parser.add_argument('--products', type=int, default=500, help='Shop products to create')
+        parser.add_argument('--classes', type=int, default=100, help='Fitness classes to create')
+        parser.add_argument(
+            '--slots-per-week',
+            type=int,
+            default=10,
+            help='Weekly sessions of each class',
+        )
+        parser.add_argument('--years', type=int, default=2, help='Years of past class schedules')
+        parser.add_argument(
+            '--weeks-ahead',
+            type=int,
+            default=4,
+            help='Weeks of upcoming class schedules after --as-of',
+        )
+        parser.add_argument('--bookings', type=int, default=1000000, help='Class bookings to create')
+        parser.add_argument('--orders', type=int, default=100000, help='Shop orders to create')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument(
+            '--as-of',
+            help='Date the data is generated around (YYYY-MM-DD, default today)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows inserted per bulk_create chunk',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete previously generated synthetic data first',
+        )
+
+    def handle(self, *args, **options):
+        started = timer.perf_counter()
+
+        if options['as_of']:
+            try:
+                self.today = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must be in YYYY-MM-DD format')
+        else:
+            self.today = timezone.now().date()
+        self.first_day = self.today - timedelta(days=365 * options['years'])
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(username__startswith=f'{PREFIX}-').exists():
+            raise CommandError('Synthetic data already exists; pass --clear to replace it')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generating synthetic data from {self.first_day} to '
+            f'{self.today + timedelta(weeks=options["weeks_ahead"])} with seed {options["seed"]}'
+        ))
+
+        with transaction.atomic():
+            user_ids = self.step('users', self.create_users, options['users'])
+            self.step('memberships', self.create_memberships, user_ids)
+            products = self.step('products', self.create_products, options['products'])
+            schedules = self.step(
+                'class schedules', self.create_schedules,
+                options['classes'], options['slots_per_week'], options['weeks_ahead'],
+            )
+            self.step('bookings', self.create_bookings, options['bookings'], user_ids, schedules)
+            self.step('orders', self.create_orders, options['orders'], user_ids, products)
+
+        # bulk_create sends no signals, so refresh what the save signals keep up to date
+        bump_catalog_version()
+        if get_backend() is not None:
+            for label in SEARCH_FIELDS:
+                rebuild(apps.get_model(label))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully generated synthetic data in {timer.perf_counter() - started:.2f}s'
+        ))
+
+    def step(self, name, create, *args):
+        """Run one generator and report how many rows it wrote and how long it took"""
+        started = timer.perf_counter()
+        created = create(*args)
+        count = created if isinstance(created, int) else len(created)
+        self.stdout.write(f'Created {count} {name} in {timer.perf_counter() - started:.2f}s')
+        return created
+
+    def clear(self):
+        started = timer.perf_counter()
+        orders = Order.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+        # A line item's post_delete signal re-totals its order, which is wasted on
+        # orders about to go; without it the line items are deleted in bulk
+        post_delete.disconnect(update_on_delete, sender=OrderLineItem)
+        try:
+            orders.delete()
+        finally:
+            post_delete.connect(update_on_delete, sender=OrderLineItem)
+        User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+        FitnessClass.objects.filter(name__startswith=CLASS_PREFIX).delete()
+        Product.objects.filter(sku__startswith=SKU_PREFIX).delete()
+        MembershipTier.objects.filter(name__startswith=TIER_PREFIX).delete()
+        self.stdout.write(self.style.WARNING(
+            f'Cleared existing synthetic data in {timer.perf_counter() - started:.2f}s'
+        ))
+
+    def weighted(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights)[0]
+
+    def moment(self, day):
+        """A UTC datetime on `day` during opening hours"""
+        return datetime.combine(
+            day, time(self.rng.randint(6, 21), self.rng.randrange(60), self.rng.randrange(60)), timezone.utc,
+        )
+
+    def insert(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def insert_backdated(self, model, objects, field, key):
+        """
+        Insert `objects`, then restore the `field` values they were built with,
+        which auto_now_add replaces with now(), in bulk UPDATEs so history
+        spreads over the years. `key` names unique fields that match the new
+        rows up, as SQLite returns no ids from bulk_create. Returns {key: id}.
+        """
+        stamps = {tuple(getattr(obj, name) for name in key): getattr(obj, field) for obj in objects}
+        last_pk = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        self.insert(model, objects)
+
+        rows = model.objects.filter(pk__gt=last_pk).values_list('pk', *key)
+        ids = {}
+        for pk, *values in rows.iterator(chunk_size=self.batch_size):
+            if tuple(values) in stamps:
+                ids[tuple(values)] = pk
+        model.objects.bulk_update(
+            [model(pk=pk, **{field: stamps[values]}) for values, pk in ids.items()],
+            [field],
+            batch_size=self.batch_size,
+        )
+        return ids
+
+    def create_users(self, count):
+        """Members and their profiles; returns the new user ids in username order"""
+        password = make_password(None)
+        window = (self.today - self.first_day).days
+        for start in range(0, count, self.batch_size):
+            users = []
+            for i in range(start, min(start + self.batch_size, count)):
+                users.append(User(
+                    username=f'{PREFIX}-{i:07d}',
+                    email=f'{PREFIX}-{i:07d}@{EMAIL_DOMAIN}',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                    date_joined=self.moment(self.first_day + timedelta(days=self.rng.randrange(window or 1))),
+                ))
+            self.insert(User, users)
+
+        user_ids = list(
+            User.objects.filter(username__startswith=f'{PREFIX}-').order_by('username').values_list('id', flat=True)
+        )
+        # The profile signal only fires on save()
+        for start in range(0, len(user_ids), self.batch_size):
+            self.insert(UserProfile, [
+                UserProfile(
+                    user_id=user_id,
+                    phone_number=f'08{self.rng.randrange(10 ** 8):08d}',
+                    default_town_or_city=self.rng.choice(TOWNS),
+                    default_country='IE',
+                )
+                for user_id in user_ids[start:start + self.batch_size]
+            ])
+        return user_ids
+
+    def membership_tiers(self):
+        tiers = list(MembershipTier.objects.filter(is_active=True).order_by('price'))
+        if tiers:
+            return tiers
+        MembershipTier.objects.bulk_create([
+            MembershipTier(
+                name=f'{TIER_PREFIX} {name}', description=f'{name} synthetic tier',
+                price=Decimal(price), classes_per_week=classes_per_week,
+            )
+            for name, price, classes_per_week in [('Basic', '29.99', 2), ('Standard', '49.99', 4), ('Premium', '79.99', 99)]
+        ])
+        return list(MembershipTier.objects.filter(name__startswith=TIER_PREFIX).order_by('price'))
+
+    def create_memberships(self, user_ids):
+        """Three in four members hold a membership, current or lapsed"""
+        tiers = self.membership_tiers()
+        history = (self.today - self.first_day).days or 1
+        memberships = []
+        for user_id in user_ids:
+            if self.rng.random() >= 0.75:
+                continue
+            status = self.weighted(MEMBERSHIP_STATUSES)
+            if status in ('active', 'pending'):
+                end_date = self.today + timedelta(days=self.rng.randint(0, 30))
+            else:
+                end_date = self.today - timedelta(days=self.rng.randint(1, history))
+            memberships.append(UserMembership(
+                user_id=user_id,
+                membership_tier=self.rng.choice(tiers),
+                start_date=end_date - timedelta(days=30),
+                end_date=end_date,
+                status=status,
+                auto_renew=self.rng.random() < 0.4,
+            ))
+        self.insert(UserMembership, memberships)
+        return len(memberships)
+
+    def create_products(self, count):
+        categories = list(ProductCategory.objects.order_by('pk')) or [None]
+        self.insert(Product, [
+            Product(
+                sku=f'{SKU_PREFIX}{i:06d}',
+                name=f'Synthetic product {i}',
+                description='Generated for scale testing',
+                category=self.rng.choice(categories),
+                price=Decimal(self.rng.randint(500, 15000)) / 100,
+                stock_quantity=self.rng.randint(0, 500),
+                rating=Decimal(self.rng.randint(100, 500)) / 100,
+            )
+            for i in range(count)
+        ])
+        return list(Product.objects.filter(sku__startswith=SKU_PREFIX).order_by('sku').values('id', 'price'))
+
+    def create_schedules(self, count, slots_per_week, weeks_ahead):
+        """
+        Classes with `slots_per_week` weekly sessions from --years back to
+        `weeks_ahead` weeks after --as-of. Returns (id, date, places) for
+        every session in date order, where places is the share of capacity
+        the class's popularity will fill.
+        """
+        categories = list(ClassCategory.objects.order_by('pk')) or [None]
+        self.insert(FitnessClass, [
+            FitnessClass(
+                name=f'{CLASS_PREFIX} {i:04d}',
+                description='Generated for scale testing',
+                category=self.rng.choice(categories),
+                duration=self.rng.choice([30, 45, 60]),
+                difficulty=self.rng.choice(FitnessClass.DIFFICULTY_CHOICES)[0],
+                instructor=self.rng.choice(INSTRUCTORS),
+                max_capacity=self.rng.choice([10, 12, 15, 20, 25, 30]),
+            )
+            for i in range(count)
+        ])
+
+        end_date = self.today + timedelta(weeks=weeks_ahead)
+        popularity = {}
+        created = 0
+        for fitness_class in FitnessClass.objects.filter(name__startswith=CLASS_PREFIX).order_by('name'):
+            slots = self.rng.sample(
+                [(weekday, time(hour, 0)) for weekday in range(7) for hour in range(6, 21)],
+                min(slots_per_week, 7 * 15),
+            )
+            schedules = build_schedules(fitness_class, self.first_day, end_date, slots)
+            popularity[fitness_class.pk] = (fitness_class.max_capacity, self.rng.uniform(0.3, 1.0))
+            self.insert(ClassSchedule, schedules)
+            created += len(schedules)
+
+        rows = ClassSchedule.objects.filter(
+            fitness_class__name__startswith=CLASS_PREFIX,
+        ).order_by('date', 'start_time', 'fitness_class__name').values_list('id', 'date', 'fitness_class_id')
+        return [
+            (schedule_id, day, max(1, round(popularity[class_id][0] * popularity[class_id][1])))
+            for schedule_id, day, class_id in rows.iterator(chunk_size=self.batch_size)
+        ]
+
+    def create_bookings(self, count, user_ids, schedules):
+        """
+        Spread `count` bookings over the sessions in proportion to their
+        places, with distinct members per session, then set available_spots
+        to what the bookings left.
+        """
+        places = [min(session_places, len(user_ids)) for _, _, session_places in schedules]
+        offsets = []
+        total = 0
+        for session_places in places:
+            offsets.append(total)
+            total += session_places
+        if count > total:
+            self.stdout.write(self.style.WARNING(
+                f'Only {total} places across the generated sessions; creating {total} bookings'
+            ))
+            count = total
+
+        seats = sorted(self.rng.sample(range(total), count))
+        bookings = []
+        created = 0
+        for (schedule_id, day, _), offset, session_places in zip(schedules, offsets, places):
+            taken = bisect_left(seats, offset + session_places) - bisect_left(seats, offset)
+            if not taken:
+                continue
+            statuses = UPCOMING_BOOKING_STATUSES if day >= self.today else PAST_BOOKING_STATUSES
+            for user_id in self.rng.sample(user_ids, taken):
+                booked_on = max(day - timedelta(days=self.rng.randint(0, 14)), self.first_day)
+                bookings.append(Booking(
+                    user_id=user_id,
+                    class_schedule_id=schedule_id,
+                    class_date=day,
+                    booking_date=self.moment(min(booked_on, self.today)),
+                    status=self.weighted(statuses),
+                ))
+            if len(bookings) >= self.batch_size:
+                self.insert_backdated(Booking, bookings, 'booking_date', ['user_id', 'class_schedule_id'])
+                created += len(bookings)
+                bookings = []
+        self.insert_backdated(Booking, bookings, 'booking_date', ['user_id', 'class_schedule_id'])
+        created += len(bookings)
+
+        booked = Booking.objects.filter(
+            class_schedule=OuterRef('pk'),
+        ).exclude(status='cancelled').order_by().values('class_schedule').annotate(n=Count('pk')).values('n')
+        # One UPDATE per class, as an UPDATE can't read max_capacity through the join
+        for class_id, max_capacity in FitnessClass.objects.filter(
+            name__startswith=CLASS_PREFIX,
+        ).values_list('id', 'max_capacity'):
+            ClassSchedule.objects.filter(fitness_class_id=class_id).update(
+                available_spots=Value(max_capacity) - Coalesce(Subquery(booked), 0),
+                updated_at=timezone.now(),
+            )
+        return created
+
+    def create_orders(self, count, user_ids, products):
+        """
+        Orders from members and guests, mostly shop items with the odd
+        membership purchase, totalled the way Order.update_total() does.
+        """
+        if not products:
+            return 0
+        tiers = self.membership_tiers()
+        free_delivery_threshold = Decimal(str(settings.FREE_DELIVERY_THRESHOLD))
+        standard_delivery_cost = Decimal(str(settings.STANDARD_DELIVERY_COST))
+        history = (self.today - self.first_day).days or 1
+
+        created = 0
+        for start in range(0, count, self.batch_size):
+            orders = []
+            lines = {}
+            for i in range(start, min(start + self.batch_size, count)):
+                if self.rng.random() < 0.1:
+                    items = [(None, self.rng.choice(tiers), 1)]
+                else:
+                    items = [
+                        (product, None, self.rng.randint(1, 3))
+                        for product in self.rng.sample(products, min(len(products), self.rng.randint(1, 4)))
+                    ]
+                lines_total = sum(
+                    (product['price'] if product else tier.price) * quantity
+                    for product, tier, quantity in items
+                )
+                has_products = items[0][0] is not None
+                delivery = standard_delivery_cost if has_products and lines_total < free_delivery_threshold else Decimal('0.00')
+
+                user_id = self.rng.choice(user_ids) if user_ids and self.rng.random() < 0.8 else None
+                name = f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+                order = Order(
+                    order_number=f'{self.rng.getrandbits(128):032X}',
+                    user_id=user_id,
+                    full_name=name,
+                    email=f'{PREFIX}-order-{i:07d}@{EMAIL_DOMAIN}',
+                    phone_number=f'08{self.rng.randrange(10 ** 8):08d}',
+                    street_address1=f'{self.rng.randint(1, 200)} Main Street',
+                    town_or_city=self.rng.choice(TOWNS),
+                    country='IE',
+                    date=self.moment(self.today - timedelta(days=self.rng.randrange(history))),
+                    order_total=lines_total,
+                    delivery_cost=delivery,
+                    grand_total=lines_total + delivery,
+                )
+                orders.append(order)
+                lines[order.order_number] = items
+            order_ids = self.insert_backdated(Order, orders, 'date', ['order_number'])
+            self.insert(OrderLineItem, [
+                OrderLineItem(
+                    order_id=order_ids[(order_number,)],
+                    product_id=product['id'] if product else None,
+                    membership=tier,
+                    quantity=quantity,
+                    lineitem_total=(product['price'] if product else tier.price) * quantity,
+                )
+                for order_number, items in lines.items()
+                for product, tier, quantity in items
+            ])
+            created += len(orders)
+        return created
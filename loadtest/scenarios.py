@@ -0,0 +1,153 @@
+"""
+Load test scenarios
+
+Each scenario is a function run over and over by every virtual user until
+the test ends or it returns False. A virtual user is one requests.Session,
+so it keeps its own cookies (session, CSRF) like a browser would.
+"""
+import random
+import time
+import requests
+from urllib.parse import urlparse
+
+
+class VirtualUser:
+    """One simulated visitor, timing every request it makes"""
+
+    def __init__(self, base_url, recorder, session_key=None):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.http = requests.Session()
+        if session_key:
+            self.http.cookies.set('sessionid', session_key, domain=urlparse(base_url).hostname)
+        self.etags = {}
+
+    def request(self, step, method, path, expect=(200,), **kwargs):
+        """Make a request, record its latency under `step` and return the response (or None)"""
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', 30)
+        url = path if path.startswith('http') else self.base_url + path
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(step, time.perf_counter() - started, ok=False)
+            return None
+        self.recorder.record(step, time.perf_counter() - started, ok=response.status_code in expect)
+        return response
+
+    def get(self, step, path, **kwargs):
+        return self.request(step, 'GET', path, **kwargs)
+
+    def post(self, step, path, data=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        headers.setdefault('X-CSRFToken', self.http.cookies.get('csrftoken', ''))
+        headers.setdefault('Referer', self.base_url + '/')
+        return self.request(step, 'POST', path, data=data, headers=headers, **kwargs)
+
+    def get_revalidated(self, step, path):
+        """GET with If-None-Match from the previous response, as the schedule page's poller does"""
+        headers = {'If-None-Match': self.etags[path]} if path in self.etags else {}
+        response = self.get(step, path, headers=headers, expect=(200, 304))
+        if response is not None and response.headers.get('ETag'):
+            self.etags[path] = response.headers['ETag']
+        return response
+
+
+def browse(user, context):
+    """Anonymous visitor looking at the timetable, classes and shop"""
+    user.get('browse: schedule list', '/classes/schedules/')
+    user.get_revalidated('browse: availability', '/classes/schedules/availability/')
+    user.get('browse: class list', '/classes/')
+    user.get('browse: products', '/products/')
+    if context['product_ids']:
+        user.get('browse: product detail', f'/products/{random.choice(context["product_ids"])}/')
+
+
+def booking_storm(user, context):
+    """
+    A member booking the one storm session, once.
+
+    Every member hits the same ClassSchedule row at the same moment; the
+    outcome shows whether capacity held (booked never exceeds the spots).
+    Returns False to tell the runner this user is done.
+    """
+    response = user.get('storm: book class', f'/bookings/book/{context["schedule_id"]}/', expect=(302,))
+    if response is not None:
+        location = response.headers.get('Location', '')
+        if 'my-bookings' in location:
+            user.recorder.outcome('booked')
+        elif 'schedules' in location:
+            user.recorder.outcome('full')
+        else:
+            user.recorder.outcome(f'redirected to {location or response.status_code}')
+    return False
+
+
+def checkout(user, context):
+    """
+    Guest checkout: add to bag, create and confirm a payment intent against
+    the fake Stripe, submit the order and let the signed webhook race it.
+    """
+    product_id = random.choice(context['product_ids'])
+    user.get('checkout: product detail', f'/products/{product_id}/')
+    user.post('checkout: add to bag', f'/bag/add/{product_id}/', {
+        'quantity': 1,
+        'redirect_url': f'/products/{product_id}/',
+    }, expect=(302,))
+    user.get('checkout: checkout page', '/checkout/')
+
+    response = user.post('checkout: create_payment_intent', '/checkout/create_payment_intent/')
+    if response is None or response.status_code != 200:
+        return
+    client_secret = response.json()['clientSecret']
+    pid = client_secret.split('_secret')[0]
+
+    user.post('checkout: cache_checkout_data', '/checkout/cache_checkout_data/', {
+        'client_secret': client_secret,
+        'save_info': '',
+    })
+
+    email = f'guest{random.randrange(10 ** 9)}@loadtest.example.com'
+    billing = {
+        'name': 'Load Test',
+        'email': email,
+        'phone': '0000000000',
+        'address': {
+            'line1': '1 Load Street',
+            'line2': '',
+            'city': 'Dublin',
+            'state': '',
+            'postal_code': 'D01',
+            'country': 'IE',
+        },
+    }
+    # What Stripe.js does in the browser; the fake then fires the webhook
+    user.request('stripe: confirm', 'POST', f'{context["stripe_url"]}/v1/payment_intents/{pid}/confirm', data={
+        f'payment_method_data[billing_details][{key}]': value
+        for key, value in billing.items() if key != 'address'
+    } | {
+        f'payment_method_data[billing_details][address][{key}]': value
+        for key, value in billing['address'].items()
+    })
+
+    response = user.post('checkout: submit order', '/checkout/', {
+        'full_name': billing['name'],
+        'email': email,
+        'phone_number': billing['phone'],
+        'street_address1': billing['address']['line1'],
+        'town_or_city': billing['address']['city'],
+        'postcode': billing['address']['postal_code'],
+        'country': billing['address']['country'],
+        'client_secret': client_secret,
+    }, expect=(302,))
+    if response is not None and 'checkout_success' in response.headers.get('Location', ''):
+        user.get('checkout: success page', response.headers['Location'])
+        user.recorder.outcome('orders')
+
+
+SCENARIOS = {
+    'browse': browse,
+    'booking-storm': booking_storm,
+    'checkout': checkout,
+}
@@ -0,0 +1,131 @@
+"""
+Load test fixtures, written straight to the app's database
+
+Everything created here is tagged with the loadtest prefix so cleanup()
+removes it again. Member sessions are minted directly in the session store,
+so the booking storm measures booking rather than password hashing.
+"""
+import os
+from datetime import time, timedelta
+from decimal import Decimal
+from importlib import import_module
+
+PREFIX = 'loadtest'
+
+
+def setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fitforge.settings')
+    django.setup()
+
+
+def seed(members=50, capacity=20, products=5):
+    """
+    Create members with active memberships, a storm class with one session
+    tomorrow and some well-stocked products.
+
+    Returns the ids and member session keys the scenarios need.
+    """
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from classes.models import FitnessClass, ClassSchedule
+    from memberships.models import MembershipTier, UserMembership
+    from products.models import Product
+
+    today = timezone.now().date()
+    tier, _ = MembershipTier.objects.get_or_create(
+        name=f'{PREFIX} unlimited',
+        defaults={'description': 'Load test tier', 'price': Decimal('1.00'), 'classes_per_week': 1000},
+    )
+
+    usernames = [f'{PREFIX}-{i}' for i in range(members)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    User.objects.bulk_create([
+        User(username=username, email=f'{username}@example.com', password='!')
+        for username in usernames if username not in existing
+    ])
+    users = list(User.objects.filter(username__in=usernames).order_by('id'))
+
+    UserMembership.objects.filter(user__in=users).delete()
+    UserMembership.objects.bulk_create([
+        UserMembership(
+            user=user,
+            membership_tier=tier,
+            start_date=today,
+            end_date=today + timedelta(days=30),
+            status='active',
+        )
+        for user in users
+    ])
+
+    fitness_class, _ = FitnessClass.objects.get_or_create(
+        name=f'{PREFIX} storm class',
+        defaults={'description': 'Load test class', 'duration': 45, 'instructor': 'Load', 'max_capacity': capacity},
+    )
+    # A fresh session each run, so every storm starts with every spot free
+    ClassSchedule.objects.filter(fitness_class=fitness_class).delete()
+    schedule = ClassSchedule.objects.create(
+        fitness_class=fitness_class,
+        date=today + timedelta(days=1),
+        start_time=time(12, 0),
+        end_time=time(12, 45),
+        available_spots=capacity,
+    )
+
+    for i in range(products):
+        Product.objects.update_or_create(
+            sku=f'{PREFIX.upper()}-{i}',
+            defaults={
+                'name': f'Load test product {i}',
+                'description': 'Load test product',
+                'price': Decimal('9.99'),
+                'stock_quantity': 1_000_000,
+            },
+        )
+    product_ids = list(
+        Product.objects.filter(sku__startswith=f'{PREFIX.upper()}-').order_by('id').values_list('id', flat=True)
+    )
+
+    return {
+        'schedule_id': schedule.id,
+        'product_ids': product_ids,
+        'sessions': [mint_session(user) for user in users],
+    }
+
+
+def mint_session(user):
+    """Create a logged-in session for `user` and return its key"""
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def storm_result(schedule_id):
+    """Confirmed bookings and spots left on the storm session"""
+    from bookings.models import Booking
+    from classes.models import ClassSchedule
+
+    schedule = ClassSchedule.objects.get(pk=schedule_id)
+    booked = Booking.objects.filter(class_schedule=schedule, status='confirmed').count()
+    return booked, schedule.available_spots
+
+
+def cleanup():
+    """Delete everything seed() created, plus orders placed by the checkout scenario"""
+    from django.contrib.auth.models import User
+    from checkout.models import Order
+    from classes.models import FitnessClass
+    from memberships.models import MembershipTier
+    from products.models import Product
+
+    Order.objects.filter(email__endswith='@loadtest.example.com').delete()
+    User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+    FitnessClass.objects.filter(name__startswith=PREFIX).delete()
+    MembershipTier.objects.filter(name__startswith=PREFIX).delete()
+    Product.objects.filter(sku__startswith=f'{PREFIX.upper()}-').delete()
@@ -0,0 +1,112 @@
+"""Latency and throughput bookkeeping for the load test"""
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class Recorder:
+    """
+    Thread-safe collection of timings per step, e.g. 'checkout: create_payment_intent'.
+
+    Outcomes (booked, full, ...) are counted separately so scenarios can
+    report what happened as well as how long it took.
+    """
+
+    percentiles = (50, 90, 95, 99)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+        self.outcomes = Counter()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, step, seconds, ok=True):
+        with self.lock:
+            self.timings[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def outcome(self, name):
+        with self.lock:
+            self.outcomes[name] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        """Per-step counts, error counts, throughput and latency percentiles in ms"""
+        with self.lock:
+            timings = {step: sorted(values) for step, values in self.timings.items()}
+            errors = dict(self.errors)
+            outcomes = dict(self.outcomes)
+
+        elapsed = self.elapsed
+        steps = {}
+        for step, values in sorted(timings.items()):
+            steps[step] = {
+                'requests': len(values),
+                'errors': errors.get(step, 0),
+                'rps': len(values) / elapsed if elapsed else 0.0,
+                'mean_ms': sum(values) / len(values) * 1000,
+                'max_ms': values[-1] * 1000,
+                **{f'p{pct}_ms': percentile(values, pct) * 1000 for pct in self.percentiles},
+            }
+        total = sum(step['requests'] for step in steps.values())
+        return {
+            'elapsed_s': elapsed,
+            'requests': total,
+            'errors': sum(errors.values()),
+            'rps': total / elapsed if elapsed else 0.0,
+            'outcomes': outcomes,
+            'steps': steps,
+        }
+
+    def report(self):
+        """Render the summary as a plain-text table"""
+        summary = self.summary()
+        width = max([len(step) for step in summary['steps']] + [4])
+        columns = ['reqs', 'errs', 'req/s', 'mean'] + [f'p{pct}' for pct in self.percentiles] + ['max']
+        lines = [
+            f'{"step":<{width}}  ' + '  '.join(f'{column:>8}' for column in columns),
+        ]
+        for step, stats in summary['steps'].items():
+            values = [
+                f'{stats["requests"]:>8}',
+                f'{stats["errors"]:>8}',
+                f'{stats["rps"]:>8.1f}',
+                f'{stats["mean_ms"]:>8.1f}',
+            ] + [f'{stats[f"p{pct}_ms"]:>8.1f}' for pct in self.percentiles] + [f'{stats["max_ms"]:>8.1f}']
+            lines.append(f'{step:<{width}}  ' + '  '.join(values))
+
+        lines.append('')
+        lines.append(
+            f'{summary["requests"]} requests in {summary["elapsed_s"]:.1f}s '
+            f'({summary["rps"]:.1f} req/s), {summary["errors"]} errors; latencies in ms'
+        )
+        if summary['outcomes']:
+            lines.append('Outcomes: ' + ', '.join(f'{name}={count}' for name, count in sorted(summary['outcomes'].items())))
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w') as report_file:
+            json.dump(self.summary(), report_file, indent=2)
@@ -0,0 +1,168 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import stripe
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from bookings.models import Booking
+from checkout.models import Order, OrderLineItem
+from classes.models import ClassSchedule
+from products.models import Product
+from profiles.models import UserProfile
+from loadtest.fake_stripe import FakeStripe, parse_form, sign_payload, succeeded_event
+from loadtest.stats import Recorder, percentile
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+class FakeStripeTests(TestCase):
+    """Test the fake Stripe against the real stripe library and webhook view"""
+
+    def setUp(self):
+        self.fake = FakeStripe().start()
+        self.addCleanup(self.fake.stop)
+        patcher = mock.patch.object(stripe, 'api_base', self.fake.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.product = Product.objects.create(
+            sku='LT-1', name='Band', description='Resistance band', price=Decimal('10.00'), stock_quantity=5,
+        )
+
+    def test_parse_form(self):
+        """Test Stripe-style nested form keys are expanded"""
+        self.assertEqual(
+            parse_form('amount=100&metadata[bag]=%7B%7D&a[b][c]=d'),
+            {'amount': '100', 'metadata': {'bag': '{}'}, 'a': {'b': {'c': 'd'}}},
+        )
+
+    def test_create_and_modify(self):
+        """Test PaymentIntent.create and PaymentIntent.modify round-trip through the fake"""
+        intent = stripe.PaymentIntent.create(amount=1999, currency='eur', api_key='sk_test')
+        self.assertTrue(intent.client_secret.startswith(f'{intent.id}_secret_'))
+        stripe.PaymentIntent.modify(intent.id, metadata={'bag': '{"1": 2}'}, api_key='sk_test')
+        self.assertEqual(self.fake.intents[intent.id]['metadata'], {'bag': '{"1": 2}'})
+
+    @override_settings(STRIPE_WH_SECRET=WEBHOOK_SECRET)
+    def test_signed_webhook_creates_order(self):
+        """Test a confirmed intent's event passes signature checks and creates the order"""
+        intent = self.fake.create_intent({
+            'amount': '2000',
+            'metadata': {'bag': json.dumps({str(self.product.id): 2}), 'user_id': ''},
+        })
+        self.fake.confirm_intent(intent['id'], parse_form(
+            'payment_method_data[billing_details][name]=Load+Test'
+            '&payment_method_data[billing_details][email]=guest@loadtest.example.com'
+            '&payment_method_data[billing_details][phone]=123'
+            '&payment_method_data[billing_details][address][line1]=1+Street'
+            '&payment_method_data[billing_details][address][line2]='
+            '&payment_method_data[billing_details][address][city]=Dublin'
+            '&payment_method_data[billing_details][address][state]='
+            '&payment_method_data[billing_details][address][postal_code]=D01'
+            '&payment_method_data[billing_details][address][country]=IE'
+        ))
+        payload = json.dumps(succeeded_event(self.fake.intents[intent['id']])).encode()
+
+        response = self.client.post(
+            reverse('checkout:webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, WEBHOOK_SECRET),
+        )
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(stripe_pid=intent['id'])
+        self.assertEqual(order.email, 'guest@loadtest.example.com')
+        self.assertEqual(order.lineitems.get().quantity, 2)
+
+        response = self.client.post(
+            reverse('checkout:webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, 'whsec_wrong'),
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RecorderTests(TestCase):
+    """Test the load test's latency statistics"""
+
+    def test_percentile(self):
+        """Test percentiles interpolate between samples"""
+        values = [0.1, 0.2, 0.3, 0.4]
+        self.assertAlmostEqual(percentile(values, 50), 0.25)
+        self.assertAlmostEqual(percentile(values, 100), 0.4)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summary(self):
+        """Test per-step counts, errors and percentiles are reported in milliseconds"""
+        recorder = Recorder()
+        for ms in range(1, 101):
+            recorder.record('page', ms / 1000, ok=ms != 100)
+        recorder.outcome('booked')
+        recorder.stop()
+        summary = recorder.summary()
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['errors'], 1)
+        self.assertAlmostEqual(summary['steps']['page']['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['steps']['page']['max_ms'], 100)
+        self.assertEqual(summary['outcomes'], {'booked': 1})
+        self.assertIn('Outcomes: booked=1', recorder.report())
+
+
+class GenerateSyntheticDataCommandTests(TestCase):
+    """Test the synthetic data generator"""
+
+    def generate(self, *args):
+        call_command(
+            'generate_synthetic_data', '--users', '20', '--products', '6', '--classes', '3',
+            '--slots-per-week', '2', '--years', '1', '--bookings', '400', '--orders', '15',
+            '--as-of', '2026-01-15', '--batch-size', '50', *args, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        bookings = Booking.objects.order_by(
+            'user__username', 'class_date', 'class_schedule__start_time', 'class_schedule__fitness_class__name',
+        ).values_list('user__username', 'class_schedule__fitness_class__name', 'class_date', 'status', 'booking_date')
+        orders = Order.objects.order_by('order_number').values_list('order_number', 'user__username', 'grand_total')
+        return list(bookings), list(orders)
+
+    def test_generates_requested_volume(self):
+        """Test every table gets the requested rows with consistent derived fields"""
+        self.generate()
+
+        self.assertEqual(User.objects.filter(username__startswith='synthetic-').count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='synthetic-').count(), 20)
+        self.assertEqual(Booking.objects.count(), 400)
+        self.assertEqual(Order.objects.count(), 15)
+        self.assertFalse(Booking.objects.exclude(class_date=F('class_schedule__date')).exists())
+        self.assertTrue(Booking.objects.filter(booking_date__lt=datetime(2025, 7, 1, tzinfo=dt_timezone.utc)).exists())
+        self.assertTrue(Order.objects.filter(date__lt=datetime(2025, 7, 1, tzinfo=dt_timezone.utc)).exists())
+        # Every row is backdated, none left at the insert time
+        as_of_end = datetime(2026, 1, 16, tzinfo=dt_timezone.utc)
+        self.assertFalse(Booking.objects.filter(booking_date__gte=as_of_end).exists())
+        self.assertFalse(Order.objects.filter(date__gte=as_of_end).exists())
+
+        for schedule in ClassSchedule.objects.select_related('fitness_class'):
+            booked = schedule.bookings.exclude(status='cancelled').count()
+            self.assertEqual(schedule.available_spots, schedule.fitness_class.max_capacity - booked)
+
+        for order in Order.objects.all():
+            grand_total = order.grand_total
+            order.update_total()
+            self.assertEqual(order.grand_total, grand_total)
+
+    def test_same_seed_same_data(self):
+        """Test regenerating with the same seed reproduces the data, and another seed doesn't"""
+        self.generate()
+        first = self.snapshot()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+        self.generate('--clear')
+        self.assertEqual(self.snapshot(), first)
+        self.assertTrue(post_delete.has_listeners(OrderLineItem))
+
+        self.generate('--clear', '--seed', '7')
+        self.assertNotEqual(self.snapshot(), first)
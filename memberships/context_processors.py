@@ -1,20 +1,11 @@
-from .models import UserMembership
+from django.utils.functional import SimpleLazyObject
+from .utils import get_user_membership
 
 
 def user_membership(request):
-    """Context processor to make user's membership available in all templates"""
-    context = {}
+    """
+    Context processor to make user's membership available in all templates.
 
-    if request.user.is_authenticated:
-        try:
-            membership = UserMembership.objects.select_related('membership_tier').get(
-                user=request.user,
-                status='active'
-            )
-            context['user_membership'] = membership
-        except UserMembership.DoesNotExist:
-            context['user_membership'] = None
-    else:
-        context['user_membership'] = None
-
-    return context
+    The membership is only looked up when a template actually reads it.
+    """
+    return {'user_membership': SimpleLazyObject(lambda: get_user_membership(request))}
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+from memberships.models import UserMembership
+from memberships.utils import invalidate_user_membership
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire lapsed memberships and flag auto-renewing ones that are about to end. '
+        'Works through the table in id-range chunks with one UPDATE per chunk; run it daily.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of membership ids covered by each UPDATE',
+        )
+        parser.add_argument(
+            '--renewal-days',
+            type=int,
+            default=7,
+            help='Flag auto-renewing memberships ending within this many days as renewal due',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many memberships would change without writing anything',
+        )
+
+    def update_in_chunks(self, queryset, batch_size, **changes):
+        """
+        Apply `changes` to every row of `queryset`, one id range at a time.
+
+        Only ids are read, never model instances, and each chunk is its own
+        short UPDATE so locks are held briefly. The cached membership of
+        every changed user is dropped, since UPDATEs send no save signals.
+        """
+        bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return 0
+
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            chunk = queryset.filter(pk__gte=start, pk__lt=start + batch_size)
+            rows = list(chunk.values_list('pk', 'user_id'))
+            if not rows:
+                continue
+            # Re-applying the filter keeps rows that changed since the read untouched
+            updated += chunk.filter(pk__in=[pk for pk, _ in rows]).update(**changes)
+            invalidate_user_membership(*(user_id for _, user_id in rows))
+        return updated
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        today = timezone.now().date()
+        active = UserMembership.objects.filter(status='active').order_by()
+
+        # Lapsed the day after end_date, auto-renewing or not, as the
+        # active-membership checks across the site already treat them
+        lapsed = active.filter(end_date__lt=today)
+        renewal_due = active.filter(
+            end_date__gte=today,
+            end_date__lte=today + timedelta(days=options['renewal_days']),
+            auto_renew=True,
+            renewal_due=False,
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Dry run: would expire {lapsed.count()} memberships '
+                f'and flag {renewal_due.count()} for renewal'
+            ))
+            return
+
+        batch_size = options['batch_size']
+        expired = self.update_in_chunks(lapsed, batch_size, status='expired', renewal_due=False)
+        flagged = self.update_in_chunks(renewal_due, batch_size, renewal_due=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} memberships and flagged {flagged} for renewal '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
+        if not settings.SHARED_CACHE:
+            self.stdout.write(self.style.WARNING(
+                'The cache is per process, so web workers may show the old memberships for up to '
+                f'{settings.MEMBERSHIP_CACHE_TIMEOUT}s; configure CACHE_BACKEND to invalidate them directly'
+            ))
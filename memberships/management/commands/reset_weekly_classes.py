@@ -0,0 +1,51 @@
+import time
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.models import Booking
+from bookings.utils import iso_week_range
+from memberships.models import UserMembership
+
+
+class Command(BaseCommand):
+    help = (
+        'Reset every member\'s classes_used_this_week by recounting their live bookings for '
+        'classes in the current ISO week, in one UPDATE. Counters are never simply zeroed, as '
+        'classes booked ahead for the new week already count against it. Schedule it for '
+        'Monday 00:00 (e.g. Heroku Scheduler, daily with --weekday 0).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weekday',
+            type=int,
+            choices=range(7),
+            default=None,
+            help='Only run on this weekday (0 = Monday), for schedulers that only run daily',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        if options['weekday'] is not None and today.weekday() != options['weekday']:
+            self.stdout.write(f'Skipping: today is not weekday {options["weekday"]}')
+            return
+
+        started = time.perf_counter()
+        # The same week bookings.utils.counts_this_week takes and refunds by:
+        # classes booked in advance for the new week count from its first day
+        weekly_count = Booking.objects.filter(
+            user_id=OuterRef('user_id'),
+            status__in=['confirmed', 'attended'],
+            class_date__range=iso_week_range(today),
+        ).order_by().values('user_id').annotate(count=Count('id')).values('count')
+        updated = UserMembership.objects.update(
+            classes_used_this_week=Coalesce(
+                Subquery(weekly_count, output_field=IntegerField()), Value(0)
+            )
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted weekly classes from bookings for {updated} memberships '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memberships', '0003_auto_20260216_1611'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermembership',
+            name='renewal_due',
+            field=models.BooleanField(default=False, help_text='Set by expire_memberships when an auto-renewing membership is about to end'),
+        ),
+        migrations.AddIndex(
+            model_name='usermembership',
+            index=models.Index(fields=['status', 'end_date'], name='membership_status_end_idx'),
+        ),
+    ]
@@ -44,12 +44,17 @@ class UserMembership(models.Model):
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     auto_renew = models.BooleanField(default=False)
+    renewal_due = models.BooleanField(default=False, help_text='Set by expire_memberships when an auto-renewing membership is about to end')
     classes_used_this_week = models.IntegerField(default=0)
     stripe_subscription_id = models.CharField(max_length=255, blank=True, help_text='Stripe Subscription ID')
     stripe_customer_id = models.CharField(max_length=255, blank=True, help_text='Stripe Customer ID')
 
     class Meta:
         verbose_name_plural = 'User Memberships'
+        indexes = [
+            # expire_memberships sweep
+            models.Index(fields=['status', 'end_date'], name='membership_status_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.membership_tier.name if self.membership_tier else 'No Tier'}"
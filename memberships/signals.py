@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import MembershipTier, UserMembership
+from .utils import invalidate_user_membership
+
+
+@receiver(post_save, sender=UserMembership)
+@receiver(post_delete, sender=UserMembership)
+def invalidate_membership(sender, instance, **kwargs):
+    """Forget the cached membership whenever the member's row changes"""
+    invalidate_user_membership(instance.user_id)
+
+
+@receiver(post_save, sender=MembershipTier)
+@receiver(pre_delete, sender=MembershipTier)
+def invalidate_tier_members(sender, instance, **kwargs):
+    """
+    Cached memberships carry their tier, so refresh everyone on it.
+
+    Deletes are handled before the fact, while the members still point at
+    the tier (SET_NULL clears it with an UPDATE that sends no signals).
+    """
+    user_ids = UserMembership.objects.filter(membership_tier=instance).values_list('user_id', flat=True)
+    invalidate_user_membership(*user_ids)
@@ -0,0 +1,237 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from checkout.models import Order, OrderLineItem
+from checkout.utils import activate_membership_for_order
+from memberships.models import MembershipTier, UserMembership
+from memberships.utils import load_user_membership, membership_cache_key
+
+
+class MembershipCacheTests(TestCase):
+    """Test the cached membership lookup behind the user_membership context processor"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', password='testpass123')
+        self.tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=3,
+        )
+        self.premium = MembershipTier.objects.create(
+            name='Premium',
+            description='Premium membership',
+            price=Decimal('50.00'),
+            classes_per_week=10,
+        )
+
+    def make_membership(self, **kwargs):
+        fields = {
+            'user': self.user,
+            'membership_tier': self.tier,
+            'start_date': date.today(),
+            'end_date': date.today() + timedelta(days=30),
+            'status': 'active',
+        }
+        fields.update(kwargs)
+        return UserMembership.objects.create(**fields)
+
+    def test_second_lookup_is_served_from_cache(self):
+        """Test the membership and its tier are read from the cache after the first lookup"""
+        self.make_membership()
+        with self.assertNumQueries(1):
+            load_user_membership(self.user.pk)
+        with self.assertNumQueries(0):
+            membership = load_user_membership(self.user.pk)
+            self.assertEqual(membership.membership_tier.name, 'Basic')
+
+    def test_missing_membership_is_cached(self):
+        """Test a user without a membership does not query on every render"""
+        self.assertIsNone(load_user_membership(self.user.pk))
+        with self.assertNumQueries(0):
+            self.assertIsNone(load_user_membership(self.user.pk))
+
+    def test_expired_membership_is_not_active(self):
+        """Test memberships past their end date are ignored even while still marked active"""
+        self.make_membership(end_date=date.today() - timedelta(days=1))
+        self.assertIsNone(load_user_membership(self.user.pk))
+
+    def test_cached_membership_expires_with_end_date(self):
+        """Test a cached membership stops counting once its end date has passed"""
+        membership = self.make_membership()
+        load_user_membership(self.user.pk)
+        cached, = cache.get(membership_cache_key(self.user.pk))
+        cached.end_date = date.today() - timedelta(days=1)
+        cache.set(membership_cache_key(self.user.pk), (cached,))
+        self.assertIsNone(load_user_membership(self.user.pk))
+        self.assertEqual(membership.status, 'active')
+
+    def test_save_invalidates(self):
+        """Test saving the membership drops the cached copy"""
+        membership = self.make_membership()
+        load_user_membership(self.user.pk)
+        membership.status = 'expired'
+        membership.save()
+        self.assertIsNone(load_user_membership(self.user.pk))
+
+    def test_delete_invalidates(self):
+        """Test deleting the membership drops the cached copy"""
+        membership = self.make_membership()
+        load_user_membership(self.user.pk)
+        membership.delete()
+        self.assertIsNone(load_user_membership(self.user.pk))
+
+    def test_tier_change_invalidates_members(self):
+        """Test editing a tier refreshes the cached memberships on it"""
+        self.make_membership()
+        load_user_membership(self.user.pk)
+        self.tier.classes_per_week = 4
+        self.tier.save()
+        self.assertEqual(load_user_membership(self.user.pk).membership_tier.classes_per_week, 4)
+
+    def test_tier_delete_invalidates_members(self):
+        """Test deleting a tier clears it from cached memberships"""
+        self.make_membership()
+        load_user_membership(self.user.pk)
+        self.tier.delete()
+        self.assertIsNone(load_user_membership(self.user.pk).membership_tier)
+
+    def test_weekly_counter_is_read_fresh(self):
+        """Test the weekly class counter is not served stale from the cache"""
+        membership = self.make_membership()
+        load_user_membership(self.user.pk)
+        UserMembership.objects.filter(pk=membership.pk).update(classes_used_this_week=2)
+        self.assertEqual(load_user_membership(self.user.pk).classes_used_this_week, 2)
+
+    def test_activate_view_invalidates(self):
+        """Test activating a plan is visible on the next lookup"""
+        self.make_membership(status='cancelled')
+        self.assertIsNone(load_user_membership(self.user.pk))
+        self.client.login(username='member', password='testpass123')
+        self.client.get(reverse('memberships:activate_membership', args=[self.premium.id]))
+        self.assertEqual(load_user_membership(self.user.pk).membership_tier, self.premium)
+
+    def test_cancel_view_invalidates(self):
+        """Test cancelling is visible on the next lookup"""
+        self.make_membership()
+        self.assertIsNotNone(load_user_membership(self.user.pk))
+        self.client.login(username='member', password='testpass123')
+        self.client.post(reverse('memberships:cancel_membership'))
+        self.assertIsNone(load_user_membership(self.user.pk))
+
+    def test_order_activation_invalidates(self):
+        """Test a paid membership order is visible on the next lookup"""
+        self.assertIsNone(load_user_membership(self.user.pk))
+        order = Order.objects.create(
+            user=self.user,
+            full_name='Member',
+            email='member@test.com',
+            phone_number='1234567890',
+            street_address1='1 Test St',
+            town_or_city='Test City',
+            country='IE',
+        )
+        OrderLineItem.objects.create(order=order, membership=self.premium, quantity=1)
+        self.assertTrue(activate_membership_for_order(order))
+        self.assertEqual(load_user_membership(self.user.pk).membership_tier, self.premium)
+
+
+class ExpireMembershipsCommandTests(TestCase):
+    """Test the expire_memberships sweep"""
+
+    def setUp(self):
+        cache.clear()
+        self.tier = MembershipTier.objects.create(
+            name='Basic',
+            description='Basic membership',
+            price=Decimal('30.00'),
+            classes_per_week=3,
+        )
+        self.today = date.today()
+
+    def make_membership(self, username, end_offset, auto_renew=False, status='active'):
+        user = User.objects.create_user(username=username, password='testpass123')
+        return UserMembership.objects.create(
+            user=user,
+            membership_tier=self.tier,
+            start_date=self.today - timedelta(days=30),
+            end_date=self.today + timedelta(days=end_offset),
+            status=status,
+            auto_renew=auto_renew,
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('expire_memberships', *args, stdout=out)
+        return out.getvalue()
+
+    def status(self, membership):
+        membership.refresh_from_db()
+        return membership.status, membership.renewal_due
+
+    def test_sweep(self):
+        """Test lapsed memberships expire and upcoming auto-renewals are flagged"""
+        lapsed = self.make_membership('lapsed', -1)
+        current = self.make_membership('current', 10)
+        ends_today = self.make_membership('today', 0)
+        renewing = self.make_membership('renewing', 3, auto_renew=True)
+        unrenewed = self.make_membership('unrenewed', -5, auto_renew=True)
+        cancelled = self.make_membership('cancelled', -5, status='cancelled')
+
+        output = self.run_command('--batch-size', '2')
+
+        self.assertEqual(self.status(lapsed), ('expired', False))
+        self.assertEqual(self.status(current), ('active', False))
+        self.assertEqual(self.status(ends_today), ('active', False))
+        self.assertEqual(self.status(renewing), ('active', True))
+        self.assertEqual(self.status(unrenewed), ('expired', False))
+        self.assertEqual(self.status(cancelled), ('cancelled', False))
+        self.assertIn('Expired 2 memberships and flagged 1 for renewal', output)
+
+    def test_rerun_changes_nothing(self):
+        """Test the sweep is idempotent"""
+        self.make_membership('lapsed', -1)
+        self.make_membership('renewing', 3, auto_renew=True)
+        self.run_command()
+        output = self.run_command()
+        self.assertIn('Expired 0 memberships and flagged 0 for renewal', output)
+
+    def test_dry_run(self):
+        """Test --dry-run only reports"""
+        lapsed = self.make_membership('lapsed', -1)
+        output = self.run_command('--dry-run')
+        self.assertIn('would expire 1 memberships', output)
+        self.assertEqual(self.status(lapsed), ('active', False))
+
+    def test_queries_do_not_grow_with_members(self):
+        """Test each chunk is handled with a fixed number of queries"""
+        for i in range(30):
+            self.make_membership(f'lapsed{i}', -1)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_command('--batch-size', '1000')
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertLessEqual(len(queries), 6)
+        self.assertEqual(UserMembership.objects.filter(status='expired').count(), 30)
+
+    def test_drops_cached_membership(self):
+        """Test swept members do not keep a stale cached membership"""
+        renewing = self.make_membership('renewing', 3, auto_renew=True)
+        load_user_membership(renewing.user_id)
+        self.run_command()
+        self.assertTrue(load_user_membership(renewing.user_id).renewal_due)
+
+    def test_warns_without_shared_cache(self):
+        """Test the sweep says when its invalidation cannot reach the web workers"""
+        with self.settings(SHARED_CACHE=False, MEMBERSHIP_CACHE_TIMEOUT=30):
+            self.assertIn('for up to 30s', self.run_command())
+        with self.settings(SHARED_CACHE=True):
+            self.assertNotIn('per process', self.run_command())
@@ -0,0 +1,57 @@
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from .models import UserMembership
+
+
+def membership_cache_key(user_id):
+    return f'memberships:user:{user_id}'
+
+
+def invalidate_user_membership(*user_ids):
+    """Drop the cached membership of the given users"""
+    cache.delete_many([membership_cache_key(user_id) for user_id in user_ids])
+
+
+def load_user_membership(user_id):
+    """
+    Return the user's active, unexpired membership (or None), going to the
+    cache first.
+
+    A cached membership is re-checked against end_date on every read, so it
+    stops counting as active the day after it ends even before anything
+    updates its status. classes_used_this_week is deferred because bookings
+    change it with UPDATEs that never reach the save signals; reading it
+    fetches the current value.
+    """
+    key = membership_cache_key(user_id)
+    cached = cache.get(key)
+    if cached is None:
+        membership = UserMembership.objects.select_related('membership_tier').defer(
+            'classes_used_this_week'
+        ).filter(
+            user_id=user_id,
+            status='active',
+            end_date__gte=date.today(),
+        ).first()
+        # Wrapped so that "no membership" is cached too
+        cached = (membership,)
+        cache.set(key, cached, timeout=settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+    membership = cached[0]
+    if membership is not None and membership.end_date < date.today():
+        return None
+    return membership
+
+
+def get_user_membership(request):
+    """
+    Return the request user's active membership (or None), looking it up at
+    most once per request.
+    """
+    if not hasattr(request, '_cached_user_membership'):
+        membership = None
+        if request.user.is_authenticated:
+            membership = load_user_membership(request.user.pk)
+        request._cached_user_membership = membership
+    return request._cached_user_membership
@@ -146,6 +146,7 @@ def activate_membership(request, plan_id):
             'end_date': end_date,
             'status': 'active',
             'auto_renew': True,
+            'renewal_due': False,
         }
     )
 
@@ -184,6 +185,7 @@ def cancel_membership(request):
 
         membership.status = 'cancelled'
         membership.auto_renew = False
+        membership.renewal_due = False
         membership.save()
 
         messages.success(request, 'Your membership has been cancelled successfully.')
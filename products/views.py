@@ -1,15 +1,15 @@
 from django.shortcuts import render, get_object_or_404, redirect, reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from search.index import search_filter
 from .models import Product, ProductCategory
 from .forms import ProductForm
 
 
 def all_products(request):
     """Display all products with optional category filtering, search, and sorting"""
-    products = Product.objects.all()
+    products = Product.objects.select_related('category')
     categories = ProductCategory.objects.all()
     current_category = None
     search_query = None
@@ -20,10 +20,8 @@ def all_products(request):
     if 'q' in request.GET:
         search_query = request.GET['q']
         if search_query:
-            products = products.filter(
-                Q(name__icontains=search_query)
-                | Q(description__icontains=search_query)
-            )
+            # Best matches first unless a sort is chosen below
+            products = search_filter(products, search_query).order_by('search_rank', 'name')
 
     # Filter by category if provided
     category = request.GET.get('category')
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Give users created before profiles were provisioned on signup a profile"""
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('profiles', 'UserProfile')
+    user_ids = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in user_ids.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_auto_20260525_1640'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
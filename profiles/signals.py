@@ -6,13 +6,13 @@ from .models import UserProfile
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
-    """Create UserProfile when a new User is created"""
+    """
+    Create the UserProfile when a new User is created.
+
+    Later User saves leave the profile alone, which matters most for the
+    last_login update on every login. Users who predate this signal got a
+    profile from migration 0003, and the profile page still uses
+    get_or_create as a fallback.
+    """
     if created:
         UserProfile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    profile, _ = UserProfile.objects.get_or_create(user=instance)
-    profile.save()
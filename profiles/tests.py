@@ -1,4 +1,12 @@
-from django.test import TestCase, Client
+import os
+import time
+from importlib import import_module
+from unittest import skipUnless
+from django.apps import apps
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from profiles.models import UserProfile
@@ -93,3 +101,93 @@ class ProfileViewTest(TestCase):
         )
         profile = UserProfile.objects.get(user=self.user)
         self.assertEqual(profile.phone_number, '1234567890')
+
+
+def login(client, username='member', password='testpass123'):
+    """Log in through the allauth view, returning the SQL it ran"""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(reverse('account_login'), {'login': username, 'password': password})
+    assert response.status_code == 302, response.status_code
+    return [query['sql'] for query in queries.captured_queries]
+
+
+def legacy_save_user_profile(sender, instance, **kwargs):
+    """The receiver this app used to run on every User save, for the benchmark"""
+    profile, _ = UserProfile.objects.get_or_create(user=instance)
+    profile.save()
+
+
+class ProfileProvisioningTest(TestCase):
+    """Test profiles are created once and left alone by later user saves"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='member',
+            password='testpass123',
+            email='member@test.com'
+        )
+
+    def test_profile_created_once(self):
+        """Test a new user gets exactly one profile"""
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+
+    def test_user_save_does_not_touch_profile(self):
+        """Test saving an existing user runs no profile queries"""
+        self.user.first_name = 'Member'
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        self.assertFalse([q for q in queries.captured_queries if 'profiles_userprofile' in q['sql']])
+
+    def test_login_does_not_touch_profile(self):
+        """Test logging in only updates last_login, not the profile"""
+        queries = login(Client())
+        self.assertFalse([sql for sql in queries if 'profiles_userprofile' in sql])
+        self.assertEqual(len([sql for sql in queries if sql.startswith('UPDATE "auth_user"')]), 1)
+
+    def test_backfill_migration(self):
+        """Test users without a profile get one from the backfill migration"""
+        UserProfile.objects.filter(user=self.user).delete()
+        migration = import_module('profiles.migrations.0003_backfill_profiles')
+        migration.create_missing_profiles(apps, None)
+        migration.create_missing_profiles(apps, None)
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run benchmarks')
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginBenchmark(TestCase):
+    """
+    Logins per second and queries per login through the allauth login view,
+    with and without the old profile receiver. A fast password hasher keeps
+    PBKDF2 from drowning out the database work.
+
+        RUN_BENCHMARKS=1 python manage.py test profiles.tests.LoginBenchmark
+    """
+
+    logins = 300
+
+    def setUp(self):
+        User.objects.create_user(username='member', password='testpass123', email='member@test.com')
+        # Warm up allauth and the session machinery
+        login(Client())
+
+    def run_logins(self):
+        query_counts = []
+        started = time.perf_counter()
+        for _ in range(self.logins):
+            query_counts.append(len(login(Client())))
+        return self.logins / (time.perf_counter() - started), max(query_counts)
+
+    def test_login_throughput(self):
+        """Test logins run fewer queries than with the old profile receiver"""
+        post_save.connect(legacy_save_user_profile, sender=User)
+        try:
+            before = self.run_logins()
+        finally:
+            post_save.disconnect(legacy_save_user_profile, sender=User)
+        after = self.run_logins()
+
+        for label, (rate, queries) in (('get_or_create + save', before), ('create once', after)):
+            print(f'\n{label:>20}: {rate:.0f} logins/s, {queries} queries per login', end='')
+        print()
+        self.assertEqual(before[1] - after[1], 2)
@@ -0,0 +1,229 @@
+"""
+Full-text search over classes and products.
+
+Each registered model gets a shadow table, `<db_table>_search`, keyed by the
+row's primary key:
+
+* PostgreSQL: a weighted tsvector column with a GIN index
+* SQLite: an FTS5 virtual table, ranked with bm25
+
+Rows are kept in sync by the post_save/post_delete handlers in
+search.signals; run `manage.py rebuild_search_index` after bulk writes that
+bypass signals. Any other database (or SQLite built without FTS5) falls back
+to icontains lookups so search keeps working, just without an index.
+"""
+import re
+from django.apps import apps
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# model label: (title fields, body fields); title matches rank higher
+SEARCH_FIELDS = {
+    'classes.FitnessClass': (['name'], ['instructor', 'description']),
+    'products.Product': (['name'], ['description']),
+}
+
+MAX_TERMS = 8
+
+
+def search_table(model):
+    return f'{model._meta.db_table}_search'
+
+
+def search_terms(query):
+    """Split a user's query into at most MAX_TERMS lowercase word tokens"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def document_for(instance):
+    """Return the (title, body) text indexed for a model instance"""
+    title_fields, body_fields = SEARCH_FIELDS[instance._meta.label]
+    title = ' '.join(str(getattr(instance, field) or '') for field in title_fields)
+    body = ' '.join(str(getattr(instance, field) or '') for field in body_fields)
+    return title, body
+
+
+class PostgresBackend:
+    """Weighted tsvector shadow table with a GIN index"""
+
+    def create(self, cursor, table):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'object_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_gin ON {table} USING gin (document)')
+
+    def drop(self, cursor, table):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def index(self, cursor, table, pk, title, body):
+        cursor.execute(
+            f'INSERT INTO {table} (object_id, document) VALUES ('
+            "%s, setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')"
+            ') ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document',
+            [pk, title, body],
+        )
+
+    def remove(self, cursor, table, pk):
+        cursor.execute(f'DELETE FROM {table} WHERE object_id = %s', [pk])
+
+    def clear(self, cursor, table):
+        cursor.execute(f'DELETE FROM {table}')
+
+    def matches(self, table, terms):
+        # Every term must match, each as a prefix so partial words find results
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return f"SELECT object_id FROM {table} WHERE document @@ to_tsquery('english', %s)", [tsquery]
+
+    def rank(self, table, terms, column):
+        # Negated so that, as with bm25, lower is better
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return (
+            f"SELECT -ts_rank(document, to_tsquery('english', %s)) FROM {table} WHERE object_id = {column}",
+            [tsquery],
+        )
+
+
+class SqliteBackend:
+    """FTS5 virtual table whose rowid is the indexed row's primary key"""
+
+    def create(self, cursor, table):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} '
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+
+    def drop(self, cursor, table):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def index(self, cursor, table, pk, title, body):
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+        cursor.execute(f'INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)', [pk, title, body])
+
+    def remove(self, cursor, table, pk):
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+    def clear(self, cursor, table):
+        cursor.execute(f'DELETE FROM {table}')
+
+    def match_expression(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def matches(self, table, terms):
+        return f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [self.match_expression(terms)]
+
+    def rank(self, table, terms, column):
+        return (
+            f'SELECT bm25({table}, 10.0, 1.0) FROM {table} WHERE {table} MATCH %s AND rowid = {column}',
+            [self.match_expression(terms)],
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresBackend,
+    'sqlite': SqliteBackend,
+}
+
+
+def get_backend(conn=None):
+    """Return the index backend for a connection, or None if it has no full-text support"""
+    conn = conn or connection
+    backend = BACKENDS.get(conn.vendor)
+    if backend is None:
+        return None
+    if conn.vendor == 'sqlite' and not _has_search_tables(conn):
+        return None
+    return backend()
+
+
+_search_tables_present = {}
+
+
+def _has_search_tables(conn):
+    # SQLite builds without FTS5 skip creating the tables in the migration
+    if conn.alias not in _search_tables_present:
+        tables = conn.introspection.table_names()
+        _search_tables_present[conn.alias] = all(
+            search_table(apps.get_model(label)) in tables for label in SEARCH_FIELDS
+        )
+    return _search_tables_present[conn.alias]
+
+
+def index_instance(instance):
+    backend = get_backend()
+    if backend is None:
+        return
+    title, body = document_for(instance)
+    with connection.cursor() as cursor:
+        backend.index(cursor, search_table(type(instance)), instance.pk, title, body)
+
+
+def remove_instance(instance):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, search_table(type(instance)), instance.pk)
+
+
+def rebuild(model, chunk_size=1000):
+    """Re-index every row of a registered model, returning the row count"""
+    backend = get_backend()
+    if backend is None:
+        return 0
+    table = search_table(model)
+    count = 0
+    with connection.cursor() as cursor:
+        backend.clear(cursor, table)
+        for instance in model._default_manager.order_by('pk').iterator(chunk_size=chunk_size):
+            title, body = document_for(instance)
+            backend.index(cursor, table, instance.pk, title, body)
+            count += 1
+    return count
+
+
+def search_filter(queryset, query, field='pk', model=None):
+    """
+    Restrict a queryset to rows matching every term of `query`, annotated
+    with `search_rank`.
+
+    `field` names the foreign key to search through (e.g. 'fitness_class_id'
+    for schedules), with `model` as the registered model it points to.
+    Matching and ranking both run in the database against the shadow table,
+    so every match is returned however broad the query. Order by
+    'search_rank' for best matches first; lower is better.
+    """
+    model = model or queryset.model
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0, output_field=FloatField()))
+
+    backend = get_backend()
+    if backend is None:
+        title_fields, body_fields = SEARCH_FIELDS[model._meta.label]
+        matches = Q()
+        for term in terms:
+            term_matches = Q()
+            for field_name in title_fields + body_fields:
+                term_matches |= Q(**{f'{field_name}__icontains': term})
+            matches &= term_matches
+        return queryset.filter(**{
+            f'{field}__in': model._default_manager.filter(matches).values('pk'),
+        }).annotate(search_rank=Value(0, output_field=FloatField()))
+
+    table = search_table(model)
+    target = queryset.model._meta.pk if field == 'pk' else queryset.model._meta.get_field(field)
+    quote = connection.ops.quote_name
+    column = f'{quote(queryset.model._meta.db_table)}.{quote(target.column)}'
+    matches_sql, matches_params = backend.matches(table, terms)
+    rank_sql, rank_params = backend.rank(table, terms, column)
+    return queryset.filter(**{
+        f'{field}__in': RawSQL(matches_sql, matches_params),
+    }).annotate(search_rank=RawSQL(rank_sql, rank_params, output_field=FloatField()))
+
+
+def search_ids(model, query, limit=None):
+    """Primary keys of `model` rows matching every term of `query`, best match first"""
+    ids = search_filter(model._default_manager.all(), query).order_by('search_rank', 'pk').values_list('pk', flat=True)
+    return list(ids[:limit] if limit else ids)
@@ -0,0 +1,22 @@
+import time
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from search.index import SEARCH_FIELDS, get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for classes and products'
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            self.stdout.write(self.style.WARNING(
+                'No full-text index on this database; search uses icontains lookups'
+            ))
+            return
+
+        for label in SEARCH_FIELDS:
+            started = time.perf_counter()
+            count = rebuild(apps.get_model(label))
+            self.stdout.write(self.style.SUCCESS(
+                f'Indexed {count} {label} rows in {time.perf_counter() - started:.2f}s'
+            ))
@@ -0,0 +1,48 @@
+from django.db import migrations
+from search.index import BACKENDS, SEARCH_FIELDS, document_for, search_table
+
+
+def create_search_tables(apps, schema_editor):
+    """Create and fill a shadow search table per searchable model"""
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is None:
+        return
+    backend = backend_class()
+    with schema_editor.connection.cursor() as cursor:
+        for label in SEARCH_FIELDS:
+            model = apps.get_model(label)
+            table = search_table(model)
+            try:
+                backend.create(cursor, table)
+            except Exception:
+                # SQLite built without FTS5: search falls back to icontains
+                if schema_editor.connection.vendor != 'sqlite':
+                    raise
+                return
+            for instance in model.objects.order_by('pk').iterator():
+                title, body = document_for(instance)
+                backend.index(cursor, table, instance.pk, title, body)
+
+
+def drop_search_tables(apps, schema_editor):
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is None:
+        return
+    backend = backend_class()
+    with schema_editor.connection.cursor() as cursor:
+        for label in SEARCH_FIELDS:
+            backend.drop(cursor, search_table(apps.get_model(label)))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('classes', '0007_classschedule_unique_class_slot'),
+        ('products', '0003_alter_product_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+from .index import SEARCH_FIELDS, index_instance, remove_instance
+
+
+def update_search_index(sender, instance, **kwargs):
+    """Re-index a searchable row after it is saved"""
+    index_instance(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop a searchable row from the index after it is deleted"""
+    remove_instance(instance)
+
+
+for label in SEARCH_FIELDS:
+    model = apps.get_model(label)
+    post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_index_{label}')
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search_remove_{label}')
@@ -0,0 +1,112 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from classes.models import FitnessClass, ClassSchedule
+from products.models import Product
+from search.index import search_filter, search_ids
+
+
+def make_class(name, description='A class', instructor='Test Instructor'):
+    return FitnessClass.objects.create(
+        name=name,
+        description=description,
+        duration=45,
+        instructor=instructor,
+    )
+
+
+class SearchIndexTests(TestCase):
+    """Test the full-text index and its ranking"""
+
+    def setUp(self):
+        self.flow = make_class('Yoga Flow', 'Vinyasa sequences linking breath and movement')
+        self.spin = make_class('Spin', 'Indoor cycling with a yoga cool-down')
+        self.boxing = make_class('Boxing', 'Pad work and conditioning', instructor='Maria Lopez')
+
+    def test_title_matches_rank_first(self):
+        """Test a match in the name outranks one in the description"""
+        self.assertEqual(search_ids(FitnessClass, 'yoga'), [self.flow.pk, self.spin.pk])
+
+    def test_prefix_and_all_terms(self):
+        """Test partial words match and every term is required"""
+        self.assertEqual(search_ids(FitnessClass, 'vinya'), [self.flow.pk])
+        self.assertEqual(search_ids(FitnessClass, 'yoga cycling'), [self.spin.pk])
+        self.assertEqual(search_ids(FitnessClass, 'lopez'), [self.boxing.pk])
+        self.assertEqual(search_ids(FitnessClass, '"%*'), [])
+
+    def test_signals_keep_index_in_sync(self):
+        """Test saves re-index a row and deletes remove it"""
+        self.boxing.name = 'Kickboxing'
+        self.boxing.save()
+        self.assertEqual(search_ids(FitnessClass, 'kickbox'), [self.boxing.pk])
+
+        self.flow.delete()
+        self.assertEqual(search_ids(FitnessClass, 'yoga'), [self.spin.pk])
+
+    def test_search_through_foreign_key(self):
+        """Test schedules are filtered by their class's matches"""
+        ClassSchedule.objects.create(
+            fitness_class=self.spin,
+            date=date.today() + timedelta(days=1),
+            start_time=time(7, 0),
+            end_time=time(7, 45),
+        )
+        schedules = search_filter(
+            ClassSchedule.objects.all(), 'cycling', field='fitness_class_id', model=FitnessClass
+        )
+        self.assertEqual([s.fitness_class for s in schedules], [self.spin])
+
+    def test_broad_search_returns_every_match(self):
+        """Test matches are filtered and ranked in SQL, with nothing truncated"""
+        for i in range(30):
+            make_class(f'Yoga {i}')
+        with CaptureQueriesContext(connection) as queries:
+            classes = list(search_filter(FitnessClass.objects.all(), 'yoga').order_by('search_rank', 'name'))
+        self.assertEqual(len(classes), 32)
+        self.assertEqual(classes[-1], self.spin)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('CASE', queries[0]['sql'])
+
+    def test_fallback_without_index(self):
+        """Test search still works with icontains when there is no index"""
+        with mock.patch('search.index.get_backend', return_value=None):
+            self.assertEqual(sorted(search_ids(FitnessClass, 'yoga')), [self.flow.pk, self.spin.pk])
+
+
+class SearchViewTests(TestCase):
+    """Test the views share the ranked search"""
+
+    def setUp(self):
+        make_class('Core Blast', 'Abs and obliques')
+        make_class('Pilates', 'Core strength on the mat')
+        Product.objects.create(
+            sku='MAT-1',
+            name='Yoga Mat',
+            description='Non-slip mat',
+            price=Decimal('25.00'),
+        )
+        Product.objects.create(
+            sku='BLK-1',
+            name='Foam Block',
+            description='Supports yoga poses',
+            price=Decimal('10.00'),
+        )
+
+    def test_all_classes_ranks_results(self):
+        """Test all_classes lists the name match before the description match"""
+        response = self.client.get(reverse('all_classes'), {'q': 'core'})
+        self.assertEqual([c.name for c in response.context['classes']], ['Core Blast', 'Pilates'])
+
+    def test_all_products_ranks_results(self):
+        """Test all_products lists the name match before the description match"""
+        response = self.client.get(reverse('products:all_products'), {'q': 'yoga'})
+        self.assertEqual([p.name for p in response.context['products']], ['Yoga Mat', 'Foam Block'])
+
+    def test_sort_overrides_relevance(self):
+        """Test an explicit sort still applies to search results"""
+        response = self.client.get(reverse('products:all_products'), {'q': 'yoga', 'sort': 'price'})
+        self.assertEqual([p.name for p in response.context['products']], ['Foam Block', 'Yoga Mat'])
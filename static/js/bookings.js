@@ -13,3 +13,76 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+// Live seat counts on the class schedule, polled from the availability API.
+// The ETag is sent back on each poll, so unchanged schedules cost a 304.
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('schedule-availability');
+    const indicators = document.querySelectorAll('.availability-indicator[data-schedule-id]');
+    if (!container || indicators.length === 0) {
+        return;
+    }
+
+    const POLL_INTERVAL = 15000;
+    const DAY_MS = 24 * 60 * 60 * 1000;
+    const maxDays = parseInt(container.dataset.maxDays, 10) || 31;
+
+    // The API serves at most maxDays per request, and a filtered page can
+    // span more, so poll one window per run of dates that fits
+    function windows(dates) {
+        const result = [];
+        dates.forEach(date => {
+            const last = result[result.length - 1];
+            if (last && (Date.parse(date) - Date.parse(last.start)) / DAY_MS <= maxDays) {
+                last.end = date;
+            } else {
+                result.push({ start: date, end: date, etag: null });
+            }
+        });
+        return result;
+    }
+
+    const dates = Array.from(new Set(Array.from(indicators, el => el.dataset.date))).sort();
+    const polls = windows(dates);
+
+    function render(spotsById) {
+        indicators.forEach(el => {
+            const spots = spotsById[el.dataset.scheduleId];
+            if (spots === undefined || String(spots) === el.dataset.spots) {
+                return;
+            }
+            el.dataset.spots = spots;
+            el.textContent = `${spots} / ${el.dataset.capacity}`;
+            el.classList.toggle('text-danger', spots === 0);
+        });
+    }
+
+    function pollWindow(span) {
+        const url = `${container.dataset.url}?start=${span.start}&end=${span.end}`;
+        const headers = span.etag ? { 'If-None-Match': span.etag } : {};
+        fetch(url, { headers: headers, credentials: 'same-origin' })
+            .then(response => {
+                if (response.status !== 200) {
+                    return null;
+                }
+                span.etag = response.headers.get('ETag');
+                return response.json();
+            })
+            .then(data => {
+                if (data) {
+                    render(data);
+                }
+            })
+            .catch(() => {});
+    }
+
+    function poll() {
+        if (document.hidden) {
+            return;
+        }
+        polls.forEach(pollWindow);
+    }
+
+    setInterval(poll, POLL_INTERVAL);
+    document.addEventListener('visibilitychange', poll);
+});
@@ -159,6 +159,8 @@ form.addEventListener('submit', function(ev) {
                         } else {
                             // Payment succeeded, submit form
                             if (result.paymentIntent.status === 'succeeded') {
+                                // Lets the server match this order to its webhook
+                                $('#id_client_secret').val(clientSecret);
                                 form.submit();
                             }
                         }
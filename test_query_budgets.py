@@ -0,0 +1,290 @@
+"""
+Query budgets for FitForge pages
+
+Each public and member page is loaded against a realistic amount of data
+and must stay within a fixed number of queries, so an N+1 introduced in a
+view or template (a per-row lookup in classes/schedule_list.html, say)
+fails the build instead of slowing down production.
+
+Budgets are the current count plus a little headroom. The data is sized
+so that any per-row query would blow well past them.
+"""
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from bookings.models import Booking, WaitlistEntry
+from bookings.utils import calendar_feed_token
+from checkout.models import Order, OrderLineItem
+from classes.models import ClassCategory, FitnessClass, ClassSchedule
+from memberships.models import MembershipTier, UserMembership
+from products.models import Product, ProductCategory
+
+CLASSES = 20
+SCHEDULE_DAYS = 14
+PRODUCTS = 40
+BOOKINGS = 60
+
+
+class QueryBudgetTestCase(TestCase):
+    """Seed a realistic data set and provide assertQueryBudget"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+
+        cls.class_categories = class_categories = [
+            ClassCategory.objects.create(name=name, friendly_name=name.title())
+            for name in ('yoga', 'hiit', 'strength', 'cycling')
+        ]
+        cls.fitness_classes = [
+            FitnessClass.objects.create(
+                name=f'Class {i}',
+                description='A class',
+                duration=45,
+                instructor=f'Instructor {i % 5}',
+                max_capacity=20,
+                category=class_categories[i % len(class_categories)],
+            )
+            for i in range(CLASSES)
+        ]
+        ClassSchedule.objects.bulk_create([
+            ClassSchedule(
+                fitness_class=fitness_class,
+                date=today + timedelta(days=day),
+                start_time=time(6 + slot * 3, 0),
+                end_time=time(6 + slot * 3, 45),
+                available_spots=20,
+            )
+            for fitness_class in cls.fitness_classes
+            for day in range(-SCHEDULE_DAYS, SCHEDULE_DAYS)
+            for slot in range(2)
+        ])
+        schedules = list(ClassSchedule.objects.order_by('date', 'start_time', 'id'))
+
+        product_categories = [
+            ProductCategory.objects.create(name=name, friendly_name=name.title())
+            for name in ('apparel', 'equipment', 'nutrition')
+        ]
+        cls.products = [
+            Product.objects.create(
+                category=product_categories[i % len(product_categories)],
+                sku=f'SKU{i:04d}',
+                name=f'Product {i}',
+                description='A product',
+                price=Decimal('19.99'),
+                stock_quantity=50,
+            )
+            for i in range(PRODUCTS)
+        ]
+
+        cls.tiers = [
+            MembershipTier.objects.create(
+                name=name,
+                description=f'{name} membership',
+                price=Decimal(price),
+                classes_per_week=classes,
+            )
+            for name, price, classes in (('Basic', '30.00', 3), ('Premium', '50.00', 6), ('Elite', '80.00', 20))
+        ]
+
+        cls.user = User.objects.create_user(username='member', password='testpass123', email='member@test.com')
+        cls.membership = UserMembership.objects.create(
+            user=cls.user,
+            membership_tier=cls.tiers[2],
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+            status='active',
+        )
+
+        # Bookings spread over past and upcoming sessions, some cancelled
+        booked = schedules[::len(schedules) // BOOKINGS][:BOOKINGS]
+        Booking.objects.bulk_create([
+            Booking(
+                user=cls.user,
+                class_schedule=schedule,
+                class_date=schedule.date,
+                status='cancelled' if i % 7 == 0 else 'confirmed',
+            )
+            for i, schedule in enumerate(booked)
+        ])
+        cls.booking = Booking.objects.filter(user=cls.user, status='confirmed').latest('class_date')
+
+        full = [schedule for schedule in schedules if schedule.date > today and schedule not in booked][:5]
+        ClassSchedule.objects.filter(pk__in=[schedule.pk for schedule in full]).update(available_spots=0)
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(user=cls.user, class_schedule=schedule) for schedule in full
+        ])
+
+        cls.order = Order.objects.create(
+            user=cls.user,
+            full_name='Member',
+            email='member@test.com',
+            phone_number='1234567890',
+            street_address1='1 Test St',
+            town_or_city='Test City',
+            country='IE',
+        )
+        for product in cls.products[:10]:
+            OrderLineItem.objects.create(order=cls.order, product=product, quantity=2)
+        OrderLineItem.objects.create(order=cls.order, membership=cls.tiers[0], quantity=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self):
+        self.client.login(username='member', password='testpass123')
+
+    def fill_bag(self):
+        session = self.client.session
+        session['bag'] = {str(product.id): 2 for product in self.products[:15]}
+        session['membership_in_bag'] = str(self.tiers[1].id)
+        session.save()
+
+    def assertQueryBudget(self, budget, url, status_code=200):
+        """Load `url` and fail if it runs more than `budget` queries"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status_code)
+            # Streamed responses (calendar feeds) query while they are consumed
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url} ran {len(queries)} queries (budget {budget}):\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        return response
+
+
+class HomepageQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for the home and policy pages"""
+
+    def test_home(self):
+        """Test the home page"""
+        self.assertQueryBudget(1, reverse('home'))
+        self.login()
+        self.fill_bag()
+        self.assertQueryBudget(5, reverse('home'))
+
+    def test_policy_pages(self):
+        """Test the FAQ, terms, privacy and contact pages"""
+        for name in ('faq', 'terms', 'privacy', 'contact'):
+            self.assertQueryBudget(1, reverse(name))
+
+
+class ClassQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for class and schedule pages"""
+
+    def test_all_classes(self):
+        """Test the class list, filtered and searched"""
+        self.assertQueryBudget(4, reverse('all_classes'))
+        self.assertQueryBudget(3, reverse('all_classes') + '?category=yoga')
+        self.assertQueryBudget(4, reverse('all_classes') + '?q=class')
+
+    def test_class_detail(self):
+        """Test a class page"""
+        self.assertQueryBudget(3, reverse('class_detail', args=[self.fitness_classes[0].id]))
+
+    def test_schedule_list(self):
+        """Test the schedule page for visitors and members"""
+        url = reverse('class_schedule_list')
+        self.assertQueryBudget(5, url)
+        self.assertQueryBudget(5, url + f'?category={self.class_categories[1].id}&approx_total=1')
+        self.login()
+        self.assertQueryBudget(6, url)
+
+    def test_schedule_availability(self):
+        """Test the availability API"""
+        self.assertQueryBudget(3, reverse('schedule_availability'))
+
+    def test_timetable_feed(self):
+        """Test the timetable calendar feed, including streaming it"""
+        self.assertQueryBudget(3, reverse('timetable_feed'))
+
+
+class ProductQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for the shop pages"""
+
+    def test_all_products(self):
+        """Test the product list, filtered, sorted and searched"""
+        url = reverse('products:all_products')
+        self.assertQueryBudget(4, url)
+        self.assertQueryBudget(5, url + '?category=apparel&sort=price&direction=desc')
+        self.assertQueryBudget(5, url + '?q=product')
+
+    def test_product_detail(self):
+        """Test a product page"""
+        self.assertQueryBudget(3, reverse('products:product_detail', args=[self.products[0].id]))
+
+
+class BagCheckoutQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for the bag and checkout"""
+
+    def test_bag(self):
+        """Test the bag with many products and a membership"""
+        self.fill_bag()
+        self.assertQueryBudget(4, reverse('bag:view_bag'))
+
+    def test_checkout(self):
+        """Test the checkout page for a member with a full bag"""
+        self.login()
+        self.fill_bag()
+        self.assertQueryBudget(6, reverse('checkout:checkout'))
+
+    def test_checkout_success(self):
+        """Test the order confirmation page"""
+        self.login()
+        self.assertQueryBudget(16, reverse('checkout:checkout_success', args=[self.order.order_number]))
+
+
+class BookingQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for member booking pages"""
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_my_bookings(self):
+        """Test My Bookings with a long history and waitlist"""
+        self.assertQueryBudget(7, reverse('bookings:my_bookings'))
+        self.assertQueryBudget(7, reverse('bookings:my_bookings') + '?history_page=2')
+
+    def test_booking_confirmation(self):
+        """Test the booking confirmation page"""
+        self.assertQueryBudget(6, reverse('bookings:booking_confirmation', args=[self.booking.id]))
+
+    def test_booking_feed(self):
+        """Test the member's calendar feed, including streaming it"""
+        self.client.logout()
+        self.assertQueryBudget(4, reverse('bookings:booking_feed', args=[calendar_feed_token(self.user)]))
+
+
+class MembershipQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for membership pages"""
+
+    def test_plans(self):
+        """Test the plan list and a plan page"""
+        self.assertQueryBudget(2, reverse('memberships:membership_plans'))
+        self.assertQueryBudget(2, reverse('memberships:membership_detail', args=[self.tiers[0].id]))
+
+    def test_member_pages(self):
+        """Test the purchase redirect and confirmation pages for a member"""
+        self.login()
+        self.assertQueryBudget(5, reverse('memberships:purchase_membership', args=[self.tiers[0].id]), 302)
+        self.assertQueryBudget(
+            4, reverse('memberships:membership_confirmation', args=[self.membership.id]),
+        )
+
+
+class ProfileQueryBudgetTests(QueryBudgetTestCase):
+    """Test query budgets for the profile page"""
+
+    def test_profile(self):
+        """Test the profile page with order history"""
+        self.login()
+        self.assertQueryBudget(7, reverse('profiles:profile'))